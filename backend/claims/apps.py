@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ClaimsConfig(AppConfig):
@@ -6,11 +7,8 @@ class ClaimsConfig(AppConfig):
     name = 'claims'
 
     def ready(self):
-        # Ensure indexes are present when the app starts
-        try:
-            from .db import ensure_indexes
+        # Los índices los crea `manage.py sync_indexes`; al arrancar solo se verifica la versión aplicada
+        if settings.INDEX_CHECK_ON_STARTUP:
+            from .indexes import check_index_version
 
-            ensure_indexes()
-        except Exception:
-            # Avoid startup failures if DB is unavailable; logs can be added later
-            pass
+            check_index_version()
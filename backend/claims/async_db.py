@@ -0,0 +1,44 @@
+"""
+Clientes asíncronos de PyMongo para las vistas async servidas por config.asgi.
+
+Un AsyncMongoClient queda atado al event loop donde se usó por primera vez, así que se crea uno por loop
+(en uvicorn es uno por worker) en lugar del único cliente por proceso que guarda db.py.
+"""
+import asyncio
+import weakref
+from typing import Dict
+
+from django.conf import settings
+from pymongo import AsyncMongoClient
+
+from .db import client_options
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncMongoClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _client(name: str, uri: str) -> AsyncMongoClient:
+    loop = asyncio.get_running_loop()
+    clients = _clients.get(loop)
+    if clients is None:
+        clients = _clients[loop] = {}
+    if name not in clients:
+        clients[name] = AsyncMongoClient(uri, **client_options(name, uri, asynchronous=True))
+    return clients[name]
+
+
+def get_async_main_client() -> AsyncMongoClient:
+    return _client("main", settings.MONGODB_MAIN_URI)
+
+
+def get_async_audit_client() -> AsyncMongoClient:
+    return _client("audit", settings.MONGODB_AUDIT_URI)
+
+
+def get_async_main_db():
+    return get_async_main_client()[settings.MONGODB_MAIN_DB]
+
+
+def get_async_audit_db():
+    return get_async_audit_client()[settings.MONGODB_AUDIT_DB]
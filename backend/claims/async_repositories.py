@@ -0,0 +1,84 @@
+"""
+Variante asíncrona de las lecturas más usadas de repositories.py.
+
+Devuelven exactamente los mismos diccionarios que sus pares síncronos, pero las consultas independientes
+(base principal y auditoría, usuarios y áreas referenciados) se lanzan a la vez con asyncio.gather.
+"""
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional
+
+from .async_db import get_async_audit_db, get_async_main_db
+from .codec import api_collection, to_api
+from .db import serialize, to_object_id
+from .repositories import (
+    _serialize_feedback_message,
+    build_claims_query,
+    claim_event_references,
+    claim_events_query,
+    serialize_claim_events,
+)
+
+
+async def _find_by_ids(collection: str, ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    object_ids = {to_object_id(value) for value in ids if value}
+    if not object_ids:
+        return {}
+    cursor = api_collection(get_async_main_db(), collection).find({"_id": {"$in": list(object_ids)}})
+    docs = await cursor.to_list(None)
+    return {doc["id"]: doc for doc in map(to_api, docs)}
+
+
+async def get_user_by_id(user_id: Any) -> Optional[Dict[str, Any]]:
+    doc = await get_async_main_db().users.find_one({"_id": to_object_id(user_id)})
+    return serialize(doc)
+
+
+async def get_claim(claim_id: Any) -> Optional[Dict[str, Any]]:
+    doc = await get_async_main_db().claims.find_one({"_id": to_object_id(claim_id)})
+    return serialize(doc)
+
+
+async def get_project(project_id: Any) -> Optional[Dict[str, Any]]:
+    doc = await get_async_main_db().projects.find_one({"_id": to_object_id(project_id)})
+    return serialize(doc)
+
+
+async def get_projects(project_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    return await _find_by_ids("projects", project_ids)
+
+
+async def list_claims(*, role: str, user_id: str, **filters: Any) -> List[Dict[str, Any]]:
+    query = build_claims_query(role=role, user_id=user_id, **filters)
+    docs = await api_collection(get_async_main_db(), "claims").find(query).sort("created_at", -1).to_list(None)
+    return [to_api(doc) for doc in docs]
+
+
+async def list_claim_events(claim_id: Any, public_only: bool = False) -> List[Dict[str, Any]]:
+    query = claim_events_query(claim_id, public_only)
+    events = await get_async_audit_db().claim_events.find(query).sort("created_at", 1).to_list(None)
+    # Usuarios y áreas referenciados en dos consultas en paralelo
+    user_ids, area_ids = claim_event_references(events)
+    users, areas = await asyncio.gather(_find_by_ids("users", user_ids), _find_by_ids("areas", area_ids))
+    return serialize_claim_events(events, users, areas, public_only)
+
+
+async def list_client_feedback_messages(claim_id: str) -> List[Dict[str, Any]]:
+    messages = (
+        await get_async_main_db()
+        .client_feedback_messages
+        .find({"claim_id": to_object_id(claim_id)})
+        .sort("created_at", 1)
+        .to_list(None)
+    )
+    clients = await _find_by_ids("users", (msg.get("client_id") for msg in messages))
+
+    results: List[Dict[str, Any]] = []
+    for msg in messages:
+        serialized = _serialize_feedback_message(msg)
+        if not serialized:
+            continue
+        client = clients.get(serialized.get("client_id"))
+        if client:
+            serialized["client_name"] = client.get("full_name") or client.get("company_name") or client.get("email")
+        results.append(serialized)
+    return results
@@ -0,0 +1,155 @@
+"""
+Versiones async de las vistas de lectura más usadas, para desplegar con config.asgi.
+
+DRF no ejecuta handlers async, así que son vistas de Django que repiten la autenticación JWT y los
+chequeos de permiso de sus pares en views.py y responden con el mismo renderer JSON, de modo que el
+frontend puede apuntar a /api/async/... sin cambios en el formato.
+"""
+import asyncio
+import functools
+from typing import Optional, Tuple
+
+import jwt
+from django.http import HttpResponse, HttpResponseNotAllowed
+from rest_framework import exceptions
+
+from . import async_repositories as repo
+from .auth import AuthenticatedUser, decode_token
+from .renderers import render_json
+from .serializers import ClientFeedbackMessageSerializer
+from .views import _claim_filters, _claim_full_parts, _present_claim, _present_claim_full
+
+
+def require_get(view):
+    # django.views.decorators.http.require_GET envuelve con una función síncrona en Django 4.2
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return HttpResponseNotAllowed(["GET"])
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def _json(data, status: int = 200) -> HttpResponse:
+    return HttpResponse(render_json(data), status=status, content_type="application/json")
+
+
+def _error(exc: exceptions.APIException) -> HttpResponse:
+    # Como JWTAuthentication no define authenticate_header, DRF responde 403 también sin credenciales
+    status = 403 if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)) else exc.status_code
+    return _json({"detail": exc.detail}, status)
+
+
+async def _authenticate(request) -> Tuple[Optional[AuthenticatedUser], Optional[HttpResponse]]:
+    header = request.headers.get("Authorization")
+    if not header or " " not in header:
+        if header:
+            return None, _error(exceptions.AuthenticationFailed("Authorization header is invalid"))
+        return None, _error(exceptions.NotAuthenticated())
+    scheme, token = header.split(" ", 1)
+    if scheme.lower() != "bearer":
+        return None, _error(exceptions.NotAuthenticated())
+    try:
+        payload = decode_token(token)
+    except jwt.ExpiredSignatureError:
+        return None, _error(exceptions.AuthenticationFailed("Token expirado"))
+    except jwt.InvalidTokenError:
+        return None, _error(exceptions.AuthenticationFailed("Token inválido"))
+    user = await repo.get_user_by_id(payload.get("sub"))
+    if not user or not user.get("is_active", True):
+        return None, _error(exceptions.AuthenticationFailed("Usuario no encontrado o inactivo"))
+    request.user = AuthenticatedUser(
+        id=user["id"],
+        role=user["role"],
+        email=user["email"],
+        name=user.get("full_name"),
+        area_id=user.get("area_id"),
+        raw=user,
+    )
+    return request.user, None
+
+
+async def _claim_for(request, claim_id: str) -> Tuple[Optional[dict], Optional[HttpResponse]]:
+    claim = await repo.get_claim(claim_id)
+    if not claim:
+        return None, HttpResponse(status=404)
+    if request.user.role == "client" and str(claim.get("created_by")) != request.user.id:
+        return None, HttpResponse(status=403)
+    return claim, None
+
+
+@require_get
+async def claim_list(request):
+    _, error = await _authenticate(request)
+    if error:
+        return error
+    try:
+        filters = _claim_filters(request)
+    except ValueError as exc:
+        return _json({"detail": str(exc)}, 400)
+    claims = await repo.list_claims(role=request.user.role, user_id=request.user.id, **filters)
+    # Un único $in para los proyectos de toda la página
+    projects = await repo.get_projects(claim["project_id"] for claim in claims)
+    return _json([_present_claim(request, claim, projects.get(str(claim["project_id"]))) for claim in claims])
+
+
+@require_get
+async def claim_detail(request, claim_id: str):
+    _, error = await _authenticate(request)
+    if error:
+        return error
+    claim, error = await _claim_for(request, claim_id)
+    if error:
+        return error
+    project = await repo.get_project(claim["project_id"])
+    return _json(_present_claim(request, claim, project))
+
+
+@require_get
+async def claim_timeline(request, claim_id: str):
+    _, error = await _authenticate(request)
+    if error:
+        return error
+    claim, error = await _claim_for(request, claim_id)
+    if error:
+        return error
+    events = await repo.list_claim_events(claim["id"], public_only=request.user.role == "client")
+    return _json(events)
+
+
+@require_get
+async def claim_feedback(request, claim_id: str):
+    _, error = await _authenticate(request)
+    if error:
+        return error
+    claim, error = await _claim_for(request, claim_id)
+    if error:
+        return error
+    messages = await repo.list_client_feedback_messages(claim["id"])
+    return _json(ClientFeedbackMessageSerializer(messages, many=True).data)
+
+
+async def _none():
+    return None
+
+
+@require_get
+async def claim_full(request, claim_id: str):
+    _, error = await _authenticate(request)
+    if error:
+        return error
+    try:
+        parts = _claim_full_parts(request)
+    except ValueError as exc:
+        return _json({"detail": str(exc)}, 400)
+    claim, error = await _claim_for(request, claim_id)
+    if error:
+        return error
+    project, events, messages = await asyncio.gather(
+        repo.get_project(claim["project_id"]),
+        repo.list_claim_events(claim["id"], public_only=request.user.role == "client")
+        if "timeline" in parts else _none(),
+        repo.list_client_feedback_messages(claim["id"]) if "feedback" in parts else _none(),
+    )
+    return _json(_present_claim_full(request, claim, parts, project, events, messages))
@@ -39,6 +39,11 @@ class JWTAuthentication(BaseAuthentication):
     keyword = "Bearer"
 
     def authenticate(self, request) -> Tuple[AuthenticatedUser, str]:
+        # Sub-request de /api/batch/: el usuario ya se autenticó en el request externo
+        batch_user = getattr(request._request, "batch_user", None)  # pylint: disable=protected-access
+        if batch_user is not None:
+            return batch_user, None
+
         header = request.headers.get("Authorization")
         if not header:
             return None
@@ -66,6 +71,7 @@ class JWTAuthentication(BaseAuthentication):
             role=user["role"],
             email=user["email"],
             name=user.get("full_name"),
+            area_id=user.get("area_id"),
             raw=user,
         )
         return auth_user, token
@@ -0,0 +1,86 @@
+"""
+Despacho interno de los GET agrupados en /api/batch/.
+
+Cada ruta se resuelve con el resolver de URLs y se ejecuta llamando directamente a la vista, sin pasar otra
+vez por el stack HTTP. El usuario ya autenticado viaja en el atributo batch_user del sub-request, que
+JWTAuthentication acepta sin volver a decodificar el token ni buscar al usuario.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/"
+
+# Vistas que no tienen sentido dentro de un batch: el propio batch y las respuestas en streaming
+EXCLUDED_URL_NAMES = {"batch", "claim-export", "profile-download"}
+
+# Cabeceras del request externo que no deben heredar los sub-requests
+_DROPPED_META = {"HTTP_AUTHORIZATION", "CONTENT_LENGTH", "CONTENT_TYPE", "wsgi.input", "HTTP_COOKIE"}
+
+
+class BatchSubRequest(HttpRequest):
+    def __init__(self, parent: HttpRequest, path: str, user: Any):
+        super().__init__()
+        parsed = urlsplit(path)
+        self.method = "GET"
+        self.path = self.path_info = parsed.path
+        self.META = {key: value for key, value in parent.META.items() if key not in _DROPPED_META}
+        self.META.update(
+            REQUEST_METHOD="GET",
+            PATH_INFO=parsed.path,
+            QUERY_STRING=parsed.query,
+            HTTP_ACCEPT="application/json",
+        )
+        self.GET = QueryDict(parsed.query)
+        self.batch_user = user
+        self._parent_scheme = parent.scheme
+
+    def _get_scheme(self):
+        return self._parent_scheme
+
+
+def validate_path(path: Any) -> str:
+    """Devuelve la ruta normalizada o lanza ValueError si no puede ir en un batch."""
+    if not isinstance(path, str) or not path.startswith(API_PREFIX):
+        raise ValueError(f"Cada ruta debe ser un string que empiece con {API_PREFIX}")
+    parsed = urlsplit(path)
+    if parsed.scheme or parsed.netloc:
+        raise ValueError("Solo se aceptan rutas relativas")
+    return path
+
+
+def dispatch(parent: HttpRequest, path: str, user: Any) -> Dict[str, Any]:
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        return {"path": path, "status": 404, "body": {"detail": "No encontrado"}}
+    if match.url_name in EXCLUDED_URL_NAMES or asyncio.iscoroutinefunction(match.func):
+        return {"path": path, "status": 400, "body": {"detail": "Esta ruta no se puede usar dentro de un batch"}}
+
+    try:
+        response = match.func(BatchSubRequest(parent, path, user), *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+    except Exception:  # pylint: disable=broad-except
+        # Un error de una ruta (un id mal formado, un bug) no debe tirar abajo el batch entero
+        logger.exception("Falló la ruta %s dentro de un batch", path)
+        return {"path": path, "status": 500, "body": {"detail": "Error interno del servidor"}}
+    if getattr(response, "streaming", False):
+        # Cierra el generador (y el archivo o cursor que tenga abierto) sin consumirlo
+        response.close()
+        return {"path": path, "status": 400, "body": {"detail": "Esta ruta no se puede usar dentro de un batch"}}
+
+    body: Any = None
+    if response.content:
+        if response.get("Content-Type", "").startswith("application/json"):
+            body = json.loads(response.content)
+        else:
+            body = response.content.decode(response.charset or "utf-8", errors="replace")
+    return {"path": path, "status": response.status_code, "body": body}
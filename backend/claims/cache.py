@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+
+from .db import get_main_db, serialize
+from .invalidation import invalidation_bus
+
+REFERENCE_VERSION_ID = "reference_data"
+
+
+def _current_reference_version() -> int:
+    doc = get_main_db().cache_versions.find_one({"_id": REFERENCE_VERSION_ID})
+    return doc.get("version", 0) if doc else 0
+
+
+def bump_reference_version(collection: str, document_id: Any = None) -> None:
+    """Invalida las áreas y proyectos cacheados en todos los procesos."""
+    get_main_db().cache_versions.update_one(
+        {"_id": REFERENCE_VERSION_ID},
+        {"$inc": {"version": 1}},
+        upsert=True,
+    )
+    invalidation_bus.publish(collection, document_id)
+
+
+class ReferenceDataCache:
+    """
+    Áreas y proyectos activos en memoria, indexados por id.
+    Cada proceso consulta el contador de versión como mucho una vez cada REFERENCE_CACHE_CHECK_SECONDS
+    y recarga todo cuando cambió. Mientras el bus de invalidación está escuchando, los cambios llegan por
+    ahí y el contador solo se revisa cada REFERENCE_CACHE_MAX_AGE_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (áreas, proyectos): se reemplaza entera para que los lectores nunca vean una mezcla
+        self._data: Optional[Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self) -> bool:
+        if invalidation_bus.listening:
+            max_age = settings.REFERENCE_CACHE_MAX_AGE_SECONDS
+        else:
+            max_age = settings.REFERENCE_CACHE_CHECK_SECONDS
+        return self._data is not None and time.monotonic() - self._checked_at < max_age
+
+    def _ensure_fresh(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        invalidation_bus.ensure_started()
+        data = self._data
+        if data is not None and self._is_fresh():
+            return data
+        with self._lock:
+            if self._data is not None and self._is_fresh():
+                return self._data
+            # La versión se lee antes que los datos: una escritura concurrente obliga a recargar en la próxima vuelta
+            version = _current_reference_version()
+            if self._data is None or version != self._version:
+                db = get_main_db()
+                active = {"is_active": {"$ne": False}}
+                self._data = (
+                    {str(doc["_id"]): serialize(doc) for doc in db.areas.find(active)},
+                    {str(doc["_id"]): serialize(doc) for doc in db.projects.find(active)},
+                )
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._data
+
+    def _lookup(self, index: int, key: Any) -> Optional[Dict[str, Any]]:
+        items = self._ensure_fresh()[index]
+        doc = items.get(str(key)) if key else None
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(doc)
+
+    def get_area(self, area_id: Any) -> Optional[Dict[str, Any]]:
+        return self._lookup(0, area_id)
+
+    def get_project(self, project_id: Any) -> Optional[Dict[str, Any]]:
+        return self._lookup(1, project_id)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._data = None
+            self._version = None
+            self._checked_at = 0.0
+
+
+reference_cache = ReferenceDataCache()
+invalidation_bus.register(lambda collection, document_id: reference_cache.invalidate(), ["areas", "projects"])
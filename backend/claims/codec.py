@@ -0,0 +1,46 @@
+"""
+Decodificación de BSON lista para la API.
+
+serialize() copia cada documento para renombrar _id, y después los presentadores lo vuelven a copiar
+para pasar los ObjectId a texto y quitar campos sensibles. Las lecturas que terminan en una respuesta
+usan en cambio colecciones con un TypeRegistry que entrega los ObjectId ya como texto (en cualquier
+nivel, también dentro de listas y subdocumentos) mientras PyMongo decodifica el batch; a ese
+documento solo le falta renombrar _id, y eso se hace sobre el mismo dict. Los campos sensibles no se
+piden a Mongo (USER_PUBLIC_PROJECTION), así que tampoco hay que borrarlos después.
+
+Solo para lecturas: los documentos decodificados así ya no sirven para armar filtros o updates
+sin pasar sus ids por to_object_id.
+"""
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from bson.codec_options import TypeDecoder, TypeRegistry
+
+
+class ObjectIdAsText(TypeDecoder):
+    bson_type = ObjectId
+
+    def transform_bson(self, value: ObjectId) -> str:
+        return str(value)
+
+
+API_TYPE_REGISTRY = TypeRegistry([ObjectIdAsText()])
+
+# Proyección por defecto de los usuarios en lecturas públicas: el hash nunca sale de Mongo
+USER_PUBLIC_PROJECTION = {"password": 0}
+
+
+def api_collection(database, name: str):
+    """La colección name de database, con las mismas opciones que el cliente más el TypeRegistry de la API."""
+    options = database.codec_options.with_options(type_registry=API_TYPE_REGISTRY)
+    return database.get_collection(name, codec_options=options)
+
+
+def to_api(document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Renombra _id a id sobre el mismo documento (sin copiarlo) y lo devuelve."""
+    if not document:
+        return None
+    if "_id" in document:
+        value = document.pop("_id")
+        document["id"] = value if value.__class__ is str else str(value)
+    return document
@@ -0,0 +1,45 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.DB_FANOUT_WORKERS,
+                    thread_name_prefix="claims-io",
+                )
+    return _executor
+
+
+def _run_in_pool(func: Callable[[], Any]) -> Any:
+    _local.in_pool = True
+    try:
+        return func()
+    finally:
+        _local.in_pool = False
+
+
+def run_concurrently(tasks: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+    """
+    Ejecuta consultas independientes en paralelo sobre un pool acotado y devuelve sus resultados por nombre.
+    Si ya se está dentro del pool se ejecutan en serie, para no bloquear hilos esperando a otros hilos.
+    """
+    if len(tasks) <= 1 or getattr(_local, "in_pool", False):
+        return {name: func() for name, func in tasks.items()}
+    executor = _get_executor()
+    # Cada tarea corre en una copia del contexto del request: sus comandos de Mongo se le siguen atribuyendo
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, _run_in_pool, func) for name, func in tasks.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
@@ -1,19 +1,92 @@
-from functools import lru_cache
+import os
+import threading
 from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
 
 from bson import ObjectId
 from django.conf import settings
-from pymongo import ASCENDING, MongoClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from .instrumentation import command_timings
+from .metrics import command_metrics
+from .tracing import trace_commands
+from .monitoring import pool_metrics, reset_pool_metrics
+
+
+def client_options(name: str, uri: str, asynchronous: bool = False) -> Dict[str, Any]:
+    """
+    Opciones de MONGODB_<NAME>_OPTIONS para el cliente name (main o audit) más sus listeners: el del pool
+    (aparte para los clientes async, que tienen sus propios pools) y el que atribuye cada comando al
+    request en curso.
+    Las que ya vienen en la query string de la URI tienen prioridad y no se pisan.
+    """
+    in_uri = {key.lower() for key in parse_qs(urlsplit(uri).query)}
+    configured = getattr(settings, f"MONGODB_{name.upper()}_OPTIONS", {})
+    options = {
+        key: value for key, value in configured.items() if value is not None and key.lower() not in in_uri
+    }
+    options["event_listeners"] = [
+        pool_metrics(f"{name}-async" if asynchronous else name, options.get("maxPoolSize", 100)),
+        command_timings,
+        command_metrics,
+        trace_commands,
+    ]
+    return options
+
+
+# Clientes del proceso actual. Un MongoClient no sobrevive a un fork (sus hilos de monitoreo no se
+# copian y el pool quedaría compartido con el padre), así que se crean a demanda en cada proceso.
+_clients: Dict[str, MongoClient] = {}
+_clients_pid: Optional[int] = None
+_clients_lock = threading.Lock()
+
+
+def _get_client(name: str, uri: str) -> MongoClient:
+    client = _clients.get(name) if _clients_pid == os.getpid() else None
+    if client is not None:
+        return client
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _forget_inherited_clients()
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = MongoClient(uri, **client_options(name, uri))
+        return client
+
+
+def _forget_inherited_clients() -> None:
+    global _clients_pid  # pylint: disable=global-statement
+    # Los heredados no se cierran: close() usaría sockets y sesiones que siguen siendo del padre
+    _clients.clear()
+    _clients_pid = os.getpid()
+    reset_pool_metrics()
 
 
-@lru_cache(maxsize=1)
 def get_main_client() -> MongoClient:
-    return MongoClient(settings.MONGODB_MAIN_URI)
+    return _get_client("main", settings.MONGODB_MAIN_URI)
 
 
-@lru_cache(maxsize=1)
 def get_audit_client() -> MongoClient:
-    return MongoClient(settings.MONGODB_AUDIT_URI)
+    return _get_client("audit", settings.MONGODB_AUDIT_URI)
+
+
+def reset_clients() -> None:
+    """Para el hijo recién forkeado (post_fork de gunicorn): descarta los clientes heredados del padre."""
+    with _clients_lock:
+        _forget_inherited_clients()
+
+
+def close_clients() -> None:
+    """Cierra los clientes de este proceso (al apagar el worker, o en el master antes de forkear)."""
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _forget_inherited_clients()
+            return
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
 
 
 def get_main_db():
@@ -24,6 +97,15 @@ def get_audit_db():
     return get_audit_client()[settings.MONGODB_AUDIT_DB]
 
 
+def supports_change_streams(client: MongoClient) -> bool:
+    """Los change streams requieren un replica set (puede ser de un solo nodo) o un cluster sharded."""
+    try:
+        hello = client.admin.command("hello")
+    except PyMongoError:
+        return False
+    return bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+
+
 def to_object_id(value: Any) -> ObjectId:
     if isinstance(value, ObjectId):
         return value
@@ -37,15 +119,3 @@ def serialize(document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if "_id" in doc:
         doc["id"] = str(doc.pop("_id"))
     return doc
-
-
-def ensure_indexes():
-    db = get_main_db()
-    db.users.create_index("email", unique=True, sparse=True)
-    db.areas.create_index("name", unique=True, sparse=True)
-    db.projects.create_index([("client_id", ASCENDING)], sparse=True)
-    db.claims.create_index([("created_by", ASCENDING), ("created_at", ASCENDING)])
-    db.claims.create_index([("status", ASCENDING)])
-    db.client_feedback_messages.create_index([("claim_id", ASCENDING), ("created_at", ASCENDING)])
-    audit_db = get_audit_db()
-    audit_db.claim_events.create_index([("claim_id", ASCENDING), ("created_at", ASCENDING)])
@@ -0,0 +1,73 @@
+"""
+Firmas MinHash y claves LSH para detectar reclamos casi duplicados.
+
+Cada reclamo se reduce a una firma de NUM_PERMUTATIONS enteros calculada sobre los 5-gramas de caracteres
+de su texto normalizado. La firma se divide en BANDS bandas de ROWS_PER_BAND valores; dos reclamos con
+al menos una banda idéntica son candidatos. Con 16 bandas de 4 filas el umbral efectivo de similitud de
+Jaccard ronda (1/16) ** (1/4) ≈ 0.5.
+"""
+import hashlib
+import random
+import re
+import unicodedata
+import zlib
+from typing import List, Optional, Sequence
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Coeficientes fijos: las firmas guardadas deben seguir siendo comparables entre procesos y versiones
+_rng = random.Random(20240601)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    ascii_text = "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+    return _NON_ALNUM.sub(" ", ascii_text).strip()
+
+
+def claim_text(claim_type: Optional[str], description: Optional[str]) -> str:
+    return normalize_text(f"{claim_type or ''} {description or ''}")
+
+
+def _shingle_hashes(text: str) -> set:
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode("utf-8"))} if text else set()
+    encoded = text.encode("utf-8")
+    return {zlib.crc32(encoded[i:i + SHINGLE_SIZE]) for i in range(len(encoded) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> List[int]:
+    shingles = _shingle_hashes(text)
+    if not shingles:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [
+        min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in shingles)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def band_keys(signature: Sequence[int]) -> List[str]:
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode("ascii"), digest_size=8).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def estimate_similarity(first: Optional[Sequence[int]], second: Optional[Sequence[int]]) -> float:
+    if not first or not second or len(first) != len(second):
+        return 0.0
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
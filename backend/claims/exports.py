@@ -0,0 +1,103 @@
+import csv
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List
+
+from bson import ObjectId
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+CLAIM_EXPORT_FIELDS = [
+    "id",
+    "project_id",
+    "project_name",
+    "client_id",
+    "claim_type",
+    "priority",
+    "severity",
+    "status",
+    "area_id",
+    "area_name",
+    "sub_area",
+    "description",
+    "created_by",
+    "created_at",
+    "updated_at",
+    "client_rating",
+    "client_feedback",
+    "resolution_description",
+]
+
+# Tamaño aproximado de cada bloque enviado al cliente
+CHUNK_SIZE = 64 * 1024
+
+
+class _Echo:
+    """Buffer mínimo para que csv.writer devuelva cada línea en lugar de escribirla."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def to_plain(value: Any) -> Any:
+    """Convierte recursivamente ObjectId y datetime a texto para escribirlos fuera de Mongo."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[str]:
+    buffer: List[str] = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(
+                ["" if row.get(field) is None else encode_value(row.get(field)) for field in fields]
+            )
+
+    return _chunked(lines())
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[str]:
+    def lines():
+        for row in rows:
+            payload = {field: encode_value(row.get(field)) for field in fields}
+            yield json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+
+    return _chunked(lines())
+
+
+def iter_export(export_format: str, rows: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[str]:
+    if export_format == "csv":
+        return iter_csv(rows, fields)
+    return iter_ndjson(rows, fields)
@@ -0,0 +1,235 @@
+"""
+Registro declarativo de los índices de Mongo y su sincronización versionada.
+
+INDEXES es la única fuente de verdad: `manage.py sync_indexes` crea los que faltan, recrea los que
+cambiaron de definición, borra los que ya no están declarados (solo en las colecciones del registro) y
+anota INDEX_VERSION en schema_versions. Al arrancar, la app solo compara esa versión con la del código
+usando un cliente propio con timeout corto, sin construir nada ni esperar a Mongo.
+
+Desde MongoDB 4.2 la construcción de índices no bloquea lecturas ni escrituras de la colección (solo toma
+un lock exclusivo breve al principio y al final), así que sync_indexes puede correr con la app atendiendo.
+Al agregar, quitar o cambiar un índice hay que subir INDEX_VERSION. `manage.py index_advisor` revisa los
+planes de las consultas de la app contra estos índices y propone los que faltan.
+"""
+import logging
+import socket
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, MongoClient
+from pymongo.errors import OperationFailure, PyMongoError
+
+from .db import get_audit_db, get_main_db
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+
+VERSIONS_COLLECTION = "schema_versions"
+VERSION_DOC_ID = "indexes"
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    database: str  # "main" o "audit"
+    collection: str
+    keys: Tuple[Tuple[str, Any], ...]
+    name: Optional[str] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def index_name(self) -> str:
+        # Mismo nombre que genera PyMongo cuando no se indica uno
+        return self.name or "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+    def model(self) -> IndexModel:
+        return IndexModel(list(self.keys), name=self.index_name, **self.options)
+
+    def matches(self, info: Dict[str, Any]) -> bool:
+        """Si el índice existente (una entrada de index_information) tiene esta misma definición."""
+        if self.keys[0][1] == TEXT:
+            # Los índices de texto se guardan como _fts/_ftsx: los campos se comparan por sus pesos
+            if set(info.get("weights", {})) != {key for key, _ in self.keys}:
+                return False
+        elif list(info.get("key", [])) != list(self.keys):
+            return False
+        for option in ("unique", "sparse"):
+            if bool(self.options.get(option)) != bool(info.get(option)):
+                return False
+        for option in ("partialFilterExpression", "expireAfterSeconds"):
+            if self.options.get(option) != info.get(option):
+                return False
+        for option in ("weights", "default_language"):
+            if option in self.options and self.options[option] != info.get(option):
+                return False
+        return True
+
+    @classmethod
+    def create(cls, database: str, collection: str, keys, name: Optional[str] = None, **options) -> "IndexSpec":
+        """keys es un campo (ascendente) o una lista de (campo, dirección) como en create_index."""
+        if isinstance(keys, str):
+            keys = [(keys, ASCENDING)]
+        return cls(database, collection, tuple(keys), name, options)
+
+
+_index = IndexSpec.create
+
+
+INDEXES: List[IndexSpec] = [
+    _index("main", "users", "email", unique=True, sparse=True),
+    # Listados por rol ordenados por email (list_users, StatisticsByEmployeeView)
+    _index("main", "users", [("role", ASCENDING), ("email", ASCENDING)]),
+    _index("main", "areas", "name", unique=True, sparse=True),
+    _index("main", "projects", [("created_at", DESCENDING)]),
+    _index("main", "projects", [("client_id", ASCENDING), ("created_at", DESCENDING)]),
+    _index("main", "claims", [("created_by", ASCENDING), ("created_at", ASCENDING)]),
+    # Combinaciones habituales de filtros del listado: igualdad primero, luego el orden por fecha
+    _index("main", "claims", [("created_at", DESCENDING)]),
+    _index("main", "claims", [("status", ASCENDING), ("created_at", DESCENDING)]),
+    _index("main", "claims", [("created_by", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)]),
+    _index("main", "claims", [("area_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)]),
+    # Estadísticas de un área por período, sin filtro de estado
+    _index("main", "claims", [("area_id", ASCENDING), ("created_at", DESCENDING)]),
+    _index("main", "claims", [("project_id", ASCENDING), ("created_at", DESCENDING)]),
+    _index("main", "claims", [("priority", ASCENDING), ("created_at", DESCENDING)]),
+    _index("main", "claims", [("updated_at", ASCENDING)]),
+    _index("main", "claims", [("status", ASCENDING), ("updated_at", ASCENDING)]),
+    _index(
+        "main",
+        "claims",
+        [("claim_type", TEXT), ("description", TEXT), ("resolution_description", TEXT)],
+        name="claims_text",
+        weights={"claim_type": 5, "description": 3, "resolution_description": 2},
+        default_language="spanish",
+    ),
+    _index("main", "claim_signatures", [("project_id", ASCENDING), ("created_by", ASCENDING), ("bands", ASCENDING)]),
+    _index("main", "client_feedback_messages", [("claim_id", ASCENDING), ("created_at", ASCENDING)]),
+    _index("main", "client_feedback_messages", [("created_at", ASCENDING)]),
+    # StatisticsRatingsView: solo los mensajes finales con calificación
+    _index(
+        "main",
+        "client_feedback_messages",
+        [("type", ASCENDING), ("created_at", ASCENDING)],
+        partialFilterExpression={"rating": {"$exists": True}},
+    ),
+    _index("audit", "claim_events", [("claim_id", ASCENDING), ("created_at", ASCENDING)]),
+    _index("audit", "claim_events", [("created_at", ASCENDING)]),
+    _index(
+        "audit",
+        "claim_events",
+        [("details.comment", TEXT), ("details.action_description", TEXT)],
+        name="claim_events_text",
+        default_language="spanish",
+    ),
+]
+
+
+def _database(name: str):
+    return get_main_db() if name == "main" else get_audit_db()
+
+
+def plan_indexes(indexes: Optional[List[IndexSpec]] = None) -> Dict[str, List[Tuple[str, str, str]]]:
+    """
+    Compara el registro con lo que hay en Mongo sin modificar nada.
+    Devuelve {"create": [...], "recreate": [...], "drop": [...]} con tuplas (base, colección, índice).
+    """
+    indexes = INDEXES if indexes is None else indexes
+    plan: Dict[str, List[Tuple[str, str, str]]] = {"create": [], "recreate": [], "drop": []}
+    by_collection: Dict[Tuple[str, str], List[IndexSpec]] = {}
+    for spec in indexes:
+        by_collection.setdefault((spec.database, spec.collection), []).append(spec)
+
+    for (database, collection), specs in by_collection.items():
+        existing = _database(database)[collection].index_information()
+        declared = {spec.index_name for spec in specs}
+        for spec in specs:
+            info = existing.get(spec.index_name)
+            if info is None:
+                plan["create"].append((database, collection, spec.index_name))
+            elif not spec.matches(info):
+                plan["recreate"].append((database, collection, spec.index_name))
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                plan["drop"].append((database, collection, name))
+    return plan
+
+
+def sync_indexes(
+    drop: bool = True,
+    indexes: Optional[List[IndexSpec]] = None,
+) -> Dict[str, List[Tuple[str, str, str]]]:
+    """Aplica plan_indexes y registra INDEX_VERSION. Devuelve el plan aplicado."""
+    indexes = INDEXES if indexes is None else indexes
+    plan = plan_indexes(indexes)
+    specs = {(spec.database, spec.collection, spec.index_name): spec for spec in indexes}
+
+    # Primero se borran los obsoletos y los que cambiaron: un índice de texto por colección, nombres únicos
+    to_drop = plan["recreate"] + (plan["drop"] if drop else [])
+    for database, collection, name in to_drop:
+        try:
+            _database(database)[collection].drop_index(name)
+        except OperationFailure as exc:
+            if exc.code != 27:  # IndexNotFound: otro proceso ya lo borró
+                raise
+
+    to_create: Dict[Tuple[str, str], List[IndexModel]] = {}
+    for key in plan["create"] + plan["recreate"]:
+        spec = specs[key]
+        to_create.setdefault((spec.database, spec.collection), []).append(spec.model())
+    for (database, collection), models in to_create.items():
+        _database(database)[collection].create_indexes(models)
+
+    get_main_db()[VERSIONS_COLLECTION].update_one(
+        {"_id": VERSION_DOC_ID},
+        {
+            "$set": {
+                "version": INDEX_VERSION,
+                "applied_at": datetime.utcnow(),
+                "applied_by": socket.gethostname(),
+                "indexes": sorted(f"{spec.database}.{spec.collection}.{spec.index_name}" for spec in indexes),
+            }
+        },
+        upsert=True,
+    )
+    return plan
+
+
+def applied_index_version(timeout_ms: Optional[int] = None) -> Optional[int]:
+    """
+    Versión registrada por el último sync_indexes, o None si nunca se aplicó.
+    Usa un cliente propio con timeout corto para no demorar el arranque ni dejar el cliente principal
+    creado en el master de gunicorn; lanza PyMongoError si Mongo no responde a tiempo.
+    """
+    timeout_ms = settings.INDEX_CHECK_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    client = MongoClient(
+        settings.MONGODB_MAIN_URI,
+        serverSelectionTimeoutMS=timeout_ms,
+        connectTimeoutMS=timeout_ms,
+        socketTimeoutMS=timeout_ms,
+    )
+    try:
+        doc = client[settings.MONGODB_MAIN_DB][VERSIONS_COLLECTION].find_one({"_id": VERSION_DOC_ID}, {"version": 1})
+    finally:
+        client.close()
+    return doc.get("version") if doc else None
+
+
+def check_index_version() -> None:
+    """Chequeo de arranque: avisa en el log si los índices de la base no corresponden a este código."""
+    try:
+        applied = applied_index_version()
+    except PyMongoError as exc:
+        logger.warning("No se pudo verificar la versión de índices (%s); se sigue sin chequear", type(exc).__name__)
+        return
+    if applied is None or applied < INDEX_VERSION:
+        logger.warning(
+            "Índices en la versión %s y el código espera la %s: ejecute `python manage.py sync_indexes`",
+            applied,
+            INDEX_VERSION,
+        )
+    elif applied > INDEX_VERSION:
+        logger.warning(
+            "Los índices están en la versión %s, más nueva que la del código (%s)", applied, INDEX_VERSION
+        )
@@ -0,0 +1,227 @@
+"""
+Atribución de los comandos de Mongo al request que los emite.
+
+CommandTimings es un CommandListener que se registra en los clientes de claims/db.py y async_db.py. Por
+cada comando que empieza busca los colectores activos en el contexto (contextvars) y les anota nombre,
+colección, forma de la consulta y duración. El contexto sigue al request en sus hilos (run_concurrently
+lo copia al pool) y en sus tareas async, y los hilos de fondo (bus de invalidación, fuentes en vivo) no
+tienen colectores, así que sus comandos no cuentan para nadie.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import monitoring
+
+# Continuaciones de un cursor ya abierto: son round trips, pero no consultas nuevas
+CURSOR_COMMANDS = {"getMore", "killCursors"}
+
+# Colectores activos en el contexto actual; se anidan (el request y, adentro, un test que cuenta)
+_collectors: ContextVar[Tuple["CommandCollector", ...]] = ContextVar("claims_command_collectors", default=())
+
+
+@dataclass
+class CommandRecord:
+    name: str
+    database: str
+    collection: Optional[str]
+    shape: Any
+    offset_ms: float  # desde el inicio del colector
+    duration_ms: Optional[float] = None
+    failed: bool = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "command": self.name,
+            "collection": f"{self.database}.{self.collection}" if self.collection else self.database,
+            "shape": self.shape,
+            "offset_ms": round(self.offset_ms, 2),
+            "duration_ms": round(self.duration_ms, 2) if self.duration_ms is not None else None,
+            "failed": self.failed,
+        }
+
+
+def command_collection(event) -> Optional[str]:
+    value = event.command.get(event.command_name)
+    if event.command_name == "getMore":
+        return event.command.get("collection")
+    return value if isinstance(value, str) else None
+
+
+def _shape(event) -> Any:
+    """Forma de la consulta sin valores (no se loguean datos de los documentos)."""
+    command = event.command
+    name = event.command_name
+    if name in ("find", "count", "distinct"):
+        return sorted((command.get("filter") or command.get("query") or {}).keys())
+    if name == "aggregate":
+        return [next(iter(stage), "") for stage in command.get("pipeline", [])]
+    if name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or []
+        return sorted({key for statement in statements for key in statement.get("q", {})})
+    if name == "insert":
+        return len(command.get("documents", []))
+    return None
+
+
+class CommandCollector:
+    """
+    Comandos de un request (o de un bloque de código): cantidad de round trips (count), de consultas sin
+    contar getMore/killCursors (queries), tiempo total y, hasta limit, el detalle.
+    """
+
+    def __init__(self, limit: int = 200) -> None:
+        self.limit = limit
+        self.started_at = time.perf_counter()
+        self.count = 0
+        self.queries = 0
+        self.failures = 0
+        self.duration_ms = 0.0
+        self.commands: List[CommandRecord] = []
+        self._pending: Dict[Tuple[Any, int], Tuple[float, Optional[CommandRecord]]] = {}
+        self._lock = threading.Lock()
+
+    def command_started(self, event) -> None:
+        now = time.perf_counter()
+        record = None
+        with self._lock:
+            self.count += 1
+            if event.command_name not in CURSOR_COMMANDS:
+                self.queries += 1
+            if len(self.commands) < self.limit:
+                record = CommandRecord(
+                    event.command_name,
+                    event.database_name,
+                    command_collection(event),
+                    _shape(event),
+                    (now - self.started_at) * 1000,
+                )
+                self.commands.append(record)
+            self._pending[(event.connection_id, event.request_id)] = (now, record)
+
+    def command_finished(self, event, failed: bool) -> None:
+        with self._lock:
+            started = self._pending.pop((event.connection_id, event.request_id), None)
+            if started is None:
+                return
+            duration_ms = event.duration_micros / 1000
+            self.duration_ms += duration_ms
+            if failed:
+                self.failures += 1
+            record = started[1]
+            if record is not None:
+                record.duration_ms = duration_ms
+                record.failed = failed
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"db_count": self.count, "db_ms": round(self.duration_ms, 2), "db_failures": self.failures}
+
+    def command_log(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [record.as_dict() for record in self.commands]
+
+
+class CommandTimings(monitoring.CommandListener):
+    def started(self, event):
+        for collector in _collectors.get():
+            collector.command_started(event)
+
+    def succeeded(self, event):
+        for collector in _collectors.get():
+            collector.command_finished(event, failed=False)
+
+    def failed(self, event):
+        for collector in _collectors.get():
+            collector.command_finished(event, failed=True)
+
+
+command_timings = CommandTimings()
+
+
+def activate_collector(collector: CommandCollector):
+    """Suma un colector ya existente a los activos del contexto; devuelve el token para stop_collecting."""
+    return _collectors.set(_collectors.get() + (collector,))
+
+
+def start_collecting(limit: int = 200):
+    """Activa un colector nuevo en el contexto actual; devuelve (token, colector) para stop_collecting."""
+    collector = CommandCollector(limit)
+    return activate_collector(collector), collector
+
+
+def stop_collecting(token) -> None:
+    _collectors.reset(token)
+
+
+@contextmanager
+def collect_commands(limit: int = 200) -> Iterator[CommandCollector]:
+    token, collector = start_collecting(limit)
+    try:
+        yield collector
+    finally:
+        stop_collecting(token)
+
+
+_END = object()
+
+
+def follow_stream(response, collector: Optional[CommandCollector], on_close: Callable[[bool], None]) -> None:
+    """
+    En una StreamingHttpResponse las consultas corren al iterarla, cuando el middleware ya devolvió la
+    respuesta y el colector ya no está activo. Envuelve streaming_content para que el colector (si se pasa
+    uno) vuelva a estar activo mientras se genera cada bloque y llama on_close(completo) cuando el stream
+    termina o se corta (el cliente se desconectó o falló la generación).
+    """
+    if getattr(response, "is_async", False):
+        response.streaming_content = _follow_async(response.streaming_content, collector, on_close)
+    else:
+        response.streaming_content = _follow_sync(response.streaming_content, collector, on_close)
+
+
+def _follow_sync(content, collector: Optional[CommandCollector], on_close: Callable[[bool], None]) -> Iterator[bytes]:
+    iterator = iter(content)
+    completed = False
+    try:
+        while True:
+            # El token se repone antes del yield: el generador no tiene contexto propio
+            token = activate_collector(collector) if collector is not None else None
+            try:
+                chunk = next(iterator, _END)
+            finally:
+                if token is not None:
+                    stop_collecting(token)
+            if chunk is _END:
+                completed = True
+                return
+            yield chunk
+    finally:
+        on_close(completed)
+
+
+async def _follow_async(
+    content, collector: Optional[CommandCollector], on_close: Callable[[bool], None]
+) -> AsyncIterator[bytes]:
+    iterator = content.__aiter__()
+    completed = False
+    try:
+        while True:
+            token = activate_collector(collector) if collector is not None else None
+            try:
+                chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                completed = True
+                return
+            finally:
+                if token is not None:
+                    stop_collecting(token)
+            yield chunk
+    finally:
+        on_close(completed)
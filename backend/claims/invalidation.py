@@ -0,0 +1,224 @@
+"""
+Bus de invalidación de cachés entre procesos.
+
+Cada worker corre un hilo que escucha los cambios de `users`, `areas`, `projects` y `claims` y avisa a las
+cachés registradas. Con un replica set (también de un solo nodo) se usa un change stream; con un servidor
+standalone cada escritura publica un evento en la colección limitada `cache_events`, que se sigue con un
+cursor tailable. Si el hilo pierde la conexión, al reconectarse invalida todo porque pudo perder eventos.
+"""
+import logging
+import os
+import socket
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, OperationFailure, PyMongoError
+
+from .db import get_main_client, get_main_db, supports_change_streams
+
+logger = logging.getLogger(__name__)
+
+WATCHED_COLLECTIONS = ("users", "areas", "projects", "claims")
+CACHE_EVENTS_COLLECTION = "cache_events"
+
+MODE_CHANGE_STREAM = "change_stream"
+MODE_POLL = "poll"
+MODE_OFF = "off"
+
+# Recibe la colección y el id del documento; el id es None cuando hay que descartar todo
+Subscriber = Callable[[str, Optional[str]], None]
+
+
+class InvalidationBus:
+    def __init__(self):
+        self._subscribers: Dict[str, List[Subscriber]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._mode: Optional[str] = None
+        self._resume_token: Optional[Dict[str, Any]] = None
+        self._last_event_id: Any = None
+        self.listening = False
+        self.received = 0
+
+    # -------- Suscripción y publicación --------
+    def register(self, callback: Subscriber, collections: Iterable[str]) -> None:
+        for collection in collections:
+            if collection not in WATCHED_COLLECTIONS:
+                raise ValueError(f"La colección {collection} no se vigila para invalidar cachés")
+            self._subscribers[collection].append(callback)
+
+    def publish(self, collection: str, document_id: Any = None) -> None:
+        """Invalida en este proceso y, con servidor standalone, avisa al resto por `cache_events`."""
+        document_id = str(document_id) if document_id is not None else None
+        self._dispatch(collection, document_id)
+        if self.mode != MODE_POLL:
+            return
+        try:
+            get_main_db()[CACHE_EVENTS_COLLECTION].insert_one(
+                {
+                    "collection": collection,
+                    "document_id": document_id,
+                    "origin": _origin(),
+                    "created_at": datetime.utcnow(),
+                }
+            )
+        except PyMongoError as exc:
+            logger.warning("No se pudo publicar la invalidación de %s: %s", collection, exc)
+
+    def _dispatch(self, collection: str, document_id: Optional[str]) -> None:
+        for callback in self._subscribers.get(collection, []):
+            try:
+                callback(collection, document_id)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Falló la invalidación de caché para %s", collection)
+
+    def _dispatch_all(self) -> None:
+        for collection in list(self._subscribers):
+            self._dispatch(collection, None)
+
+    # -------- Ciclo de vida --------
+    @property
+    def mode(self) -> str:
+        if self._mode is None:
+            self._mode = self._resolve_mode()
+        return self._mode
+
+    @staticmethod
+    def _resolve_mode() -> str:
+        configured = settings.CACHE_INVALIDATION_MODE
+        if configured != "auto":
+            return configured
+        return MODE_CHANGE_STREAM if supports_change_streams(get_main_client()) else MODE_POLL
+
+    def ensure_started(self) -> None:
+        """Arranca el hilo la primera vez que se usa una caché en este proceso (también después de un fork)."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            # Un hijo hereda el estado del padre pero no su hilo
+            self._pid = pid
+            self._mode = None
+            self._resume_token = None
+            self._last_event_id = None
+            self.listening = False
+            self._stopped.clear()
+            if self.mode == MODE_OFF or not self._subscribers:
+                return
+            self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self) -> None:
+        backoff = 1
+        while not self._stopped.is_set():
+            try:
+                if self.mode == MODE_CHANGE_STREAM:
+                    self._listen_change_stream()
+                else:
+                    self._listen_capped()
+                backoff = 1
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Se cortó el bus de invalidación (%s): %s", self.mode, exc)
+                if self.listening:
+                    # Mientras no se escuchaba pudieron perderse eventos
+                    self.listening = False
+                    self._dispatch_all()
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    # -------- Change stream --------
+    def _listen_change_stream(self) -> None:
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": sorted(self._subscribers)}}},
+            {"$project": {"ns": 1, "documentKey": 1, "operationType": 1}},
+        ]
+        try:
+            stream = get_main_db().watch(pipeline, resume_after=self._resume_token, max_await_time_ms=1000)
+        except OperationFailure:
+            # El token ya no está en el oplog: se arranca de cero y se descarta todo lo cacheado
+            self._resume_token = None
+            self._dispatch_all()
+            stream = get_main_db().watch(pipeline, max_await_time_ms=1000)
+        with stream:
+            self.listening = True
+            while stream.alive and not self._stopped.is_set():
+                change = stream.try_next()
+                self._resume_token = stream.resume_token
+                if change is None:
+                    continue
+                self.received += 1
+                collection = change.get("ns", {}).get("coll")
+                if change.get("operationType") in ("drop", "rename", "dropDatabase", "invalidate"):
+                    self._dispatch_all()
+                    continue
+                document_key = change.get("documentKey", {}).get("_id")
+                self._dispatch(collection, str(document_key) if document_key is not None else None)
+
+    # -------- Colección limitada --------
+    @staticmethod
+    def _ensure_events_collection(db) -> None:
+        if db.list_collection_names(filter={"name": CACHE_EVENTS_COLLECTION}):
+            return
+        try:
+            db.create_collection(CACHE_EVENTS_COLLECTION, capped=True, size=settings.CACHE_EVENTS_SIZE_BYTES)
+        except CollectionInvalid:
+            pass
+
+    def _listen_capped(self) -> None:
+        db = get_main_db()
+        self._ensure_events_collection(db)
+        events = db[CACHE_EVENTS_COLLECTION]
+        if self._last_event_id is None:
+            last = events.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+            self._last_event_id = last["_id"] if last else None
+        origin = _origin()
+        self.listening = True
+        while not self._stopped.is_set():
+            # El orden natural es el de inserción; los ObjectId de distintos procesos no siempre lo respetan,
+            # por eso se recorre desde el principio y se saltea hasta el último evento ya visto
+            marker = self._last_event_id
+            cursor = events.find({}, cursor_type=CursorType.TAILABLE_AWAIT).max_await_time_ms(1000)
+            while cursor.alive and not self._stopped.is_set():
+                for event in cursor:
+                    if marker is not None:
+                        if event["_id"] == marker:
+                            marker = None
+                        continue
+                    self._last_event_id = event["_id"]
+                    if event.get("origin") == origin:
+                        continue
+                    self.received += 1
+                    self._dispatch(event.get("collection"), event.get("document_id"))
+                if marker is not None and cursor.alive:
+                    # Se llegó al final sin encontrar el último evento visto: se sobrescribió y no se sabe
+                    # qué se perdió en el medio
+                    marker = None
+                    self._dispatch_all()
+            # Colección vacía o cursor muerto: se espera un poco antes de volver a abrirlo
+            self._stopped.wait(1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self._mode,
+            "listening": self.listening,
+            "received": self.received,
+            "subscribers": {collection: len(callbacks) for collection, callbacks in self._subscribers.items()},
+        }
+
+
+def _origin() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,308 @@
+"""
+Índice invertido TF-IDF en memoria sobre reclamos resueltos, para sugerir resoluciones previas.
+
+Cada documento es un vector disperso (ids de términos + pesos normalizados). El índice invertido guarda,
+por término, los documentos que lo contienen y su peso, así una consulta solo toca las listas de sus
+propios términos. El IDF se aplica al consultar, por lo que agregar documentos no obliga a recalcular nada.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .db import get_main_db, to_object_id
+from .dedup import normalize_text
+from .invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+RESOLVED_STATUS = "Resuelto"
+
+STOPWORDS = {
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "al", "a", "en", "y", "o", "que",
+    "por", "para", "con", "sin", "se", "su", "sus", "es", "son", "no", "si", "lo", "le", "les", "como",
+    "mas", "pero", "este", "esta", "estos", "estas", "ese", "esa", "muy", "ya", "fue", "hay", "desde",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in normalize_text(text).split() if len(token) > 2 and token not in STOPWORDS]
+
+
+def _document_text(doc: Dict[str, Any]) -> str:
+    return " ".join(
+        part for part in (doc.get("claim_type"), doc.get("description"), doc.get("resolution_description")) if part
+    )
+
+
+class ResolutionIndex:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        # Serializa las escrituras del archivo: el guardado programado y uno explícito comparten el temporal
+        self._save_lock = threading.Lock()
+        self._saving = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._vocabulary: Dict[str, int] = {}
+        self._document_frequency: List[int] = []
+        self._claim_ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._doc_terms: List[np.ndarray] = []
+        self._doc_weights: List[np.ndarray] = []
+        self._postings: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._high_water_mark: Optional[datetime] = None
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._dirty = False
+
+    # -------- Construcción --------
+    def _vectorize(self, tokens: List[str], grow: bool) -> Tuple[np.ndarray, np.ndarray]:
+        counts = Counter(tokens)
+        term_ids, weights = [], []
+        for token, count in counts.items():
+            term_id = self._vocabulary.get(token)
+            if term_id is None:
+                if not grow:
+                    continue
+                term_id = len(self._vocabulary)
+                self._vocabulary[token] = term_id
+                self._document_frequency.append(0)
+            term_ids.append(term_id)
+            weights.append(1.0 + math.log(count))
+        terms = np.asarray(term_ids, dtype=np.int32)
+        values = np.asarray(weights, dtype=np.float32)
+        norm = float(np.linalg.norm(values)) if values.size else 0.0
+        if norm:
+            values /= norm
+        return terms, values
+
+    def _add(self, claim_id: str, text: str, pending: Dict[int, Tuple[List[int], List[float]]]) -> bool:
+        if claim_id in self._positions:
+            return False
+        terms, weights = self._vectorize(tokenize(text), grow=True)
+        if not terms.size:
+            return False
+        position = len(self._claim_ids)
+        self._claim_ids.append(claim_id)
+        self._positions[claim_id] = position
+        self._doc_terms.append(terms)
+        self._doc_weights.append(weights)
+        for term_id, weight in zip(terms.tolist(), weights.tolist()):
+            self._document_frequency[term_id] += 1
+            docs, values = pending.setdefault(term_id, ([], []))
+            docs.append(position)
+            values.append(weight)
+        return True
+
+    def _merge_postings(self, pending: Dict[int, Tuple[List[int], List[float]]]) -> None:
+        """Pasa las entradas acumuladas en listas a los arrays del índice: una copia por término y lote."""
+        for term_id, (docs, values) in pending.items():
+            new_docs = np.asarray(docs, dtype=np.int32)
+            new_values = np.asarray(values, dtype=np.float32)
+            current = self._postings.get(term_id)
+            if current is not None:
+                new_docs = np.concatenate((current[0], new_docs))
+                new_values = np.concatenate((current[1], new_values))
+            self._postings[term_id] = (new_docs, new_values)
+
+    def _ingest(self, docs, advance_watermark: bool = True) -> int:
+        added = 0
+        # Las listas de cada término crecen en Python y se convierten al final: agregar con np.append
+        # copiaba el array completo por documento (cuadrático en la construcción inicial)
+        pending: Dict[int, Tuple[List[int], List[float]]] = {}
+        for doc in docs:
+            if self._add(str(doc["_id"]), _document_text(doc), pending):
+                added += 1
+            updated_at = doc.get("updated_at")
+            if advance_watermark and isinstance(updated_at, datetime) and (
+                self._high_water_mark is None or updated_at > self._high_water_mark
+            ):
+                self._high_water_mark = updated_at
+        self._merge_postings(pending)
+        if added:
+            self._dirty = True
+        return added
+
+    def add_claim(self, claim: Dict[str, Any]) -> None:
+        """Indexa un reclamo recién resuelto (dict serializado) y programa la persistencia."""
+        if claim.get("status") != RESOLVED_STATUS:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            # La marca de agua solo avanza con lo leído de Mongo en refresh: este reclamo puede ser más nuevo
+            # que otros resueltos por otros workers y todavía no leídos, que el próximo refresh saltearía
+            self._ingest([{**claim, "_id": claim["id"]}], advance_watermark=False)
+        self._schedule_save()
+
+    def refresh(self, force: bool = False) -> int:
+        """Incorpora los reclamos resueltos desde la última marca de agua (resueltos por otros procesos)."""
+        invalidation_bus.ensure_started()
+        with self._lock:
+            self._ensure_loaded()
+            if not force and time.monotonic() - self._last_refresh < settings.KNOWLEDGE_INDEX_REFRESH_SECONDS:
+                return 0
+            query: Dict[str, Any] = {"status": RESOLVED_STATUS}
+            if self._high_water_mark:
+                query["updated_at"] = {"$gte": self._high_water_mark}
+            cursor = get_main_db().claims.find(
+                query,
+                {"claim_type": 1, "description": 1, "resolution_description": 1, "updated_at": 1},
+            ).batch_size(2000)
+            added = self._ingest(cursor)
+            self._last_refresh = time.monotonic()
+        if added:
+            self._schedule_save()
+        return added
+
+    def mark_stale(self) -> None:
+        self._last_refresh = 0.0
+
+    # -------- Consulta --------
+    def suggest(self, text: str, k: int = 5, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        self.refresh()
+        with self._lock:
+            total = len(self._claim_ids)
+            if not total:
+                return []
+            terms, weights = self._vectorize(tokenize(text), grow=False)
+            if not terms.size:
+                return []
+            scores = np.zeros(total, dtype=np.float32)
+            for term_id, weight in zip(terms.tolist(), weights.tolist()):
+                docs, values = self._postings[term_id]
+                idf = math.log((total + 1) / (self._document_frequency[term_id] + 1)) + 1.0
+                scores[docs] += np.float32(weight * idf * idf) * values
+            if exclude is not None and exclude in self._positions:
+                scores[self._positions[exclude]] = 0
+            candidates = np.flatnonzero(scores)
+            if not candidates.size:
+                return []
+            if candidates.size > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            ranked = candidates[np.argsort(-scores[candidates])]
+            return [(self._claim_ids[i], float(scores[i])) for i in ranked.tolist()]
+
+    # -------- Persistencia --------
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path.exists():
+            try:
+                self._load()
+                return
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("No se pudo leer el índice de resoluciones %s: %s", self.path, exc)
+                self._reset()
+                self._loaded = True
+        # Sin archivo: se construye desde Mongo en el primer refresh
+        self._last_refresh = 0.0
+
+    def _load(self) -> None:
+        with np.load(self.path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            indptr, indices, values = data["indptr"], data["indices"], data["values"]
+        self._vocabulary = {token: term_id for term_id, token in enumerate(meta["vocabulary"])}
+        self._document_frequency = meta["document_frequency"]
+        self._claim_ids = meta["claim_ids"]
+        self._positions = {claim_id: i for i, claim_id in enumerate(self._claim_ids)}
+        self._high_water_mark = (
+            datetime.fromisoformat(meta["high_water_mark"]) if meta.get("high_water_mark") else None
+        )
+        self._doc_terms = [indices[indptr[i]:indptr[i + 1]] for i in range(len(self._claim_ids))]
+        self._doc_weights = [values[indptr[i]:indptr[i + 1]] for i in range(len(self._claim_ids))]
+        # Índice invertido: se ordenan las entradas por término y se corta en bloques
+        owners = np.repeat(np.arange(len(self._claim_ids), dtype=np.int32), np.diff(indptr))
+        order = np.argsort(indices, kind="stable")
+        sorted_terms = indices[order]
+        boundaries = np.flatnonzero(np.diff(sorted_terms)) + 1
+        starts = np.concatenate(([0], boundaries)) if sorted_terms.size else np.empty(0, np.int64)
+        ends = np.concatenate((boundaries, [sorted_terms.size])) if sorted_terms.size else np.empty(0, np.int64)
+        self._postings = {
+            int(sorted_terms[start]): (owners[order[start:end]], values[order[start:end]])
+            for start, end in zip(starts.tolist(), ends.tolist())
+        }
+
+    def save(self) -> None:
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                lengths = [terms.size for terms in self._doc_terms]
+                indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+                np.cumsum(lengths, out=indptr[1:])
+                indices = np.concatenate(self._doc_terms) if self._doc_terms else np.empty(0, np.int32)
+                values = np.concatenate(self._doc_weights) if self._doc_weights else np.empty(0, np.float32)
+                meta = {
+                    "vocabulary": sorted(self._vocabulary, key=self._vocabulary.get),
+                    "document_frequency": list(self._document_frequency),
+                    "claim_ids": list(self._claim_ids),
+                    "high_water_mark": self._high_water_mark.isoformat() if self._high_water_mark else None,
+                }
+                self._dirty = False
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f".{self.path.stem}.{os.getpid()}.tmp.npz")
+            np.savez_compressed(
+                tmp_path, indptr=indptr, indices=indices, values=values, meta=np.array(json.dumps(meta))
+            )
+            os.replace(tmp_path, self.path)
+
+    def _schedule_save(self) -> None:
+        with self._lock:
+            if self._saving:
+                return
+            self._saving = True
+
+        def run():
+            time.sleep(settings.KNOWLEDGE_INDEX_SAVE_DELAY_SECONDS)
+            try:
+                self.save()
+            except OSError as exc:
+                logger.warning("No se pudo guardar el índice de resoluciones: %s", exc)
+            finally:
+                self._saving = False
+
+        threading.Thread(target=run, name="resolution-index-save", daemon=True).start()
+
+    def __len__(self) -> int:
+        return len(self._claim_ids)
+
+
+resolution_index = ResolutionIndex(settings.KNOWLEDGE_INDEX_PATH)
+invalidation_bus.register(lambda collection, document_id: resolution_index.mark_stale(), ["claims"])
+
+
+def suggest_resolutions(claim: Dict[str, Any], k: int = 5) -> List[Dict[str, Any]]:
+    """Resoluciones previas más parecidas a la descripción de un reclamo."""
+    text = " ".join(part for part in (claim.get("claim_type"), claim.get("description")) if part)
+    ranked = resolution_index.suggest(text, k=k, exclude=str(claim.get("id")))
+    if not ranked:
+        return []
+    docs = get_main_db().claims.find(
+        {"_id": {"$in": [to_object_id(claim_id) for claim_id, _ in ranked]}},
+        {"claim_type": 1, "description": 1, "resolution_description": 1, "updated_at": 1},
+    )
+    by_id = {str(doc["_id"]): doc for doc in docs}
+    return [
+        {
+            "claim_id": claim_id,
+            "score": round(score, 4),
+            "claim_type": by_id[claim_id].get("claim_type"),
+            "description": by_id[claim_id].get("description"),
+            "resolution_description": by_id[claim_id].get("resolution_description"),
+            "resolved_at": by_id[claim_id].get("updated_at"),
+        }
+        for claim_id, score in ranked
+        if claim_id in by_id
+    ]
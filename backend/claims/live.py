@@ -0,0 +1,601 @@
+"""
+Actualizaciones en vivo de reclamos, timeline y KPIs por Server-Sent Events.
+
+Un único LiveBroadcaster por proceso escucha `claims`, `client_feedback_messages` (base principal) y
+`claim_events` (auditoría) con change streams, o consultando por marca de agua cuando el servidor es
+standalone. Cada cambio se convierte una sola vez en un LiveEvent y se reparte a las suscripciones
+abiertas, que filtran según el rol del usuario. Las conexiones son colas asyncio alimentadas desde el hilo
+del broadcaster con call_soon_threadsafe; la respuesta SSE es una app ASGI propia (ver config/asgi.py) para
+poder enterarse de la desconexión del navegador.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+import jwt
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .auth import decode_token
+from .db import get_audit_client, get_audit_db, get_main_client, get_main_db, supports_change_streams, to_object_id
+from .exports import to_plain
+from .repositories import get_claim, get_user_by_id
+
+logger = logging.getLogger(__name__)
+
+TOPICS = frozenset({"claims", "events", "feedback", "kpi"})
+
+# Campos de un reclamo que viajan en las actualizaciones; sub_area es interna y no llega a clientes
+CLAIM_LIVE_FIELDS = (
+    "status", "priority", "severity", "area_id", "sub_area", "client_rating", "resolution_description", "updated_at",
+)
+CLIENT_HIDDEN_FIELDS = frozenset({"sub_area"})
+
+# Acciones del timeline que mueven los contadores por estado
+KPI_ACTIONS = ("created", "status_changed")
+
+
+@dataclass
+class LiveEvent:
+    topic: str
+    kind: str
+    claim_id: Optional[str]
+    payload: Dict[str, Any]
+    created_by: Optional[str] = None
+    area_id: Optional[str] = None
+    visibility: str = "public"
+    source_time: Optional[datetime] = None
+    published_at: float = field(default_factory=time.perf_counter)
+
+
+class Subscription:
+    """Una conexión SSE: filtro por rol y una cola acotada en el event loop de la conexión."""
+
+    def __init__(
+        self,
+        *,
+        role: str,
+        user_id: str,
+        area_id: Optional[str],
+        topics: FrozenSet[str],
+        claim_id: Optional[str],
+        loop: asyncio.AbstractEventLoop,
+    ):
+        self.role = role
+        self.user_id = user_id
+        self.area_id = area_id
+        self.topics = topics
+        self.claim_id = claim_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.LIVE_QUEUE_SIZE)
+        self.overflowed = False
+        self.opened_at = time.monotonic()
+
+    def accepts(self, event: LiveEvent) -> bool:
+        if event.topic not in self.topics:
+            return False
+        if self.claim_id and event.claim_id != self.claim_id:
+            return False
+        if self.role == "admin":
+            return True
+        if self.role == "employee":
+            # Los KPIs de un empleado son los de su área, igual que en /statistics/
+            return event.topic != "kpi" or event.area_id == self.area_id
+        return event.created_by == self.user_id and event.visibility == "public"
+
+    def render(self, event: LiveEvent) -> Dict[str, Any]:
+        if self.role != "client" or event.kind != "claim.updated":
+            return event.payload
+        fields = {key: value for key, value in event.payload["fields"].items() if key not in CLIENT_HIDDEN_FIELDS}
+        return {**event.payload, "fields": fields}
+
+    def deliver(self, event: LiveEvent) -> None:
+        """Se llama desde el hilo del broadcaster."""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: LiveEvent) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente lento: se corta la conexión y el navegador se reconecta y vuelve a consultar
+            self.overflowed = True
+            self.close()
+
+    def close(self) -> None:
+        """Despierta al stream para que termine; se llama desde el event loop de la conexión."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class LiveBroadcaster:
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._stopped = threading.Event()
+        # claim_id -> (created_by, area_id), para filtrar eventos del timeline sin consultar por conexión
+        self._claim_meta: "OrderedDict[str, tuple]" = OrderedDict()
+        self._meta_lock = threading.Lock()
+        self.modes: Dict[str, str] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped_connections = 0
+        self.delivery_ms: deque = deque(maxlen=2000)
+        self.source_lag_ms: deque = deque(maxlen=2000)
+
+    # -------- Suscripciones --------
+    def subscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.add(subscription)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+        if subscription.overflowed:
+            self.dropped_connections += 1
+
+    def publish(self, event: LiveEvent) -> int:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        self.published += 1
+        if event.source_time:
+            self.source_lag_ms.append((datetime.utcnow() - event.source_time).total_seconds() * 1000)
+        targets = 0
+        for subscription in subscriptions:
+            if subscription.accepts(event):
+                subscription.deliver(event)
+                targets += 1
+        return targets
+
+    def record_delivery(self, event: LiveEvent) -> None:
+        self.delivered += 1
+        self.delivery_ms.append((time.perf_counter() - event.published_at) * 1000)
+
+    # -------- Fuentes --------
+    def ensure_started(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._stopped.clear()
+            for source in SOURCES:
+                threading.Thread(
+                    target=self._run_source, args=(source,), name=f"live-{source.name}", daemon=True
+                ).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run_source(self, source: "LiveSource") -> None:
+        backoff = 1
+        watermark, boundary = datetime.utcnow(), set()
+        while not self._stopped.is_set():
+            try:
+                if source.name not in self.modes:
+                    self.modes[source.name] = "change_stream" if supports_change_streams(source.client()) else "poll"
+                if self.modes[source.name] == "change_stream":
+                    self._watch(source)
+                else:
+                    watermark, boundary = self._poll(source, watermark, boundary)
+                backoff = 1
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Se cortó la fuente en vivo %s: %s", source.name, exc)
+                self.modes.pop(source.name, None)
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _watch(self, source: "LiveSource") -> None:
+        pipeline = [{"$match": {"operationType": {"$in": list(source.operations)}}}]
+        kwargs: Dict[str, Any] = {"max_await_time_ms": 1000}
+        if "update" in source.operations:
+            kwargs["full_document"] = "updateLookup"
+        with source.collection().watch(pipeline, **kwargs) as stream:
+            while stream.alive and not self._stopped.is_set():
+                change = stream.try_next()
+                if change is None:
+                    continue
+                document = change.get("fullDocument") or {"_id": change["documentKey"]["_id"]}
+                if change["operationType"] == "replace":
+                    # Un reemplazo no trae updateDescription: se publica como actualización del documento completo
+                    updated = document
+                else:
+                    updated = (change.get("updateDescription") or {}).get("updatedFields")
+                for event in source.convert(self, document, updated):
+                    event.source_time = change.get("wallTime") or event.source_time
+                    self.publish(event)
+
+    def _poll(self, source: "LiveSource", watermark: datetime, boundary: Set[Any]) -> Tuple[datetime, Set[Any]]:
+        """
+        Publica lo escrito desde la marca de agua. La marca se compara con $gte porque varios documentos
+        pueden compartir el mismo instante y el lote anterior pudo cortarse entre ellos; boundary guarda los
+        _id ya publicados con ese valor exacto. Devuelve la nueva marca y su boundary.
+        """
+        self._stopped.wait(settings.LIVE_POLL_SECONDS)
+        query = {"$or": [
+            {source.watermark: {"$gt": watermark}},
+            {source.watermark: watermark, "_id": {"$nin": list(boundary)}},
+        ]}
+        cursor = source.collection().find(query).sort(source.watermark, 1)
+        for document in cursor.limit(1000):
+            value = document[source.watermark]
+            if value > watermark:
+                watermark, boundary = value, set()
+            boundary.add(document["_id"])
+            created = document.get("created_at") == document.get("updated_at")
+            for event in source.convert(self, document, None if created else document):
+                self.publish(event)
+        return watermark, boundary
+
+    # -------- Metadatos de reclamos --------
+    def remember_claim(self, claim_id: str, created_by: Any, area_id: Any) -> None:
+        with self._meta_lock:
+            self._claim_meta[claim_id] = (
+                str(created_by) if created_by else None,
+                str(area_id) if area_id else None,
+            )
+            self._claim_meta.move_to_end(claim_id)
+            while len(self._claim_meta) > settings.LIVE_CLAIM_META_SIZE:
+                self._claim_meta.popitem(last=False)
+
+    def claim_meta(self, claim_id: str) -> tuple:
+        with self._meta_lock:
+            meta = self._claim_meta.get(claim_id)
+        if meta is None:
+            doc = get_main_db().claims.find_one({"_id": to_object_id(claim_id)}, {"created_by": 1, "area_id": 1})
+            if not doc:
+                return (None, None)
+            self.remember_claim(claim_id, doc.get("created_by"), doc.get("area_id"))
+            meta = self._claim_meta.get(claim_id, (None, None))
+        return meta
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        by_role: Dict[str, int] = {}
+        for subscription in subscriptions:
+            by_role[subscription.role] = by_role.get(subscription.role, 0) + 1
+        return {
+            "connections": len(subscriptions),
+            "connections_by_role": by_role,
+            "queued": sum(subscription.queue.qsize() for subscription in subscriptions),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_connections": self.dropped_connections,
+            "delivery_ms": _percentiles(self.delivery_ms),
+            "source_lag_ms": _percentiles(self.source_lag_ms),
+            "sources": dict(self.modes),
+        }
+
+
+def _percentiles(samples) -> Dict[str, Optional[float]]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50": None, "p95": None, "max": None}
+    return {
+        "p50": round(ordered[len(ordered) // 2], 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+# -------- Conversión de documentos en eventos --------
+def _claim_events(broadcaster: LiveBroadcaster, doc: Dict[str, Any], updated: Optional[Dict[str, Any]]):
+    claim_id = str(doc["_id"])
+    if "created_by" in doc:
+        broadcaster.remember_claim(claim_id, doc.get("created_by"), doc.get("area_id"))
+    created_by, area_id = broadcaster.claim_meta(claim_id)
+    if updated is None:
+        yield LiveEvent(
+            topic="claims",
+            kind="claim.created",
+            claim_id=claim_id,
+            created_by=created_by,
+            area_id=area_id,
+            source_time=doc.get("created_at"),
+            payload=to_plain({
+                "claim_id": claim_id,
+                "project_id": doc.get("project_id"),
+                "claim_type": doc.get("claim_type"),
+                "priority": doc.get("priority"),
+                "severity": doc.get("severity"),
+                "status": doc.get("status"),
+                "created_at": doc.get("created_at"),
+            }),
+        )
+        return
+    fields = {key: updated[key] for key in CLAIM_LIVE_FIELDS if key in updated}
+    if set(fields) <= {"updated_at"}:
+        return
+    yield LiveEvent(
+        topic="claims",
+        kind="claim.updated",
+        claim_id=claim_id,
+        created_by=created_by,
+        area_id=area_id,
+        source_time=doc.get("updated_at"),
+        payload=to_plain({"claim_id": claim_id, "fields": fields}),
+    )
+
+
+def _timeline_events(broadcaster: LiveBroadcaster, doc: Dict[str, Any], updated: Optional[Dict[str, Any]]):
+    claim_id = str(doc.get("claim_id"))
+    created_by, area_id = broadcaster.claim_meta(claim_id)
+    details = doc.get("details") or {}
+    if doc.get("action") == "area_changed":
+        area_id = details.get("to") or None
+        broadcaster.remember_claim(claim_id, created_by, area_id)
+    yield LiveEvent(
+        topic="events",
+        kind="claim.event",
+        claim_id=claim_id,
+        created_by=created_by,
+        area_id=area_id,
+        visibility=doc.get("visibility", "internal"),
+        source_time=doc.get("created_at"),
+        payload=to_plain({
+            "id": doc.get("_id"),
+            "claim_id": claim_id,
+            "action": doc.get("action"),
+            "actor_role": doc.get("actor_role"),
+            "details": details,
+            "created_at": doc.get("created_at"),
+        }),
+    )
+    if doc.get("action") in KPI_ACTIONS:
+        delta: Dict[str, int] = {}
+        if details.get("from"):
+            delta[details["from"]] = -1
+        target = details.get("to") or details.get("status")
+        if target:
+            delta[target] = delta.get(target, 0) + 1
+        yield LiveEvent(
+            topic="kpi",
+            kind="kpi.delta",
+            claim_id=claim_id,
+            created_by=created_by,
+            area_id=area_id,
+            source_time=doc.get("created_at"),
+            payload={"claim_id": claim_id, "by_status": delta, "total": 1 if doc.get("action") == "created" else 0},
+        )
+
+
+def _feedback_events(broadcaster: LiveBroadcaster, doc: Dict[str, Any], updated: Optional[Dict[str, Any]]):
+    claim_id = str(doc.get("claim_id"))
+    created_by, area_id = broadcaster.claim_meta(claim_id)
+    yield LiveEvent(
+        topic="feedback",
+        kind="claim.feedback",
+        claim_id=claim_id,
+        created_by=created_by or (str(doc["client_id"]) if doc.get("client_id") else None),
+        area_id=area_id,
+        source_time=doc.get("created_at"),
+        payload=to_plain({
+            "id": doc.get("_id"),
+            "claim_id": claim_id,
+            "type": doc.get("type"),
+            "rating": doc.get("rating"),
+            "message": doc.get("message"),
+            "created_at": doc.get("created_at"),
+        }),
+    )
+
+
+@dataclass(frozen=True)
+class LiveSource:
+    name: str
+    client: Callable
+    collection: Callable
+    watermark: str
+    operations: tuple
+    convert: Callable[..., Iterator[LiveEvent]]
+
+
+SOURCES: List[LiveSource] = [
+    LiveSource(
+        name="claims",
+        client=get_main_client,
+        collection=lambda: get_main_db().claims,
+        watermark="updated_at",
+        operations=("insert", "update", "replace"),
+        convert=_claim_events,
+    ),
+    LiveSource(
+        name="claim_events",
+        client=get_audit_client,
+        collection=lambda: get_audit_db().claim_events,
+        watermark="created_at",
+        operations=("insert",),
+        convert=_timeline_events,
+    ),
+    LiveSource(
+        name="client_feedback_messages",
+        client=get_main_client,
+        collection=lambda: get_main_db().client_feedback_messages,
+        watermark="created_at",
+        operations=("insert",),
+        convert=_feedback_events,
+    ),
+]
+
+live_broadcaster = LiveBroadcaster()
+
+
+# -------- Respuesta SSE (ASGI) --------
+def _format_sse(event: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def _authenticate(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not token:
+        return None
+    try:
+        payload = decode_token(token)
+    except jwt.InvalidTokenError:
+        return None
+    user = get_user_by_id(payload.get("sub"))
+    if not user or not user.get("is_active", True):
+        return None
+    return user
+
+
+def _cors_headers(scope) -> List[tuple]:
+    headers = dict(scope.get("headers") or [])
+    origin = headers.get(b"origin")
+    if not origin:
+        return []
+    if getattr(settings, "CORS_ALLOW_ALL_ORIGINS", False):
+        return [(b"access-control-allow-origin", b"*")]
+    if origin.decode("latin-1") in getattr(settings, "CORS_ALLOWED_ORIGINS", []):
+        return [(b"access-control-allow-origin", origin), (b"vary", b"Origin")]
+    return []
+
+
+async def _send_json(send, scope, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json")] + _cors_headers(scope),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _request_token(scope, params: Dict[str, List[str]]) -> Optional[str]:
+    """La cabecera Authorization tiene prioridad sobre el token de la query string."""
+    authorization = dict(scope.get("headers") or []).get(b"authorization", b"").decode("latin-1")
+    if authorization.lower().startswith("bearer "):
+        return authorization.split(" ", 1)[1]
+    return (params.get("token") or [None])[0]
+
+
+def _claim_access_error(user: Dict[str, Any], claim_id: str) -> Optional[Tuple[int, str]]:
+    try:
+        claim = get_claim(claim_id)
+    except Exception:  # pylint: disable=broad-except
+        claim = None
+    if not claim:
+        return 404, "Reclamo no encontrado"
+    if user["role"] == "client" and str(claim.get("created_by")) != user["id"]:
+        return 403, "No tiene acceso a este reclamo"
+    return None
+
+
+async def _open_subscription(scope, send) -> Optional[Subscription]:
+    """Autentica y valida el request; si algo falla responde el error y devuelve None."""
+    params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    user = await sync_to_async(_authenticate)(_request_token(scope, params))
+    if not user:
+        await _send_json(send, scope, 401, "Token inválido o expirado")
+        return None
+
+    requested = (params.get("topics") or [",".join(sorted(TOPICS))])[0]
+    topics = frozenset(topic.strip() for topic in requested.split(",") if topic.strip())
+    if not topics or not topics <= TOPICS:
+        await _send_json(send, scope, 400, f"Tópicos permitidos: {', '.join(sorted(TOPICS))}")
+        return None
+    claim_id = (params.get("claim_id") or [None])[0]
+    if claim_id:
+        error = await sync_to_async(_claim_access_error)(user, claim_id)
+        if error:
+            await _send_json(send, scope, *error)
+            return None
+
+    return Subscription(
+        role=user["role"],
+        user_id=user["id"],
+        area_id=str(user["area_id"]) if user.get("area_id") else None,
+        topics=topics,
+        claim_id=claim_id,
+        loop=asyncio.get_running_loop(),
+    )
+
+
+async def _send_events(send, subscription: Subscription, disconnected: asyncio.Event) -> None:
+    """Envía los eventos de la cola con latidos hasta la desconexión, un desborde o LIVE_MAX_STREAM_SECONDS."""
+    deadline = time.monotonic() + settings.LIVE_MAX_STREAM_SECONDS
+    sequence = 0
+    while not disconnected.is_set() and time.monotonic() < deadline:
+        try:
+            event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.LIVE_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            await send({"type": "http.response.body", "body": b": ping\n\n", "more_body": True})
+            continue
+        if event is None:
+            return
+        sequence += 1
+        await send({
+            "type": "http.response.body",
+            "body": _format_sse(event.kind, subscription.render(event), sequence),
+            "more_body": True,
+        })
+        live_broadcaster.record_delivery(event)
+
+
+async def live_stream_app(scope, receive, send) -> None:
+    """
+    GET /api/live/?token=<jwt>&topics=claims,events,kpi&claim_id=<id>
+
+    EventSource no permite cabeceras propias, por eso el token también se acepta por query string.
+    """
+    if scope["method"] != "GET":
+        await _send_json(send, scope, 405, "Método no permitido")
+        return
+    subscription = await _open_subscription(scope, send)
+    if subscription is None:
+        return
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ] + _cors_headers(scope),
+    })
+    live_broadcaster.ensure_started()
+    live_broadcaster.subscribe(subscription)
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+                subscription.close()
+                return
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({
+            "type": "http.response.body",
+            "body": f"retry: {settings.LIVE_RETRY_MS}\n\n".encode()
+            + _format_sse("ready", {"topics": sorted(subscription.topics)}),
+            "more_body": True,
+        })
+        await _send_events(send, subscription, disconnected)
+        if not disconnected.is_set():
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        watcher.cancel()
+        live_broadcaster.unsubscribe(subscription)
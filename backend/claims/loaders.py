@@ -0,0 +1,67 @@
+"""
+Carga por lotes de objetos relacionados durante un request, al estilo DataLoader.
+
+Las vistas registran primero todos los ids que van a necesitar (load) y recién al leer el primero
+(get) se resuelven todos los pendientes de ese tipo con un único $in; los siguientes accesos salen
+de lo ya cargado. Los loaders viven en el request, así que nada se comparte entre usuarios.
+"""
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from .repositories import get_areas_by_ids, get_projects_by_ids, get_users_by_ids
+
+BatchFunction = Callable[[Iterable[str]], Dict[str, Dict[str, Any]]]
+
+
+class BatchLoader:
+    def __init__(self, batch_fn: BatchFunction) -> None:
+        self._batch_fn = batch_fn
+        self._pending: Set[str] = set()
+        self._loaded: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.batches = 0
+
+    def load(self, key: Any) -> None:
+        """Anota un id para la próxima consulta; no toca la base."""
+        if key:
+            key = str(key)
+            if key not in self._loaded:
+                self._pending.add(key)
+
+    def load_many(self, keys: Iterable[Any]) -> None:
+        for key in keys:
+            self.load(key)
+
+    def get(self, key: Any) -> Optional[Dict[str, Any]]:
+        if not key:
+            return None
+        key = str(key)
+        if key not in self._loaded:
+            self._pending.add(key)
+        if self._pending:
+            self._dispatch()
+        return self._loaded.get(key)
+
+    def _dispatch(self) -> None:
+        keys, self._pending = self._pending, set()
+        found = self._batch_fn(keys)
+        self.batches += 1
+        for key in keys:
+            # Los ids inexistentes también se recuerdan para no volver a consultarlos
+            self._loaded[key] = found.get(key)
+
+
+class RequestLoaders:
+    """Un loader por colección relacionada."""
+
+    def __init__(self) -> None:
+        self.projects = BatchLoader(get_projects_by_ids)
+        self.areas = BatchLoader(get_areas_by_ids)
+        self.users = BatchLoader(get_users_by_ids)
+
+
+def loaders_for(request) -> RequestLoaders:
+    """Loaders del request actual, creados al primer uso."""
+    loaders = getattr(request, "_claims_loaders", None)
+    if loaders is None:
+        loaders = RequestLoaders()
+        request._claims_loaders = loaders
+    return loaders
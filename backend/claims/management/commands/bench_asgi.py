@@ -0,0 +1,185 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from claims.auth import generate_token
+from claims.db import get_main_db
+from claims.repositories import get_user_by_email, serialize
+
+# Rutas medidas: la versión síncrona (DRF) y su par async; {claim_id} se completa con un reclamo real
+ENDPOINTS = {
+    "detalle": ("/api/claims/{claim_id}/", "/api/async/claims/{claim_id}/"),
+    "timeline": ("/api/claims/{claim_id}/timeline/", "/api/async/claims/{claim_id}/timeline/"),
+    "feedback": ("/api/claims/{claim_id}/feedback/", "/api/async/claims/{claim_id}/feedback/"),
+    "listado": ("/api/claims/?status=Ingresado", "/api/async/claims/?status=Ingresado"),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return
+        except urllib.error.HTTPError:
+            # Cualquier respuesta HTTP (403 sin token) significa que el servidor ya atiende
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"El servidor no respondió en {timeout:.0f}s: {url}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el despliegue WSGI (gunicorn con hilos, vistas DRF) contra el ASGI (uvicorn, vistas async) "
+        "con la misma cantidad de núcleos, midiendo req/s y latencias sobre las vistas de reclamos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cores", type=int, default=2, help="Núcleos y workers asignados a cada servidor")
+        parser.add_argument("--threads", type=int, default=8, help="Hilos por worker en gunicorn (WSGI)")
+        parser.add_argument("--concurrency", type=int, default=64, help="Requests simultáneos del generador")
+        parser.add_argument("--requests", type=int, default=2000, help="Requests por endpoint y despliegue")
+        parser.add_argument("--email", help="Usuario con el que se firma el token (por defecto el primer admin)")
+        parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+
+    def handle(self, *args, **options):
+        if options["email"]:
+            user = get_user_by_email(options["email"])
+        else:
+            user = serialize(get_main_db().users.find_one({"role": "admin", "is_active": {"$ne": False}}))
+        if not user:
+            raise CommandError("No se encontró el usuario para firmar el token; use --email o create_admin")
+        claim = serialize(get_main_db().claims.find_one({}, sort=[("created_at", -1)]))
+        if not claim:
+            raise CommandError("No hay reclamos para medir; ejecute populate_db primero")
+        token = generate_token(user)
+
+        cores = options["cores"]
+        available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+        if available and cores > len(available):
+            raise CommandError(f"Solo hay {len(available)} núcleos disponibles")
+        if len(available) > cores:
+            # El generador de carga corre en los núcleos restantes para no competir con los servidores
+            os.sched_setaffinity(0, available[cores:])
+
+        deployments = {
+            "wsgi": [
+                sys.executable, "-m", "gunicorn", "config.wsgi:application",
+                "--workers", str(cores), "--threads", str(options["threads"]), "--log-level", "warning",
+            ],
+            "asgi": [
+                sys.executable, "-m", "uvicorn", "config.asgi:application",
+                "--workers", str(cores), "--log-level", "warning", "--no-access-log",
+            ],
+        }
+
+        self.stdout.write(
+            f"⚙️  {cores} núcleos por despliegue, {options['concurrency']} requests simultáneos, "
+            f"{options['requests']} requests por endpoint"
+        )
+        results: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for name, command in deployments.items():
+            port = _free_port()
+            if name == "wsgi":
+                command = command + ["--bind", f"127.0.0.1:{port}"]
+            else:
+                command = command + ["--host", "127.0.0.1", "--port", str(port)]
+            results[name] = self._measure(name, command, port, available[:cores], token, claim["id"], options)
+
+        self.stdout.write("")
+        self.stdout.write(f"{'endpoint':<10} {'wsgi req/s':>11} {'asgi req/s':>11} {'wsgi p95':>9} {'asgi p95':>9}")
+        for endpoint in options["endpoints"]:
+            wsgi, asgi = results["wsgi"][endpoint], results["asgi"][endpoint]
+            self.stdout.write(
+                f"{endpoint:<10} {wsgi['rps']:>11.0f} {asgi['rps']:>11.0f} "
+                f"{wsgi['p95']:>7.1f}ms {asgi['p95']:>7.1f}ms"
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Comparación completada"))
+
+    def _measure(self, name, command, port, cpus, token, claim_id, options) -> Dict[str, Dict[str, float]]:
+        def pin():
+            # Ambos despliegues quedan limitados a los mismos núcleos
+            if cpus:
+                os.sched_setaffinity(0, cpus)
+
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings")}
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, preexec_fn=pin)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            _wait_ready(base_url + "/api/areas/", timeout=60)
+            measured = {}
+            for endpoint in options["endpoints"]:
+                sync_path, async_path = ENDPOINTS[endpoint]
+                path = (async_path if name == "asgi" else sync_path).format(claim_id=claim_id)
+                measured[endpoint] = self._load(base_url + path, token, options)
+                self.stdout.write(
+                    f"  {name} {endpoint:<9} {measured[endpoint]['rps']:>7.0f} req/s  "
+                    f"p50 {measured[endpoint]['p50']:.1f} ms  p95 {measured[endpoint]['p95']:.1f} ms  "
+                    f"errores {measured[endpoint]['errors']:.0f}"
+                )
+            return measured
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    @staticmethod
+    def _load(url: str, token: str, options) -> Dict[str, float]:
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies: List[float] = []
+        errors = 0
+        lock = threading.Lock()
+
+        def call(_):
+            nonlocal errors
+            request = urllib.request.Request(url, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    json.loads(response.read())
+                ok = True
+            except (OSError, ValueError):
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+        # Calentamiento: conexiones, cachés y clientes de Mongo de cada worker
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            list(executor.map(call, range(min(200, options["requests"]))))
+        latencies.clear()
+        errors = 0
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            list(executor.map(call, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        ordered = sorted(latencies) or [0.0]
+        return {
+            "rps": len(latencies) / elapsed if elapsed else 0.0,
+            "p50": statistics.median(ordered),
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "errors": float(errors),
+        }
@@ -0,0 +1,172 @@
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+from bson.codec_options import DEFAULT_CODEC_OPTIONS
+from django.core.management.base import BaseCommand
+
+from claims.codec import API_TYPE_REGISTRY, to_api
+from claims.db import serialize
+from claims.presenters import claim_presenter, present_project, present_user
+
+
+def _users(rows: int, rng: random.Random) -> list:
+    areas = [ObjectId() for _ in range(8)]
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "email": f"usuario{i}@example.com",
+            "password": "pbkdf2_sha256$600000$" + "x" * 66,
+            "role": "employee" if i % 4 else "client",
+            "full_name": f"Usuario {i}",
+            "area_id": rng.choice(areas),
+            "company_name": None,
+            "is_active": True,
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i + 1),
+        }
+        for i in range(rows)
+    ]
+
+
+def _projects(rows: int, rng: random.Random) -> list:
+    clients = [ObjectId() for _ in range(200)]
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Proyecto {i}",
+            "project_type": rng.choice(["web", "mobile", "infra"]),
+            "client_id": rng.choice(clients),
+            "is_active": True,
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i + 1),
+        }
+        for i in range(rows)
+    ]
+
+
+def _claims(rows: int, rng: random.Random) -> list:
+    projects = [ObjectId() for _ in range(50)]
+    clients = [ObjectId() for _ in range(200)]
+    areas = [ObjectId() for _ in range(8)]
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "project_id": rng.choice(projects),
+            "claim_type": "Error de login",
+            "priority": rng.choice(["Baja", "Media", "Alta"]),
+            "severity": "S2 - Alto",
+            "description": f"El sistema no responde al procesar la operación {i}",
+            "status": rng.choice(["Ingresado", "En Proceso", "Resuelto"]),
+            "area_id": rng.choice(areas),
+            "sub_area": None,
+            "created_by": rng.choice(clients),
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i + 5),
+        }
+        for i in range(rows)
+    ]
+
+
+def _legacy_user(user: dict) -> dict:
+    # serialize() + la copia que hacía _present_user
+    data = serialize(user).copy()
+    data.pop("password", None)
+    if data.get("area_id"):
+        data["area_id"] = str(data["area_id"])
+    return data
+
+
+def _legacy_project(project: dict) -> dict:
+    data = serialize(project).copy()
+    if data.get("client_id"):
+        data["client_id"] = str(data["client_id"])
+    return data
+
+
+def _legacy_claim(claim: dict) -> dict:
+    return claim_presenter()(serialize(claim))
+
+
+def _codec_claim(claim: dict) -> dict:
+    return claim_presenter()(to_api(claim))
+
+
+# listado -> (generador, presentación actual, presentación con el codec, campos que excluye la proyección)
+ENDPOINTS = {
+    "usuarios": (_users, _legacy_user, lambda doc: present_user(to_api(doc)), ("password",)),
+    "proyectos": (_projects, _legacy_project, lambda doc: present_project(to_api(doc)), ()),
+    "reclamos": (_claims, _legacy_claim, _codec_claim, ()),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara decodificar y presentar listados con serialize() y copias por presentador contra el codec "
+        "de la API (ObjectId como texto al decodificar, _id renombrado en el lugar, password fuera de la "
+        "proyección). Informa tiempos y asignaciones por listado. No necesita Mongo: decodifica BSON generado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000)
+        parser.add_argument("--repeat", type=int, default=5, help="Se informa la mejor de las repeticiones")
+        parser.add_argument("--seed", type=int, default=7)
+        parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        api_options = DEFAULT_CODEC_OPTIONS.with_options(type_registry=API_TYPE_REGISTRY)
+        self.stdout.write(
+            f"⚙️  {options['rows']} documentos por listado, mejor de {options['repeat']} repeticiones"
+        )
+        self.stdout.write(
+            f"{'listado':<10} {'variante':<8} {'tiempo':>9} {'bloques':>10} {'pico':>10} {'retenido':>10}"
+        )
+        for endpoint in options["endpoints"]:
+            generate, legacy, codec, excluded = ENDPOINTS[endpoint]
+            docs = generate(options["rows"], rng)
+            # Lo que llega del servidor: el batch completo, y sin los campos excluidos por la proyección
+            raw = b"".join(bson.encode(doc) for doc in docs)
+            projected = b"".join(
+                bson.encode({key: value for key, value in doc.items() if key not in excluded}) for doc in docs
+            )
+            variants = (
+                ("actual", raw, DEFAULT_CODEC_OPTIONS, legacy),
+                ("codec", projected, api_options, codec),
+            )
+            results = {}
+            for name, payload, codec_options, present in variants:
+
+                def run():
+                    return [present(doc) for doc in bson.decode_all(payload, codec_options)]
+
+                best = float("inf")
+                for _ in range(max(1, options["repeat"])):
+                    started = time.perf_counter()
+                    run()
+                    best = min(best, time.perf_counter() - started)
+
+                tracemalloc.start()
+                before = tracemalloc.take_snapshot()
+                output = run()
+                after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                stats = after.compare_to(before, "filename")
+                blocks = sum(stat.count_diff for stat in stats)
+                retained = sum(stat.size_diff for stat in stats)
+                results[name] = output
+                self.stdout.write(
+                    f"{endpoint:<10} {name:<8} {best * 1000:>7.1f}ms {blocks:>10} "
+                    f"{peak / 1024:>8.0f}KB {retained / 1024:>8.0f}KB"
+                )
+                del output
+            if results["actual"] != results["codec"]:
+                self.stdout.write(self.style.ERROR(f"❌ {endpoint}: el codec no produce la misma salida"))
+        self.stdout.write(self.style.SUCCESS("✅ Medición completada"))
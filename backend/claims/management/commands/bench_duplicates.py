@@ -0,0 +1,145 @@
+import random
+import statistics
+import struct
+import time
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+
+from claims.db import get_main_db
+from claims.dedup import NUM_PERMUTATIONS, band_keys, claim_text, estimate_similarity, minhash_signature
+
+BATCH_SIZE = 10000
+_SIGNATURE_FORMAT = f"<{NUM_PERMUTATIONS}I"
+COLLECTION = "bench_claim_signatures"
+
+BASE_TEXTS = [
+    ("Error de login", "El sistema no permite iniciar sesión con usuarios del dominio corporativo"),
+    ("Caída de servidor", "El servidor de producción dejó de responder a las solicitudes desde las 10 horas"),
+    ("Facturación", "Las facturas del mes se generan con montos duplicados para algunos clientes"),
+    ("Rendimiento", "La pantalla de reportes tarda más de un minuto en cargar el listado completo"),
+    ("Integración", "La API externa devuelve error 500 al sincronizar los pedidos nuevos"),
+]
+
+
+def _variant(text: str, rng: random.Random) -> str:
+    words = text.split()
+    index = rng.randrange(len(words))
+    words[index] = words[index] + rng.choice(["", "s", "."])
+    return " ".join(words) + rng.choice(["", " urgente", " por favor", " nuevamente"])
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la búsqueda de duplicados por LSH sobre una colección sintética "
+        "(por defecto un millón de firmas) frente a la comparación exhaustiva"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--claims", type=int, default=1_000_000)
+        parser.add_argument("--projects", type=int, default=2000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--brute-force", type=int, default=3, help="Consultas a medir con comparación exhaustiva")
+        parser.add_argument("--keep", action="store_true", help="No eliminar la colección sintética al terminar")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        db = get_main_db()
+        collection = db[COLLECTION]
+        collection.drop()
+        collection.create_index([("project_id", 1), ("created_by", 1), ("bands", 1)])
+
+        projects = [(ObjectId(), ObjectId()) for _ in range(options["projects"])]
+        planted = self._seed(collection, rng, projects, options["claims"], options["queries"])
+
+        latencies = []
+        candidates = []
+        recall_hits = 0
+        for query in planted:
+            started = time.perf_counter()
+            found = list(
+                collection.find(
+                    {
+                        "project_id": query["project_id"],
+                        "created_by": query["created_by"],
+                        "bands": {"$in": query["bands"]},
+                    },
+                    {"signature": 1},
+                )
+            )
+            matches = [doc for doc in found if estimate_similarity(query["signature"], doc.get("signature")) >= 0.5]
+            latencies.append((time.perf_counter() - started) * 1000)
+            candidates.append(len(found))
+            recall_hits += 1 if any(doc["_id"] == query["duplicate_of"] for doc in matches) else 0
+
+        plan = collection.find(
+            {"project_id": planted[0]["project_id"], "created_by": planted[0]["created_by"],
+             "bands": {"$in": planted[0]["bands"]}}
+        ).explain()
+        execution = plan.get("executionStats", {})
+
+        latencies.sort()
+        self.stdout.write(f"📦 Firmas en la colección: {collection.estimated_document_count()}")
+        self.stdout.write(f"🔎 Consultas LSH: {len(latencies)}")
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(f"  p50 {statistics.median(latencies):.2f} ms · p95 {p95:.2f} ms")
+        self.stdout.write(f"  candidatos promedio: {statistics.mean(candidates):.1f}")
+        self.stdout.write(f"  duplicados sembrados encontrados: {recall_hits}/{len(planted)}")
+        if execution:
+            self.stdout.write(
+                f"  plan: {execution.get('totalKeysExamined')} claves y "
+                f"{execution.get('totalDocsExamined')} documentos examinados"
+            )
+
+        if options["brute_force"]:
+            timings = []
+            for query in planted[:options["brute_force"]]:
+                started = time.perf_counter()
+                for doc in collection.find({}, {"signature": 1}).batch_size(BATCH_SIZE):
+                    estimate_similarity(query["signature"], doc.get("signature"))
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f"🐢 Comparación exhaustiva: {statistics.mean(timings):.0f} ms por consulta")
+
+        if not options["keep"]:
+            collection.drop()
+
+    def _seed(self, collection, rng, projects, total, queries):
+        """
+        Inserta `total` firmas. El relleno lleva firmas aleatorias de NUM_PERMUTATIONS enteros de 32 bits
+        con sus claves de banda: textos no relacionados casi nunca comparten bandas, que es lo que importa
+        para medir el índice, y la comparación exhaustiva compara firmas completas como lo haría con datos
+        reales. Los duplicados sembrados se calculan con MinHash real.
+        """
+        planted = []
+        batch = []
+        for index in range(queries):
+            project_id, client_id = rng.choice(projects)
+            claim_type, description = rng.choice(BASE_TEXTS)
+            original = minhash_signature(claim_text(claim_type, f"{description} {index}"))
+            duplicate = minhash_signature(claim_text(claim_type, _variant(f"{description} {index}", rng)))
+            original_id = ObjectId()
+            batch.append({"_id": original_id, "project_id": project_id, "created_by": client_id,
+                          "signature": original, "bands": band_keys(original)})
+            planted.append({"project_id": project_id, "created_by": client_id, "signature": duplicate,
+                            "bands": band_keys(duplicate), "duplicate_of": original_id})
+
+        inserted = len(batch)
+        while inserted < total:
+            project_id, client_id = rng.choice(projects)
+            signature = list(struct.unpack(_SIGNATURE_FORMAT, rng.randbytes(NUM_PERMUTATIONS * 4)))
+            batch.append({
+                "project_id": project_id,
+                "created_by": client_id,
+                "signature": signature,
+                "bands": band_keys(signature),
+            })
+            inserted += 1
+            if len(batch) >= BATCH_SIZE:
+                collection.insert_many(batch, ordered=False)
+                batch = []
+                if inserted % 100_000 == 0:
+                    self.stdout.write(f"  … {inserted} firmas insertadas")
+        if batch:
+            collection.insert_many(batch, ordered=False)
+        return planted
@@ -0,0 +1,116 @@
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from claims import renderers
+from claims.presenters import claim_presenter
+from claims.repositories import ALLOWED_PRIORITIES, ALLOWED_STATUSES
+from claims.serializers import ClaimSerializer
+
+
+def _claims(rows: int, seed: int) -> list:
+    """Reclamos con la forma que devuelve serialize(): id en texto, referencias como ObjectId."""
+    rng = random.Random(seed)
+    projects = [ObjectId() for _ in range(50)]
+    clients = [ObjectId() for _ in range(200)]
+    areas = [ObjectId() for _ in range(8)] + [None]
+    start = datetime(2024, 1, 1)
+    docs = []
+    for i in range(rows):
+        doc = {
+            "id": str(ObjectId()),
+            "project_id": rng.choice(projects),
+            "claim_type": rng.choice(["Error de login", "Caída de servidor", "Lentitud", "Facturación"]),
+            "priority": rng.choice(ALLOWED_PRIORITIES),
+            "severity": rng.choice(["S1 - Crítico", "S2 - Alto", "S3 - Medio", "S4 - Bajo"]),
+            "description": f"El sistema no responde al procesar la operación {i} del cliente",
+            "status": rng.choice(ALLOWED_STATUSES),
+            "area_id": rng.choice(areas),
+            "sub_area": rng.choice(["Backend", "Frontend", None]),
+            "created_by": rng.choice(clients),
+            "created_at": start + timedelta(minutes=i, milliseconds=rng.randrange(1000)),
+            "updated_at": start + timedelta(minutes=i + 5),
+        }
+        if i % 3 == 0:
+            doc.update(client_rating=rng.randint(1, 5), client_feedback="Resuelto a tiempo")
+        docs.append(doc)
+    return docs
+
+
+def _with_serializer(docs: list) -> list:
+    # Lo que hacía _present_claim antes: ClaimSerializer por fila y los ObjectId a mano
+    results = []
+    for claim in docs:
+        data = ClaimSerializer(claim).data
+        data["project_id"] = str(claim["project_id"])
+        data["area_id"] = str(claim["area_id"]) if claim.get("area_id") else None
+        data["created_by"] = str(claim["created_by"])
+        results.append(data)
+    return results
+
+
+def _with_presenter(docs: list) -> list:
+    present = claim_presenter()
+    results = []
+    for claim in docs:
+        data = present(claim)
+        data["area_id"] = data.get("area_id") or None
+        results.append(data)
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide presentar y renderizar un listado grande de reclamos: ClaimSerializer + JSONRenderer "
+        "contra el presentador precompilado con JSONRenderer y con el renderer orjson. No necesita Mongo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000)
+        parser.add_argument("--repeat", type=int, default=3, help="Se informa la mejor de las repeticiones")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        docs = _claims(options["rows"], options["seed"])
+        variants = [
+            ("serializer + json", _with_serializer, JSONRenderer()),
+            ("presentador + json", _with_presenter, JSONRenderer()),
+        ]
+        if renderers.orjson is not None:
+            variants.append(("presentador + orjson", _with_presenter, renderers.FastJSONRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING("⚠️  orjson no está instalado: se omite el renderer rápido"))
+
+        self.stdout.write(f"⚙️  {len(docs)} reclamos, mejor de {options['repeat']} repeticiones")
+        self.stdout.write(f"{'variante':<22} {'presentar':>10} {'render':>10} {'total':>10} {'filas/s':>10}")
+        reference = None
+        baseline = None
+        for name, present, renderer in variants:
+            best = None
+            for _ in range(max(1, options["repeat"])):
+                started = time.perf_counter()
+                data = present(docs)
+                presented = time.perf_counter()
+                body = renderer.render(data)
+                finished = time.perf_counter()
+                timing = (presented - started, finished - presented)
+                if best is None or sum(timing) < sum(best):
+                    best = timing
+            # Todas las variantes tienen que producir el mismo JSON
+            parsed = json.loads(body)
+            if reference is None:
+                reference = parsed
+            elif parsed != reference:
+                raise CommandError(f"La salida de '{name}' difiere de la del serializer")
+            total = sum(best)
+            baseline = baseline or total
+            self.stdout.write(
+                f"{name:<22} {best[0] * 1000:>8.0f}ms {best[1] * 1000:>8.0f}ms {total * 1000:>8.0f}ms "
+                f"{len(docs) / total:>10.0f}  (x{baseline / total:.1f})"
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Misma salida en todas las variantes"))
@@ -0,0 +1,130 @@
+import asyncio
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+
+from claims.live import LiveBroadcaster, LiveEvent, Subscription, TOPICS, _format_sse
+
+ROLES = ("admin", "employee", "client")
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el reparto de eventos SSE en un proceso: conexiones simultáneas, latencia desde que llega "
+        "el cambio hasta que se escribe en cada conexión y memoria por conexión. No necesita Mongo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=2000)
+        parser.add_argument("--events", type=int, default=500)
+        parser.add_argument("--rate", type=float, default=200, help="Eventos por segundo publicados")
+        parser.add_argument("--claims", type=int, default=200, help="Reclamos distintos en los eventos")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        rng = random.Random(options["seed"])
+        broadcaster = LiveBroadcaster()
+        loop = asyncio.get_running_loop()
+        areas = [str(ObjectId()) for _ in range(5)]
+        clients = [str(ObjectId()) for _ in range(max(1, options["connections"] // 4))]
+        claims = [(str(ObjectId()), rng.choice(clients), rng.choice(areas)) for _ in range(options["claims"])]
+
+        written = 0
+        stopping = asyncio.Event()
+
+        async def consume(subscription: Subscription):
+            nonlocal written
+            sequence = 0
+            while True:
+                event = await subscription.queue.get()
+                if event is None:
+                    return
+                sequence += 1
+                written += len(_format_sse(event.kind, subscription.render(event), sequence))
+                broadcaster.record_delivery(event)
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        subscriptions, tasks = [], []
+        for i in range(options["connections"]):
+            role = ROLES[i % len(ROLES)]
+            subscription = Subscription(
+                role=role,
+                user_id=rng.choice(clients) if role == "client" else str(ObjectId()),
+                area_id=rng.choice(areas) if role == "employee" else None,
+                topics=TOPICS,
+                claim_id=None,
+                loop=loop,
+            )
+            broadcaster.subscribe(subscription)
+            subscriptions.append(subscription)
+            tasks.append(asyncio.create_task(consume(subscription)))
+        await asyncio.sleep(0)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        per_connection = allocated / max(1, options["connections"])
+
+        publish_ms = []
+        targets = []
+
+        def publisher():
+            interval = 1.0 / options["rate"] if options["rate"] > 0 else 0
+            for i in range(options["events"]):
+                claim_id, created_by, area_id = rng.choice(claims)
+                status_to = rng.choice(["En Proceso", "Resuelto"])
+                event = LiveEvent(
+                    topic="events" if i % 2 else "kpi",
+                    kind="claim.event" if i % 2 else "kpi.delta",
+                    claim_id=claim_id,
+                    created_by=created_by,
+                    area_id=area_id,
+                    visibility="public",
+                    payload={
+                        "claim_id": claim_id,
+                        "action": "status_changed",
+                        "details": {"from": "Ingresado", "to": status_to},
+                    },
+                )
+                started = time.perf_counter()
+                targets.append(broadcaster.publish(event))
+                publish_ms.append((time.perf_counter() - started) * 1000)
+                if interval:
+                    time.sleep(interval)
+            loop.call_soon_threadsafe(stopping.set)
+
+        self.stdout.write(
+            f"📡 {options['connections']} conexiones, {options['events']} eventos a {options['rate']:.0f}/s"
+        )
+        started = time.perf_counter()
+        threading.Thread(target=publisher, daemon=True).start()
+        await stopping.wait()
+        # Se espera a que las colas se vacíen antes de cerrar
+        while any(not subscription.queue.empty() for subscription in subscriptions):
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        for subscription in subscriptions:
+            subscription.queue.put_nowait(None)
+        await asyncio.gather(*tasks)
+
+        stats = broadcaster.stats()
+        delivery = stats["delivery_ms"]
+        self.stdout.write(f"  entregas: {stats['delivered']} en {elapsed:.2f}s ({stats['delivered'] / elapsed:.0f}/s)")
+        self.stdout.write(f"  destinatarios por evento: {statistics.mean(targets):.1f}")
+        self.stdout.write(f"  bytes enviados: {written / 1024:.0f} KB")
+        self.stdout.write(
+            f"  publish() p50 {statistics.median(publish_ms):.3f} ms, máx {max(publish_ms):.3f} ms"
+        )
+        self.stdout.write(
+            f"  latencia de reparto p50 {delivery['p50']} ms, p95 {delivery['p95']} ms, máx {delivery['max']} ms"
+        )
+        self.stdout.write(f"  memoria por conexión (cola + tarea): {per_connection / 1024:.1f} KB")
+        self.stdout.write(self.style.SUCCESS("✅ Medición completada"))
@@ -0,0 +1,134 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as handle:
+            return [int(child) for child in handle.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    """RSS y PSS en KB; el PSS reparte las páginas compartidas entre los procesos que las usan."""
+    values = {"rss": 0, "pss": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as handle:
+            for line in handle:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    values[name.lower()] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values
+
+
+class Command(BaseCommand):
+    help = (
+        "Arranca gunicorn con gunicorn.conf.py con y sin preload y compara el tiempo hasta que todos los "
+        "workers están listos y la memoria (RSS y PSS) del master y los workers. Solo Linux."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--threads", type=int, default=4, help="Hilos por worker (solo con gthread)")
+        parser.add_argument("--warmup", type=int, default=200, help="Requests antes de medir la memoria")
+        parser.add_argument("--timeout", type=float, default=120)
+
+    def handle(self, *args, **options):
+        if not os.path.exists("/proc/self/smaps_rollup"):
+            raise CommandError("Se necesita /proc/<pid>/smaps_rollup (Linux) para medir la memoria")
+        results = {}
+        for preload in (False, True):
+            results[preload] = self._measure(preload, options)
+            self._report("preload" if preload else "sin preload", results[preload])
+
+        without, with_preload = results[False], results[True]
+        self.stdout.write("")
+        self.stdout.write(
+            f"🚀 Arranque: {without['ready_ms']:.0f} ms -> {with_preload['ready_ms']:.0f} ms; "
+            f"PSS total: {without['pss_total'] / 1024:.1f} MB -> {with_preload['pss_total'] / 1024:.1f} MB"
+        )
+        self.stdout.write(self.style.SUCCESS("✅ Medición completada"))
+
+    def _measure(self, preload: bool, options) -> Dict[str, float]:
+        port = _free_port()
+        with tempfile.NamedTemporaryFile("r", suffix=".log") as boot_log:
+            env = {
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings"),
+                "GUNICORN_BIND": f"127.0.0.1:{port}",
+                "GUNICORN_WORKERS": str(options["workers"]),
+                "GUNICORN_THREADS": str(options["threads"]),
+                "GUNICORN_PRELOAD": "true" if preload else "false",
+                "GUNICORN_BOOT_LOG": boot_log.name,
+            }
+            started = time.monotonic()
+            process = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "--log-level", "warning"],
+                cwd=settings.BASE_DIR,
+                env=env,
+            )
+            try:
+                boots = self._wait_workers(boot_log.name, options["workers"], options["timeout"], process)
+                ready_ms = (time.monotonic() - started) * 1000
+                url = f"http://127.0.0.1:{port}/api/areas/"
+                for _ in range(options["warmup"]):
+                    try:
+                        urllib.request.urlopen(url, timeout=10).read()
+                    except urllib.error.HTTPError:
+                        # 403 sin token: igual recorre middlewares, DRF y la vista
+                        pass
+                master = _memory_kb(process.pid)
+                workers = [_memory_kb(pid) for pid in _children(process.pid)]
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+        return {
+            "ready_ms": ready_ms,
+            "boot_ms_avg": sum(boots) / len(boots),
+            "boot_ms_max": max(boots),
+            "master_rss": master["rss"],
+            "worker_rss_avg": sum(w["rss"] for w in workers) / max(1, len(workers)),
+            "worker_pss_avg": sum(w["pss"] for w in workers) / max(1, len(workers)),
+            "pss_total": master["pss"] + sum(w["pss"] for w in workers),
+        }
+
+    @staticmethod
+    def _wait_workers(path: str, count: int, timeout: float, process) -> List[float]:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError("gunicorn terminó antes de que arrancaran los workers")
+            with open(path, encoding="utf-8") as handle:
+                lines = handle.read().split()
+            if len(lines) >= count * 2:
+                return [float(value) for value in lines[1::2]]
+            time.sleep(0.05)
+        raise CommandError(f"Los workers no arrancaron en {timeout:.0f}s")
+
+    def _report(self, name: str, result: Dict[str, float]) -> None:
+        self.stdout.write(
+            f"⚙️  {name:<12} listos en {result['ready_ms']:>6.0f} ms "
+            f"(arranque por worker prom {result['boot_ms_avg']:.0f} ms, máx {result['boot_ms_max']:.0f} ms)  "
+            f"RSS master {result['master_rss'] / 1024:.1f} MB, worker {result['worker_rss_avg'] / 1024:.1f} MB  "
+            f"PSS worker {result['worker_pss_avg'] / 1024:.1f} MB, total {result['pss_total'] / 1024:.1f} MB"
+        )
@@ -0,0 +1,280 @@
+import csv
+import gzip
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from claims.db import get_audit_db, get_main_db
+from claims.exports import to_plain
+
+BATCH_SIZE = 5000
+MANIFEST_NAME = "manifest.json"
+
+# Colección -> base, campo de marca de agua y columnas exportadas
+SNAPSHOT_SOURCES: Dict[str, Dict[str, Any]] = {
+    "claims": {
+        "database": "main",
+        "watermark": "updated_at",
+        "fields": [
+            "id", "project_id", "claim_type", "priority", "severity", "description", "status",
+            "area_id", "sub_area", "attachment_path", "attachment_name", "created_by", "created_at",
+            "updated_at", "client_rating", "client_feedback", "resolution_description",
+        ],
+    },
+    "claim_events": {
+        "database": "audit",
+        "watermark": "created_at",
+        "fields": ["id", "claim_id", "actor_id", "actor_role", "action", "visibility", "details", "created_at"],
+    },
+    "client_feedback_messages": {
+        "database": "main",
+        "watermark": "created_at",
+        "fields": ["id", "claim_id", "client_id", "message", "rating", "type", "created_at"],
+    },
+}
+
+
+def _partition_key(doc: Dict[str, Any]) -> str:
+    created_at = doc.get("created_at")
+    return created_at.strftime("%Y-%m") if isinstance(created_at, datetime) else "unknown"
+
+
+def _to_row(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    plain = to_plain(doc)
+    plain["id"] = plain.pop("_id", None)
+    return {field: plain.get(field) for field in fields}
+
+
+class _PartitionFile:
+    """Archivo de partición comprimido que se escribe en un temporal y se reemplaza de forma atómica."""
+
+    def __init__(self, path: Path, fmt: str, fields: List[str]):
+        self.path = path
+        self.fmt = fmt
+        self.fields = fields
+        self.tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        self.rows = 0
+        self._handle = gzip.open(self.tmp_path, "wt", encoding="utf-8", newline="")
+        self._writer = None
+        if fmt == "csv":
+            self._writer = csv.DictWriter(self._handle, fieldnames=fields)
+            self._writer.writeheader()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        if self._writer:
+            self._writer.writerow(
+                {key: json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+                 for key, value in row.items()}
+            )
+        else:
+            self._handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.rows += 1
+
+    def commit(self) -> None:
+        self._handle.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._handle.close()
+        if self.tmp_path.exists():
+            self.tmp_path.unlink()
+
+
+def _read_partition(path: Path, fmt: str):
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as handle:
+        if fmt == "csv":
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = (
+        "Extrae claims, claim_events y client_feedback_messages en particiones mensuales comprimidas. "
+        "Las ejecuciones posteriores solo extraen los documentos modificados desde la última marca de agua."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=str(settings.SNAPSHOT_DIR), help="Directorio de salida")
+        parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson", dest="fmt")
+        parser.add_argument("--full", action="store_true", help="Ignora el manifiesto y reescribe todo")
+        parser.add_argument(
+            "--overlap-minutes",
+            type=int,
+            default=5,
+            help="Margen hacia atrás sobre la marca de agua para tolerar desfasajes de reloj",
+        )
+        parser.add_argument(
+            "--collections",
+            nargs="+",
+            choices=list(SNAPSHOT_SOURCES),
+            default=list(SNAPSHOT_SOURCES),
+        )
+
+    def handle(self, *args, **options):
+        output = Path(options["output"])
+        output.mkdir(parents=True, exist_ok=True)
+        manifest_path = output / MANIFEST_NAME
+        manifest = self._load_manifest(manifest_path)
+
+        if manifest.get("format") and manifest["format"] != options["fmt"] and not options["full"]:
+            raise CommandError(
+                f"El manifiesto fue generado en formato {manifest['format']}; use --full para cambiarlo"
+            )
+
+        overlap = timedelta(minutes=options["overlap_minutes"])
+        lock = threading.Lock()
+        errors: Dict[str, Exception] = {}
+
+        def run(name: str):
+            state = {} if options["full"] else manifest["collections"].get(name, {})
+            since = None
+            if state.get("high_water_mark"):
+                since = datetime.fromisoformat(state["high_water_mark"]) - overlap
+            try:
+                result = self._extract(name, output / name, options["fmt"], since, state)
+            except Exception as exc:  # pylint: disable=broad-except
+                errors[name] = exc
+                return
+            with lock:
+                manifest["collections"][name] = result
+
+        # Claims y eventos de auditoría viven en bases distintas: se extraen en paralelo
+        with ThreadPoolExecutor(max_workers=len(options["collections"])) as executor:
+            list(executor.map(run, options["collections"]))
+
+        manifest["format"] = options["fmt"]
+        manifest["last_run"] = datetime.utcnow().isoformat()
+        self._write_manifest(manifest_path, manifest)
+
+        for name in options["collections"]:
+            if name in errors:
+                self.stdout.write(self.style.ERROR(f"  ✗ {name}: {errors[name]}"))
+                continue
+            state = manifest["collections"][name]
+            self.stdout.write(
+                f"  ✓ {name}: {state['last_extracted']} documentos, "
+                f"{len(state['last_partitions'])} particiones, marca de agua {state['high_water_mark']}"
+            )
+        if errors:
+            raise CommandError("La extracción terminó con errores")
+        self.stdout.write(self.style.SUCCESS("✅ Extracción completada"))
+
+    def _extract(
+        self,
+        name: str,
+        directory: Path,
+        fmt: str,
+        since: Optional[datetime],
+        state: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        source = SNAPSHOT_SOURCES[name]
+        db = get_audit_db() if source["database"] == "audit" else get_main_db()
+        directory.mkdir(parents=True, exist_ok=True)
+
+        query: Dict[str, Any] = {}
+        if since:
+            query[source["watermark"]] = {"$gte": since}
+        high_water_mark = datetime.fromisoformat(state["high_water_mark"]) if state.get("high_water_mark") else None
+        spill, changed_ids, high_water_mark, extracted = self._spill_changes(
+            db[name].find(query).batch_size(BATCH_SIZE), directory, fmt, source, high_water_mark
+        )
+
+        partitions = dict(state.get("partitions", {})) if since else {}
+        for key, changes in spill.items():
+            rows = self._merge_partition(directory / f"{key}.{fmt}.gz", changes, changed_ids[key], fmt, since)
+            partitions[key] = {"rows": rows, "updated_at": datetime.utcnow().isoformat()}
+        if not since:
+            self._drop_stale_partitions(directory, fmt, spill)
+
+        return {
+            "high_water_mark": high_water_mark.isoformat() if high_water_mark else None,
+            "watermark_field": source["watermark"],
+            "partitions": partitions,
+            "last_extracted": extracted,
+            "last_partitions": sorted(spill),
+        }
+
+    @staticmethod
+    def _spill_changes(cursor, directory: Path, fmt: str, source: Dict[str, Any], high_water_mark):
+        """
+        Escribe los documentos cambiados agrupados por mes en archivos temporales. Devuelve (archivos por
+        partición, ids cambiados por partición, nueva marca de agua, cantidad extraída).
+        """
+        fields, watermark = source["fields"], source["watermark"]
+        spill: Dict[str, _PartitionFile] = {}
+        changed_ids: Dict[str, set] = {}
+        extracted = 0
+        try:
+            for doc in cursor:
+                key = _partition_key(doc)
+                if key not in spill:
+                    spill[key] = _PartitionFile(directory / f".changes-{key}.{fmt}.gz", fmt, fields)
+                    changed_ids[key] = set()
+                row = _to_row(doc, fields)
+                spill[key].write(row)
+                changed_ids[key].add(row["id"])
+                mark = doc.get(watermark)
+                if isinstance(mark, datetime) and (high_water_mark is None or mark > high_water_mark):
+                    high_water_mark = mark
+                extracted += 1
+            for partition in spill.values():
+                partition.commit()
+        except Exception:
+            for partition in spill.values():
+                partition.abort()
+            raise
+        return spill, changed_ids, high_water_mark, extracted
+
+    @staticmethod
+    def _merge_partition(
+        target: Path, changes: _PartitionFile, changed_ids: set, fmt: str, since: Optional[datetime]
+    ) -> int:
+        """Reescribe la partición con sus filas sin cambios más las cambiadas; devuelve la cantidad de filas."""
+        merged = _PartitionFile(target, fmt, changes.fields)
+        try:
+            if since and target.exists():
+                for row in _read_partition(target, fmt):
+                    if row.get("id") not in changed_ids:
+                        merged.write(row)
+            for row in _read_partition(changes.path, fmt):
+                merged.write(row)
+            merged.commit()
+        except Exception:
+            merged.abort()
+            raise
+        finally:
+            changes.path.unlink()
+        return merged.rows
+
+    @staticmethod
+    def _drop_stale_partitions(directory: Path, fmt: str, spill: Dict[str, _PartitionFile]) -> None:
+        # En una extracción completa se eliminan las particiones que ya no tienen documentos
+        for stale in directory.glob(f"*.{fmt}.gz"):
+            if not stale.name.startswith(".") and stale.name.split(".")[0] not in spill:
+                stale.unlink()
+
+    @staticmethod
+    def _load_manifest(path: Path) -> Dict[str, Any]:
+        if not path.exists():
+            return {"collections": {}}
+        with open(path, encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        manifest.setdefault("collections", {})
+        return manifest
+
+    @staticmethod
+    def _write_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
@@ -0,0 +1,98 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import OperationFailure
+
+from claims.query_plans import (
+    QUERIES,
+    explain,
+    index_information,
+    representative_params,
+    suggest_index,
+    summarize_plan,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Corre explain('executionStats') sobre las consultas de repositories.py y de las vistas de "
+        "estadísticas con parámetros tomados de la base, marca COLLSCAN, SORT en memoria y consultas que "
+        "examinan muchos más documentos de los que devuelven, y propone índices para claims/indexes.py"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", nargs="+", default=[], help="Solo las consultas cuyo nombre empieza así")
+        parser.add_argument("--max-ratio", type=float, default=10.0, help="Documentos examinados por resultado")
+        parser.add_argument(
+            "--min-docs", type=int, default=100, help="No marcar consultas que examinan menos documentos"
+        )
+        parser.add_argument("--days", type=int, default=90, help="Largo del período de las consultas por fecha")
+        parser.add_argument("--verbose", action="store_true", help="Mostrar también las etapas del plan")
+        parser.add_argument("--strict", action="store_true", help="Terminar con error si hay consultas marcadas")
+
+    def handle(self, *args, **options):
+        queries = [q for q in QUERIES if not options["only"] or q.name.startswith(tuple(options["only"]))]
+        if not queries:
+            raise CommandError("Ninguna consulta del registro coincide con --only")
+        params = representative_params(options["days"])
+        self.stdout.write(f"🔎 Analizando {len(queries)} consultas (período {params['start_date']:%Y-%m-%d} a "
+                          f"{params['end_date']:%Y-%m-%d})")
+
+        flagged = 0
+        suggestions = {}
+        for query in queries:
+            command = query.command(params)
+            problems = self._report_plan(query, command, options)
+            if problems is None:
+                flagged += 1
+            elif problems:
+                flagged += 1
+                self._collect_suggestion(query, command, suggestions)
+
+        if suggestions:
+            self.stdout.write("")
+            self.stdout.write("💡 Índices sugeridos para INDEXES en claims/indexes.py (y subir INDEX_VERSION):")
+            for declaration, names in suggestions.items():
+                self.stdout.write(f"    {declaration}  # {', '.join(names)}")
+
+        self.stdout.write("")
+        if flagged:
+            message = f"⚠️  {flagged} de {len(queries)} consultas con planes a revisar"
+            if options["strict"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Las {len(queries)} consultas usan índices adecuados"))
+
+    def _report_plan(self, query, command, options):
+        """Escribe la línea de la consulta y devuelve sus problemas, o None si el explain falló."""
+        try:
+            summary = summarize_plan(explain(query.database, command))
+        except OperationFailure as exc:
+            self.stdout.write(self.style.ERROR(f"❌ {query.name}: explain falló ({exc.details or exc})"))
+            return None
+
+        problems = summary.problems(options["max_ratio"], options["min_docs"])
+        indexes = ", ".join(summary.indexes) or "sin índice"
+        line = (
+            f"{query.name:<36} {indexes:<42} devueltos {summary.n_returned:>7} "
+            f"docs {summary.docs_examined:>7} claves {summary.keys_examined:>7} {summary.millis:>5} ms"
+        )
+        if not problems:
+            self.stdout.write(f"  ✓ {line}")
+        else:
+            self.stdout.write(self.style.WARNING(f"  ⚠️  {line}"))
+            self.stdout.write(f"      {query.source}: {'; '.join(problems)}")
+        if options["verbose"]:
+            self.stdout.write(f"      plan: {' <- '.join(summary.stages)}")
+        return problems
+
+    def _collect_suggestion(self, query, command, suggestions):
+        proposed = suggest_index(query.database, query.collection, command)
+        if proposed is None:
+            self.stdout.write("      Sin índice sugerido: la consulta no filtra ni ordena por campos indexables")
+        elif proposed.is_covered(index_information(query.database, query.collection)):
+            self.stdout.write(
+                f"      Ya hay un índice con las claves {proposed.spec.index_name}: revisar la selectividad "
+                "de los filtros o si falta correr sync_indexes"
+            )
+        else:
+            suggestions.setdefault(proposed.declaration(), []).append(query.name)
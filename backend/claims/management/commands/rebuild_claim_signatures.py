@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from pymongo import ReplaceOne
+
+from claims.db import get_main_db
+from claims.repositories import build_claim_signature
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Recalcula las firmas MinHash/LSH de todos los reclamos para la detección de duplicados"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--drop", action="store_true", help="Elimina las firmas existentes antes de recalcular")
+
+    def handle(self, *args, **options):
+        db = get_main_db()
+        if options["drop"]:
+            result = db.claim_signatures.delete_many({})
+            self.stdout.write(f"  ✓ {result.deleted_count} firmas eliminadas")
+
+        cursor = db.claims.find(
+            {},
+            {"claim_type": 1, "description": 1, "project_id": 1, "created_by": 1, "created_at": 1},
+        ).batch_size(BATCH_SIZE)
+
+        operations = []
+        total = 0
+        for doc in cursor:
+            signature_doc = build_claim_signature(doc)
+            operations.append(ReplaceOne({"_id": doc["_id"]}, signature_doc, upsert=True))
+            if len(operations) >= BATCH_SIZE:
+                db.claim_signatures.bulk_write(operations, ordered=False)
+                total += len(operations)
+                operations = []
+                self.stdout.write(f"  … {total} firmas")
+        if operations:
+            db.claim_signatures.bulk_write(operations, ordered=False)
+            total += len(operations)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} firmas recalculadas"))
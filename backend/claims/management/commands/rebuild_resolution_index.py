@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from claims.knowledge import resolution_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruye desde Mongo el índice TF-IDF de resoluciones y lo guarda en disco"
+
+    def handle(self, *args, **options):
+        if resolution_index.path.exists():
+            resolution_index.path.unlink()
+        resolution_index._reset()  # pylint: disable=protected-access
+        added = resolution_index.refresh(force=True)
+        resolution_index.save()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Índice de resoluciones con {added} reclamos guardado en {resolution_index.path}"
+        ))
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+from claims.db import get_audit_client, get_main_client
+from claims.indexes import INDEX_VERSION, INDEXES, plan_indexes, sync_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        "Sincroniza los índices de Mongo con el registro de claims/indexes.py: crea los que faltan, recrea "
+        "los que cambiaron, borra los obsoletos y registra la versión aplicada"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Solo muestra los cambios, sin aplicarlos")
+        parser.add_argument(
+            "--keep-obsolete", action="store_true", help="No borrar índices que ya no están declarados"
+        )
+        parser.add_argument(
+            "--wait",
+            type=float,
+            default=0,
+            help="Segundos a esperar que MongoDB responda antes de fallar (los demás errores fallan enseguida)",
+        )
+
+    def handle(self, *args, **options):
+        drop = not options["keep_obsolete"]
+        self._wait_for_mongo(options["wait"])
+        try:
+            if options["dry_run"]:
+                plan = plan_indexes()
+            else:
+                self.stdout.write(f"⏳ Sincronizando {len(INDEXES)} índices declarados (versión {INDEX_VERSION})...")
+                plan = sync_indexes(drop=drop)
+        except PyMongoError as exc:
+            # Un índice único sobre datos duplicados, un IndexOptionsConflict, permisos...: reintentar no sirve
+            raise CommandError(f"No se pudieron sincronizar los índices: {exc}") from exc
+
+        labels = (
+            ("create", "➕ crear"),
+            ("recreate", "🔁 recrear"),
+            ("drop", "🗑️  borrar" if drop else "⏭️  obsoleto"),
+        )
+        changes = 0
+        for key, label in labels:
+            for database, collection, name in plan[key]:
+                changes += 1
+                self.stdout.write(f"  {label}: {database}.{collection}.{name}")
+        if not changes:
+            self.stdout.write("  Sin cambios: los índices ya coinciden con el registro")
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("⚠️  Dry run: no se aplicó ningún cambio"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Índices en la versión {INDEX_VERSION}"))
+
+    def _wait_for_mongo(self, seconds: float) -> None:
+        """Reintenta un ping a las dos bases mientras el servidor no sea alcanzable, hasta seconds segundos."""
+        deadline = time.monotonic() + seconds
+        while True:
+            try:
+                get_main_client().admin.command("ping")
+                get_audit_client().admin.command("ping")
+                return
+            except ConnectionFailure as exc:
+                if time.monotonic() >= deadline:
+                    raise CommandError(f"MongoDB no responde: {exc}") from exc
+                self.stdout.write("⏳ Esperando a MongoDB...")
+                time.sleep(2)
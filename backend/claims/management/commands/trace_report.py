@@ -0,0 +1,99 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from claims.tracing import critical_path, flame_summary, load_traces, trace_files
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Resume las trazas muestreadas de TRACE_DIR por endpoint: latencias, un árbol tipo flame graph con "
+        "el tiempo total y propio de cada span y el camino crítico promedio"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=None, help="Directorio de las trazas (por defecto TRACE_DIR)")
+        parser.add_argument("--view", default=None, help="Solo los endpoints cuyo nombre empieza así")
+        parser.add_argument("--hours", type=float, default=None, help="Solo las trazas de las últimas N horas")
+        parser.add_argument("--min-percent", type=float, default=1.0, help="Ocultar spans con menos de este %%")
+        parser.add_argument("--top", type=int, default=8, help="Tramos del camino crítico a mostrar")
+        parser.add_argument(
+            "--folded", default=None, help="Escribir además las pilas en formato folded (flamegraph.pl, speedscope)"
+        )
+
+    def handle(self, *args, **options):
+        files = trace_files(options["dir"])
+        if not files:
+            raise CommandError("No hay archivos de trazas (traces-*.jsonl) en el directorio")
+        since = datetime.utcnow() - timedelta(hours=options["hours"]) if options["hours"] else None
+        traces = load_traces(files, options["view"], since)
+        if not traces:
+            raise CommandError("Ninguna traza coincide con los filtros")
+
+        by_view = defaultdict(list)
+        for trace in traces:
+            by_view[f"{trace['method']} {trace['view']}"].append(trace)
+        self.stdout.write(f"🔎 {len(traces)} trazas de {len(files)} archivos, {len(by_view)} endpoints")
+
+        folded = []
+        ranked = sorted(by_view.items(), key=lambda item: -sum(t["duration_ms"] for t in item[1]))
+        for endpoint, endpoint_traces in ranked:
+            durations = [trace["duration_ms"] for trace in endpoint_traces]
+            count = len(endpoint_traces)
+            self.stdout.write("")
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"📈 {endpoint}: {count} trazas, p50 {_percentile(durations, 0.5):.1f} ms, "
+                    f"p95 {_percentile(durations, 0.95):.1f} ms, máx {max(durations):.1f} ms"
+                )
+            )
+            self._flame(endpoint_traces, sum(durations), options["min_percent"], folded, endpoint)
+            self._critical(endpoint_traces, sum(durations), options["top"])
+
+        if options["folded"]:
+            with open(options["folded"], "w", encoding="utf-8") as handle:
+                handle.write("\n".join(folded) + "\n")
+            self.stdout.write("")
+            self.stdout.write(self.style.SUCCESS(f"✅ Pilas en formato folded en {options['folded']}"))
+
+    def _flame(self, traces, total_ms, min_percent, folded, endpoint):
+        summary = flame_summary(traces)
+        count = len(traces)
+        children = defaultdict(list)
+        for path in summary:
+            children[path[:-1]].append(path)
+            folded.append(f"{endpoint};{';'.join(path)} {round(summary[path]['self_ms'] * 1000)}")
+
+        def show(path):
+            entry = summary[path]
+            percent = entry["total_ms"] / total_ms * 100 if total_ms else 0.0
+            if percent < min_percent:
+                return
+            indent = "  " * len(path)
+            self.stdout.write(
+                f"  {indent}{path[-1]:<{max(8, 48 - len(indent))}} {percent:5.1f}%  "
+                f"{entry['total_ms'] / count:8.2f} ms / {entry['self_ms'] / count:8.2f} ms  "
+                f"x{entry['calls'] / count:.1f}"
+            )
+            for child in sorted(children[path], key=lambda p: -summary[p]["total_ms"]):
+                show(child)
+
+        self.stdout.write("  Spans (promedio por request: total / propio, llamadas):")
+        for root in sorted(children[()], key=lambda p: -summary[p]["total_ms"]):
+            show(root)
+
+    def _critical(self, traces, total_ms, top):
+        totals = defaultdict(float)
+        for trace in traces:
+            for label, ms in critical_path(trace):
+                totals[label] += ms
+        self.stdout.write("  Camino crítico (promedio por request):")
+        for label, ms in sorted(totals.items(), key=lambda item: -item[1])[:top]:
+            percent = ms / total_ms * 100 if total_ms else 0.0
+            self.stdout.write(f"    {label:<46} {ms / len(traces):8.2f} ms  {percent:5.1f}%")
@@ -0,0 +1,391 @@
+"""
+Métricas de runtime en el formato de texto de Prometheus, sin dependencias.
+
+Cada proceso acumula contadores, gauges e histogramas en memoria (registry). Con METRICS_DIR, que
+gunicorn.conf.py exporta a todos sus workers, cada proceso vuelca su estado a METRICS_DIR/<pid>.json
+como mucho una vez cada METRICS_FLUSH_SECONDS y al terminar, y /metrics (lo atienda el worker que lo
+atienda) vuelca el propio y suma los archivos de todos. Los contadores e histogramas de workers que ya
+terminaron se siguen sumando, si no los totales bajarían cada vez que gunicorn recicla uno; sus gauges
+se descartan con mark_process_dead. Sin METRICS_DIR (runserver, uvicorn) las métricas son del proceso.
+
+Los contadores de los pools de conexiones (claims/monitoring.py) y de las cachés no se instrumentan acá:
+se copian de sus objetos al registry justo antes de cada volcado (_collect_process_stats).
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from pymongo import monitoring
+
+from .instrumentation import command_collection
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, registry: "Registry", name: str, documentation: str, labelnames: Sequence[str]) -> None:
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples: Dict[Labels, Any] = {}
+
+    def _key(self, labels: Sequence[Any]) -> Labels:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+        return tuple("" if value is None else str(value) for value in labels)
+
+    def dump(self) -> Dict[str, Any]:
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": [[list(labels), value] for labels, value in self.samples.items()],
+        }
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self.registry.lock:
+            self.samples[key] = self.samples.get(key, 0.0) + amount
+
+    def set(self, value: float, *labels: Any) -> None:
+        """Para contadores que lleva otro objeto (pools, cachés) y se copian antes de volcar."""
+        key = self._key(labels)
+        with self.registry.lock:
+            self.samples[key] = float(value)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames, buckets: Sequence[float]) -> None:
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        with self.registry.lock:
+            # [cuenta por bucket (no acumulada), +Inf, suma]
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            sample[index] += 1
+            sample[-1] += value
+
+    @contextmanager
+    def time(self, *labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def dump(self) -> Dict[str, Any]:
+        data = super().dump()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, Metric] = {}
+        self._flush_lock = threading.Lock()
+        self._flushed_at = 0.0
+
+    def _add(self, metric: Metric) -> Any:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(self, name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]
+    ) -> Histogram:
+        return self._add(Histogram(self, name, documentation, labelnames, buckets))
+
+    def reset(self) -> None:
+        """Descarta lo acumulado (un worker recién forkeado no cuenta lo que hizo el master)."""
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.samples = {}
+            self._flushed_at = 0.0
+
+    def dump(self) -> Dict[str, Any]:
+        _collect_process_stats()
+        with self.lock:
+            return {name: metric.dump() for name, metric in self.metrics.items()}
+
+    # -------- Multiproceso --------
+    def flush(self) -> None:
+        directory = metrics_dir()
+        if directory is None:
+            return
+        path = directory / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        with self._flush_lock:
+            directory.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps({"pid": os.getpid(), "metrics": self.dump()}), encoding="utf-8")
+            os.replace(tmp, path)
+            self._flushed_at = time.monotonic()
+
+    def maybe_flush(self) -> None:
+        if metrics_dir() is not None and time.monotonic() - self._flushed_at >= settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def collect(self) -> Dict[str, Any]:
+        """Las métricas de todos los procesos sumadas; sin METRICS_DIR, las de este."""
+        directory = metrics_dir()
+        merged: Dict[str, Any] = {}
+        if directory is None:
+            _merge(merged, self.dump())
+            return merged
+        self.flush()
+        for path in sorted(directory.glob("*.json")):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue  # un worker que está muriendo a mitad de escritura: se suma en el próximo scrape
+            _merge(merged, data["metrics"])
+        return merged
+
+
+def _merge(merged: Dict[str, Any], metrics: Dict[str, Any]) -> None:
+    for name, metric in metrics.items():
+        target = merged.setdefault(name, {**metric, "samples": {}})
+        if metric.get("buckets") != target.get("buckets"):
+            continue  # cambiaron los buckets entre versiones: se queda con los del primer archivo
+        samples = target["samples"]
+        for labels, value in metric["samples"]:
+            key = tuple(labels)
+            if key not in samples:
+                samples[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                samples[key] = [a + b for a, b in zip(samples[key], value)]
+            else:
+                samples[key] += value
+
+
+def metrics_dir() -> Optional[Path]:
+    return Path(settings.METRICS_DIR) if settings.METRICS_DIR else None
+
+
+def mark_process_dead(pid: int, directory: Optional[str] = None) -> None:
+    """
+    Quita los gauges de un worker que terminó; sus contadores e histogramas se siguen sumando. El master
+    de gunicorn pasa el directorio porque sin preload no tiene Django configurado.
+    """
+    base = Path(directory) if directory else metrics_dir()
+    if base is None:
+        return
+    path = base / f"{pid}.json"
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return
+    data["metrics"] = {name: metric for name, metric in data["metrics"].items() if metric["type"] != "gauge"}
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def clear_metrics_dir(directory: Optional[str] = None) -> None:
+    """Al arrancar el master: los archivos de una corrida anterior no deben sumarse a esta."""
+    directory = Path(directory) if directory else metrics_dir()
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("*.json"):
+        path.unlink(missing_ok=True)
+
+
+# -------- Formato de texto --------
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _with_hit_ratios(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    hits = metrics.get("claims_cache_hits_total", {}).get("samples", {})
+    misses = metrics.get("claims_cache_misses_total", {}).get("samples", {})
+    ratios = {}
+    for key, value in hits.items():
+        total = value + misses.get(key, 0)
+        if total:
+            ratios[key] = value / total
+    metrics["claims_cache_hit_ratio"] = {
+        "type": "gauge",
+        "help": "Aciertos sobre consultas a la caché, sumando todos los procesos.",
+        "labelnames": ["cache"],
+        "samples": ratios,
+    }
+    return metrics
+
+
+def render(metrics: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    for name, metric in sorted(_with_hit_ratios(metrics).items()):
+        samples = metric["samples"]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labelnames"]
+        for labels, value in sorted(samples.items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + [float("inf")], value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(names, labels, ('le', _number(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset)
+
+http_requests = registry.counter(
+    "claims_http_requests_total", "Requests atendidos por vista (nombre de URL), método y status.",
+    ("view", "method", "status"),
+)
+http_request_seconds = registry.histogram(
+    "claims_http_request_duration_seconds", "Duración de los requests por vista y método.",
+    ("view", "method"), REQUEST_BUCKETS,
+)
+mongo_command_seconds = registry.histogram(
+    "claims_mongo_command_duration_seconds", "Duración de los comandos de Mongo por base, colección y operación.",
+    ("database", "collection", "command"), MONGO_BUCKETS,
+)
+mongo_command_failures = registry.counter(
+    "claims_mongo_command_failures_total", "Comandos de Mongo que fallaron, por base, colección y operación.",
+    ("database", "collection", "command"),
+)
+password_hash_seconds = registry.histogram(
+    "claims_password_hash_seconds", "Tiempo de hashear (hash) o verificar (verify) una contraseña.",
+    ("operation",), HASH_BUCKETS,
+)
+pool_checkouts = registry.counter(
+    "claims_mongo_pool_checkouts_total", "Conexiones tomadas del pool.", ("client",)
+)
+pool_checkout_failures = registry.counter(
+    "claims_mongo_pool_checkout_failures_total", "Checkouts fallidos por motivo.", ("client", "reason")
+)
+pool_exhausted = registry.counter(
+    "claims_mongo_pool_exhausted_total", "Checkouts que fallaron por waitQueueTimeoutMS.", ("client",)
+)
+pool_saturated_waits = registry.counter(
+    "claims_mongo_pool_saturated_waits_total", "Checkouts que esperaron con todas las conexiones en uso.", ("client",)
+)
+pool_wait_seconds = registry.counter(
+    "claims_mongo_pool_wait_seconds_total", "Tiempo total esperando una conexión libre.", ("client",)
+)
+pool_in_use = registry.gauge(
+    "claims_mongo_pool_connections_in_use", "Conexiones en uso en este momento.", ("client",)
+)
+pool_open = registry.gauge(
+    "claims_mongo_pool_connections_open", "Conexiones abiertas en este momento.", ("client",)
+)
+pool_max_size = registry.gauge(
+    "claims_mongo_pool_max_size",
+    "maxPoolSize de cada cliente; sumado entre workers es la capacidad total.",
+    ("client",),
+)
+cache_hits = registry.counter("claims_cache_hits_total", "Consultas a la caché que encontraron el dato.", ("cache",))
+cache_misses = registry.counter("claims_cache_misses_total", "Consultas a la caché sin el dato.", ("cache",))
+
+
+def _collect_process_stats() -> None:
+    # Import local: db.py importa este módulo para registrar CommandMetrics
+    from .cache import reference_cache
+    from .monitoring import pool_stats
+    from .presenters import claim_presenter
+
+    for name, stats in pool_stats().items():
+        pool_checkouts.set(stats["checkouts"], name)
+        for reason, count in stats["checkout_failures"].items():
+            pool_checkout_failures.set(count, name, reason)
+        pool_exhausted.set(stats["exhausted"], name)
+        pool_saturated_waits.set(stats["saturated_waits"], name)
+        pool_wait_seconds.set(stats["wait_seconds_total"], name)
+        pool_in_use.set(stats["in_use"], name)
+        pool_open.set(stats["open_connections"], name)
+        pool_max_size.set(stats["max_pool_size"] or 0, name)
+
+    cache_hits.set(reference_cache.hits, "reference")
+    cache_misses.set(reference_cache.misses, "reference")
+    presenters = claim_presenter.cache_info()
+    cache_hits.set(presenters.hits, "claim_presenter")
+    cache_misses.set(presenters.misses, "claim_presenter")
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Latencia de cada comando de Mongo por base, colección y operación (todos, no solo los de requests)."""
+
+    def __init__(self) -> None:
+        self._pending: Dict[Tuple[Any, int], Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                event.database_name,
+                command_collection(event) or "",
+            )
+
+    def _finished(self, event, failed: bool) -> None:
+        with self._lock:
+            started = self._pending.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        database, collection = started
+        mongo_command_seconds.observe(event.duration_micros / 1_000_000, database, collection, event.command_name)
+        if failed:
+            mongo_command_failures.inc(database, collection, event.command_name)
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+
+command_metrics = CommandMetrics()
@@ -0,0 +1,389 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import follow_stream, start_collecting, stop_collecting
+from .metrics import http_request_seconds, http_requests, registry as metrics_registry
+from .profiling import (
+    PROFILE_HEADER,
+    PROFILE_PARAM,
+    discard_profile,
+    profile_requested,
+    requesting_admin,
+    reserve_slot,
+    save_profile,
+    start_profiler,
+    stop_profiler,
+)
+from .tracing import TRACE_HEADER, finish_trace, span, start_trace
+from .query_budgets import QueryBudgetExceeded, check_budget
+
+request_logger = logging.getLogger("claims.requests")
+
+
+def _view_name(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    return (match.url_name or match.view_name) if match else ""
+
+
+class MetricsMiddleware:
+    """
+    Cuenta los requests por vista (nombre de URL), método y status y registra su duración en un
+    histograma (claims/metrics.py). Las rutas que no resuelven van todas como "unmatched" para no abrir
+    una serie por cada URL inventada.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    @staticmethod
+    def _record(request, response, started: float) -> None:
+        view = _view_name(request) or "unmatched"
+        http_request_seconds.observe(time.perf_counter() - started, view, request.method)
+        http_requests.inc(view, request.method, response.status_code)
+        metrics_registry.maybe_flush()
+
+
+class RequestTimingMiddleware:
+    """
+    Atribuye a cada request los comandos de Mongo que emite (clientes main y audit, sync y async) y los
+    resume en el header Server-Timing (db: cantidad y tiempo, app: el resto) y en una línea JSON por
+    request en el logger claims.requests. Si el request tarda más que SLOW_REQUEST_MS la línea va como
+    warning e incluye la lista de comandos con su colección, forma de la consulta y duración.
+
+    El tiempo de db es la suma de los comandos: con consultas en paralelo (run_concurrently) puede
+    superar al total, y app queda en cero.
+
+    En las respuestas en streaming (exportaciones) las consultas corren al iterar el cuerpo, después de
+    enviar los headers: el colector sigue activo hasta que el stream termina, la línea de log se escribe
+    recién entonces y no llevan Server-Timing (sus números no estarían completos). El colector queda en
+    request.command_collector para QueryBudgetMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_INSTRUMENTATION:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token, collector = start_collecting(settings.REQUEST_COMMAND_LOG_LIMIT)
+        request.command_collector = collector
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_collecting(token)
+        self._finish(request, response, collector)
+        return response
+
+    async def __acall__(self, request):
+        token, collector = start_collecting(settings.REQUEST_COMMAND_LOG_LIMIT)
+        request.command_collector = collector
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_collecting(token)
+        self._finish(request, response, collector)
+        return response
+
+    def _finish(self, request, response, collector) -> None:
+        if getattr(response, "streaming", False):
+            follow_stream(response, collector, lambda completed: self._log(request, response, collector))
+            return
+        if settings.SERVER_TIMING_ENABLED:
+            total_ms = collector.elapsed_ms
+            db = collector.summary()
+            response["Server-Timing"] = (
+                f'db;dur={db["db_ms"]:.1f};desc="{db["db_count"]} comandos", '
+                f"app;dur={max(0.0, total_ms - db['db_ms']):.1f}, total;dur={total_ms:.1f}"
+            )
+        self._log(request, response, collector)
+
+    @staticmethod
+    def _log(request, response, collector) -> None:
+        total_ms = collector.elapsed_ms
+        db = collector.summary()
+        app_ms = max(0.0, total_ms - db["db_ms"])
+        slow = settings.SLOW_REQUEST_MS and total_ms >= settings.SLOW_REQUEST_MS
+        level = logging.WARNING if slow else logging.INFO
+        if not request_logger.isEnabledFor(level):
+            return
+        entry = {
+            "method": request.method,
+            "path": request.path,
+            "view": _view_name(request),
+            "status": response.status_code,
+            "duration_ms": round(total_ms, 2),
+            "app_ms": round(app_ms, 2),
+            **db,
+        }
+        if getattr(request, "trace_id", None):
+            entry["trace_id"] = request.trace_id
+        if slow:
+            entry["commands"] = collector.command_log()
+        request_logger.log(level, json.dumps(entry, ensure_ascii=False, default=str))
+
+
+class QueryBudgetMiddleware:
+    """
+    Compara las consultas a Mongo de cada request con el presupuesto de su endpoint
+    (claims/query_budgets.py). Con QUERY_BUDGET_MODE=log el exceso va como warning a claims.requests con
+    la lista de comandos; con raise el request termina en QueryBudgetExceeded. Es para staging: en
+    producción queda en off y no se instala.
+
+    Cuenta con el colector de RequestTimingMiddleware (request.command_collector) en lugar de abrir otro
+    que anote cada comando por segunda vez; solo si ese middleware está desactivado usa uno propio. En
+    las respuestas en streaming el control se hace al terminar el stream, cuando ya corrieron todas las
+    consultas: en modo raise la excepción corta la respuesta a medio enviar.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.QUERY_BUDGET_MODE not in ("log", "raise"):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        collector = getattr(request, "command_collector", None)
+        if collector is not None:
+            return self._finish(request, self.get_response(request), collector)
+        token, collector = start_collecting(settings.REQUEST_COMMAND_LOG_LIMIT)
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_collecting(token)
+        return self._finish(request, response, collector, own=True)
+
+    async def __acall__(self, request):
+        collector = getattr(request, "command_collector", None)
+        if collector is not None:
+            return self._finish(request, await self.get_response(request), collector)
+        token, collector = start_collecting(settings.REQUEST_COMMAND_LOG_LIMIT)
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_collecting(token)
+        return self._finish(request, response, collector, own=True)
+
+    def _finish(self, request, response, collector, own: bool = False):
+        if not getattr(response, "streaming", False):
+            self._check(request, collector)
+        else:
+            # El colector de RequestTimingMiddleware ya lo reactiva ese middleware mientras se itera
+            follow_stream(
+                response, collector if own else None, lambda completed: completed and self._check(request, collector)
+            )
+        return response
+
+    @staticmethod
+    def _check(request, collector) -> None:
+        error = check_budget(_view_name(request), request.method, collector.queries)
+        if error is None:
+            return
+        if settings.QUERY_BUDGET_MODE == "raise":
+            raise QueryBudgetExceeded(error)
+        entry = {"path": request.path, "detail": error, "commands": collector.command_log()}
+        request_logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+class ProfilingMiddleware:
+    """
+    Corre bajo cProfile los requests que un admin marca con X-Profile: 1 o ?profile=1 (claims/profiling.py)
+    y guarda el perfil junto con los comandos de Mongo del request. La respuesta trae en X-Profile el id
+    del perfil, o "rate-limited" / "busy" si no se pudo perfilar; para cualquier otro usuario el flag se
+    ignora sin avisar.
+
+    Con ASGI se perfila el hilo del event loop: sirve para las vistas async, las sync corren en el
+    executor de asgiref y conviene perfilarlas contra gunicorn.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not profile_requested(request):
+            return self.get_response(request)
+        admin, profile_id, refusal = self._reserve(request)
+        if profile_id is None:
+            return self._refused(self.get_response(request), refusal)
+
+        profiler = start_profiler()
+        if profiler is None:
+            discard_profile(profile_id)
+            return self._refused(self.get_response(request), "busy")
+        token, collector = start_collecting(settings.REQUEST_COMMAND_LOG_LIMIT)
+        try:
+            response = self.get_response(request)
+        except Exception:
+            discard_profile(profile_id)
+            raise
+        finally:
+            stop_collecting(token)
+            stop_profiler(profiler)
+        self._save(request, response, admin, profile_id, profiler, collector)
+        return response
+
+    async def __acall__(self, request):
+        if not profile_requested(request):
+            return await self.get_response(request)
+        admin, profile_id, refusal = await sync_to_async(self._reserve)(request)
+        if profile_id is None:
+            return self._refused(await self.get_response(request), refusal)
+
+        profiler = start_profiler()
+        if profiler is None:
+            await sync_to_async(discard_profile)(profile_id)
+            return self._refused(await self.get_response(request), "busy")
+        token, collector = start_collecting(settings.REQUEST_COMMAND_LOG_LIMIT)
+        try:
+            response = await self.get_response(request)
+        except Exception:
+            discard_profile(profile_id)
+            raise
+        finally:
+            stop_collecting(token)
+            stop_profiler(profiler)
+        await sync_to_async(self._save)(request, response, admin, profile_id, profiler, collector)
+        return response
+
+    @staticmethod
+    def _reserve(request):
+        """(admin, id reservado, motivo del rechazo); sin admin no hay motivo que informar."""
+        admin = requesting_admin(request)
+        if admin is None:
+            return None, None, None
+        profile_id = reserve_slot()
+        return admin, profile_id, None if profile_id else "rate-limited"
+
+    @staticmethod
+    def _refused(response, refusal):
+        if refusal:
+            response[PROFILE_HEADER] = refusal
+        return response
+
+    @staticmethod
+    def _save(request, response, admin, profile_id, profiler, collector) -> None:
+        save_profile(
+            profile_id,
+            profiler,
+            {
+                "created_at": datetime.utcnow().isoformat(),
+                "pid": os.getpid(),
+                "admin": admin["email"],
+                "method": request.method,
+                "path": request.path,
+                "query": {key: value for key, value in request.GET.items() if key != PROFILE_PARAM},
+                "view": _view_name(request),
+                "status": response.status_code,
+                "duration_ms": round(collector.elapsed_ms, 2),
+                **collector.summary(),
+                "commands": collector.command_log(),
+            },
+        )
+        response[PROFILE_HEADER] = profile_id
+
+
+class TracingMiddleware:
+    """
+    Abre la traza del request (claims/tracing.py) con un span "view" que cubre la resolución de la URL y
+    la vista, y devuelve el trace id en X-Trace-Id (también va en la línea de claims.requests). Va último
+    en MIDDLEWARE para que el span mida la vista y no el resto de los middlewares.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.TRACING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token, trace = start_trace()
+        request.trace_id = trace.trace_id
+        response = None
+        try:
+            with span("view"):
+                response = self.get_response(request)
+        finally:
+            finish_trace(token, trace, **self._fields(request, response))
+        response[TRACE_HEADER] = trace.trace_id
+        return response
+
+    async def __acall__(self, request):
+        token, trace = start_trace()
+        request.trace_id = trace.trace_id
+        response = None
+        try:
+            with span("view"):
+                response = await self.get_response(request)
+        finally:
+            finish_trace(token, trace, **self._fields(request, response))
+        response[TRACE_HEADER] = trace.trace_id
+        return response
+
+    @staticmethod
+    def _fields(request, response):
+        return {
+            "view": _view_name(request) or "unmatched",
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code if response is not None else 500,
+        }
@@ -0,0 +1,160 @@
+"""
+Métricas de los pools de conexiones de PyMongo (eventos CMAP).
+
+Cada cliente (main, audit, y main-async / audit-async para los de las vistas async) registra un PoolMetrics
+que cuenta checkouts, tiempo esperando una conexión libre y veces que el pool se agotó (checkout que falla
+por waitQueueTimeoutMS o que tuvo que esperar con todas las conexiones en uso). Con eso se dimensiona
+maxPoolSize frente a los hilos de gunicorn y a DB_FANOUT_WORKERS: si max_in_use toca el máximo y crecen las
+esperas, faltan conexiones; si nunca pasa de unas pocas, sobran. Los números son del proceso actual, cada
+worker tiene su propio pool.
+
+Un cliente tiene un pool por servidor (cada miembro del replica set o mongos), cada uno con su propio
+maxPoolSize: las conexiones en uso se llevan por dirección, max_in_use es el pico del pool más cargado y la
+saturación se mira contra el pool del servidor del checkout. "servers" trae el detalle.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from pymongo import monitoring
+
+# Una espera mayor a esto en el checkout cuenta como pool saturado aunque no llegue a fallar
+SATURATED_WAIT_SECONDS = 0.005
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self, name: str, max_pool_size: Optional[int] = None) -> None:
+        self.name = name
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self.checkouts = 0
+            self.checkout_failures: Dict[str, int] = {}
+            self.exhausted = 0
+            self.saturated_waits = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.pools_cleared = 0
+            # Por servidor: {"in_use", "max_in_use", "open_connections"}
+            self.servers: Dict[str, Dict[str, int]] = {}
+
+    def _server(self, event) -> Dict[str, int]:
+        host, port = event.address
+        key = f"{host}:{port}"
+        if key not in self.servers:
+            self.servers[key] = {"in_use": 0, "max_in_use": 0, "open_connections": 0}
+        return self.servers[key]
+
+    # Pool
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    # Conexiones
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+            self._server(event)["open_connections"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+            server = self._server(event)
+            server["open_connections"] = max(0, server["open_connections"] - 1)
+
+    # Checkouts
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                self.exhausted += 1
+
+    def connection_checked_out(self, event):
+        wait = event.duration or 0.0
+        with self._lock:
+            server = self._server(event)
+            self.checkouts += 1
+            server["in_use"] += 1
+            server["max_in_use"] = max(server["max_in_use"], server["in_use"])
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+            if wait >= SATURATED_WAIT_SECONDS and self.max_pool_size and server["in_use"] >= self.max_pool_size:
+                self.saturated_waits += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            server = self._server(event)
+            server["in_use"] = max(0, server["in_use"] - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            servers = {key: dict(server) for key, server in self.servers.items()}
+            return {
+                "client": self.name,
+                "max_pool_size": self.max_pool_size,
+                "since": self.started_at,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "exhausted": self.exhausted,
+                "saturated_waits": self.saturated_waits,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_ms_avg": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+                "in_use": sum(server["in_use"] for server in servers.values()),
+                "max_in_use": max((server["max_in_use"] for server in servers.values()), default=0),
+                "open_connections": sum(server["open_connections"] for server in servers.values()),
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "pools_cleared": self.pools_cleared,
+                "servers": servers,
+            }
+
+
+_metrics: Dict[str, PoolMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def pool_metrics(name: str, max_pool_size: Optional[int] = None) -> PoolMetrics:
+    """
+    El listener del cliente name; se crea una vez por proceso. Los clientes async se registran aparte
+    (main-async) porque tienen sus propios pools.
+    """
+    with _metrics_lock:
+        if name not in _metrics:
+            _metrics[name] = PoolMetrics(name, max_pool_size)
+        return _metrics[name]
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def reset_pool_metrics() -> None:
+    """Pone en cero los contadores (los que hereda un worker forkeado son los del master)."""
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    for metric in metrics:
+        metric.reset()
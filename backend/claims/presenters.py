@@ -0,0 +1,112 @@
+"""
+Presentación de documentos de Mongo para las respuestas de lectura, sin instanciar serializers de DRF.
+
+Los serializers siguen validando las escrituras. Para leer, en cambio, un Serializer recorre sus campos
+con get_attribute/to_representation en cada fila, y en listados de miles de reclamos eso se lleva la
+mayor parte del request. Acá el plan de cada serializer (campo, conversión y qué hacer si falta) se
+arma una sola vez por conjunto de campos y después cada fila es un recorrido de esa tupla, con
+exactamente la misma salida que serializer.data.
+"""
+import functools
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+from bson import ObjectId
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.settings import ISO_8601, api_settings
+
+from .serializers import ClaimSerializer
+
+Presenter = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+# Qué hacer con una clave ausente en el documento, igual que Field.get_attribute de DRF
+_SKIP = object()
+_NULL = object()
+
+
+def _datetime_converter(field: serializers.DateTimeField) -> Callable[[Any], Any]:
+    if settings.USE_TZ and settings.TIME_ZONE == "UTC" and getattr(field, "format", empty) in (empty, None, ISO_8601) \
+            and api_settings.DATETIME_FORMAT == ISO_8601:
+        # Las fechas de Mongo llegan naive en UTC: DRF las vuelve aware en UTC y cambia +00:00 por Z
+        def convert(value):
+            if value.__class__ is datetime and value.tzinfo is None:
+                return value.isoformat() + "Z"
+            return field.to_representation(value)
+
+        return convert
+    return field.to_representation
+
+
+def _converter(field: serializers.Field) -> Callable[[Any], Any]:
+    if type(field) is serializers.CharField:
+        return str
+    if type(field) is serializers.IntegerField:
+        return int
+    if type(field) is serializers.DateTimeField:
+        return _datetime_converter(field)
+    return field.to_representation
+
+
+def _missing(field: serializers.Field) -> Any:
+    if field.default is not empty:
+        return field.get_default()
+    if field.allow_null:
+        return _NULL
+    return _SKIP
+
+
+def compile_presenter(serializer_class, fields: Optional[FrozenSet[str]] = None) -> Presenter:
+    """Arma un presentador con la salida de serializer_class(doc).data, restringida a fields si se indica."""
+    plan = tuple(
+        (name, _converter(field), _missing(field))
+        for name, field in serializer_class().fields.items()
+        if not field.write_only and (fields is None or name in fields)
+    )
+
+    def present(doc: Dict[str, Any]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        get = doc.get
+        for name, convert, missing in plan:
+            value = get(name, _SKIP)
+            if value is _SKIP:
+                if missing is _SKIP:
+                    continue
+                value = None if missing is _NULL else missing
+            out[name] = None if value is None else convert(value)
+        return out
+
+    return present
+
+
+@functools.lru_cache(maxsize=64)
+def claim_presenter(fields: Optional[FrozenSet[str]] = None) -> Presenter:
+    return compile_presenter(ClaimSerializer, fields)
+
+
+def _present_document(doc: Dict[str, Any], hidden: FrozenSet[str]) -> Dict[str, Any]:
+    for key, value in doc.items():
+        if key in hidden or value.__class__ is ObjectId:
+            break
+    else:
+        # Ya viene lista del codec de la API (claims.codec): se devuelve tal cual, sin copiarla
+        return doc
+    # Una sola pasada: se omiten los campos ocultos y los ObjectId quedan como texto
+    return {
+        key: str(value) if value.__class__ is ObjectId else value
+        for key, value in doc.items()
+        if key not in hidden
+    }
+
+
+_USER_HIDDEN = frozenset({"password"})
+_NOTHING_HIDDEN: FrozenSet[str] = frozenset()
+
+
+def present_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    return _present_document(user, _USER_HIDDEN)
+
+
+def present_project(project: Dict[str, Any]) -> Dict[str, Any]:
+    return _present_document(project, _NOTHING_HIDDEN)
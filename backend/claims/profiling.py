@@ -0,0 +1,163 @@
+"""
+Perfilado de un request puntual a pedido de un admin.
+
+Un request con el header X-Profile: 1 (o ?profile=1) y el token de un admin corre bajo cProfile en
+ProfilingMiddleware. El resultado queda en PROFILES_DIR como dos archivos con el mismo id: <id>.prof
+(pstats, se abre con snakeviz o `python -m pstats`) y <id>.json (request, status, duración, resumen de
+Mongo y la lista de comandos con su colección, forma y duración). /api/system/profiles/ los lista y los
+descarga. cProfile mide solo el hilo del request: las consultas que van por run_concurrently aparecen
+como espera en el hilo principal y con su detalle en la lista de comandos.
+
+El límite de PROFILE_RATE_LIMIT perfiles por PROFILE_RATE_WINDOW_SECONDS se cuenta sobre los archivos
+del directorio, así que vale para todos los workers que lo compartan; pasado el límite, o con otro perfil
+en curso en el proceso, el request se atiende igual sin perfilar y la respuesta lo indica en X-Profile.
+"""
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+import jwt
+from django.conf import settings
+
+from .auth import decode_token
+from .repositories import get_user_by_id
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAM = "profile"
+PROFILE_ID = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+
+# cProfile no admite dos perfiles activos a la vez en el mismo proceso (Python 3.12+)
+_active = threading.Lock()
+_slots = threading.Lock()
+
+
+def profile_requested(request) -> bool:
+    flag = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM) or ""
+    return flag.lower() in ("1", "true", "yes")
+
+
+def requesting_admin(request) -> Optional[Dict[str, Any]]:
+    """El admin dueño del token del request, o None. El middleware corre antes que la autenticación de DRF."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = decode_token(token)
+    except jwt.InvalidTokenError:
+        return None
+    if payload.get("role") != "admin":
+        return None
+    user = get_user_by_id(payload.get("sub"))
+    if not user or not user.get("is_active", True) or user.get("role") != "admin":
+        return None
+    return user
+
+
+def profiles_dir() -> Path:
+    return Path(settings.PROFILES_DIR)
+
+
+def profile_path(profile_id: str, suffix: str) -> Optional[Path]:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = profiles_dir() / f"{profile_id}{suffix}"
+    return path if path.exists() else None
+
+
+def _recent_profiles(window_seconds: float) -> int:
+    cutoff = time.time() - window_seconds
+    count = 0
+    for path in profiles_dir().glob("*.json"):
+        try:
+            if path.stat().st_mtime >= cutoff:
+                count += 1
+        except FileNotFoundError:
+            continue
+    return count
+
+
+def reserve_slot() -> Optional[str]:
+    """
+    Un id de perfil si el límite lo permite, o None. El id se reserva escribiendo su .json vacío para que
+    los otros workers lo cuenten desde ya.
+    """
+    directory = profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with _slots:
+        if _recent_profiles(settings.PROFILE_RATE_WINDOW_SECONDS) >= settings.PROFILE_RATE_LIMIT:
+            return None
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid4().hex[:8]}"
+        (directory / f"{profile_id}.json").write_text("{}", encoding="utf-8")
+        return profile_id
+
+
+def start_profiler() -> Optional[cProfile.Profile]:
+    if not _active.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Otra herramienta de profiling activa en el proceso
+        _active.release()
+        return None
+    return profiler
+
+
+def stop_profiler(profiler: cProfile.Profile) -> None:
+    profiler.disable()
+    _active.release()
+
+
+def save_profile(profile_id: str, profiler: cProfile.Profile, metadata: Dict[str, Any]) -> None:
+    directory = profiles_dir()
+    profiler.dump_stats(str(directory / f"{profile_id}.prof"))
+    tmp = directory / f"{profile_id}.json.tmp"
+    tmp.write_text(json.dumps({"id": profile_id, **metadata}, ensure_ascii=False, default=str), encoding="utf-8")
+    os.replace(tmp, directory / f"{profile_id}.json")
+    _prune(directory)
+
+
+def discard_profile(profile_id: str) -> None:
+    for suffix in (".json", ".prof"):
+        (profiles_dir() / f"{profile_id}{suffix}").unlink(missing_ok=True)
+
+
+def _prune(directory: Path) -> None:
+    """Conserva los PROFILE_MAX_KEPT más recientes."""
+    ids = sorted(path.stem for path in directory.glob("*.json"))
+    for profile_id in ids[: max(0, len(ids) - settings.PROFILE_MAX_KEPT)]:
+        discard_profile(profile_id)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Los perfiles guardados, del más nuevo al más viejo, sin la lista de comandos."""
+    profiles = []
+    for path in sorted(profiles_dir().glob("*.json"), reverse=True):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if not data:
+            continue  # reservado, todavía en curso
+        data.pop("commands", None)
+        profiles.append(data)
+    return profiles
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    path = profile_path(profile_id, ".json")
+    if path is None:
+        return None
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data or None
@@ -0,0 +1,102 @@
+"""
+Presupuesto de consultas a Mongo por endpoint.
+
+Cada URL de claims/urls.py declara cuántas consultas puede emitir un request (por método HTTP), sin
+importar cuántas filas devuelva: un listado de 50 reclamos y uno de 5 tienen que costar lo mismo. Se
+cuentan los comandos del colector de claims/instrumentation.py sin getMore ni killCursors (paginar un
+cursor grande no es un N+1). Los números incluyen la búsqueda del usuario autenticado y suponen la caché
+de referencia (áreas y proyectos activos) ya cargada; QUERY_BUDGET_ALLOWANCE cubre la recarga ocasional
+(versión + áreas + proyectos).
+
+QueryBudgetMiddleware los aplica en staging (QUERY_BUDGET_MODE=log|raise) y QueryBudgetMixin
+(claims/testing.py) en los tests.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Union
+
+from django.conf import settings
+
+from .instrumentation import CommandCollector, collect_commands
+
+Budget = Union[int, Dict[str, Optional[int]], None]
+
+QUERY_BUDGETS: Dict[str, Budget] = {
+    "login": {"POST": 1},
+    # Cada sub-request tiene su propio presupuesto; el batch en conjunto crece con la cantidad de rutas
+    "batch": {"POST": None},
+    "area-list": {"GET": 2, "POST": 6},
+    "area-detail": {"GET": 1, "PUT": 6, "DELETE": 4},
+    "sub-area-create": {"POST": 6},
+    "sub-area-detail": {"PUT": 6, "DELETE": 6},
+    "employee-list": {"GET": 2, "POST": 3},
+    "employee-detail": {"GET": 2, "PUT": 4, "DELETE": 3},
+    "client-list": {"GET": 2, "POST": 3},
+    "client-detail": {"GET": 2, "PUT": 4, "DELETE": 3},
+    "project-list": {"GET": 3, "POST": 7},
+    "project-detail": {"GET": 1, "PUT": 6, "DELETE": 6},
+    # Usuario, página (o página + facetas) y un $in por relación incluida
+    "claim-list": {"GET": 3, "POST": 7},
+    "claim-export": {"GET": 4},
+    "claim-search": {"GET": 5},
+    "claim-detail": {"GET": 2, "PUT": 5},
+    "claim-full": {"GET": 5},
+    "claim-action": {"POST": 3},
+    "claim-duplicates": {"GET": 5},
+    "claim-suggestions": {"GET": 3},
+    "claim-comment": {"POST": 3},
+    "client-feedback": {"GET": 3, "POST": 4},
+    # Reclamo, eventos, un $in de usuarios y otro de áreas
+    "claim-timeline": {"GET": 4},
+    "statistics": {"GET": 2},
+    "statistics-by-month": {"GET": 2},
+    "statistics-by-status": {"GET": 2},
+    "statistics-by-type": {"GET": 2},
+    "statistics-by-area": {"GET": 2},
+    "statistics-by-project": {"GET": 2},
+    "statistics-avg-time": {"GET": 2},
+    "statistics-kpis": {"GET": 6},
+    "statistics-ratings": {"GET": 2},
+    # Empleados y una agregación por área (los nombres de área salen de la caché)
+    "statistics-by-employee": {"GET": 3},
+    "async-claim-list": {"GET": 3},
+    "async-claim-detail": {"GET": 3},
+    "async-claim-timeline": {"GET": 5},
+    "async-claim-feedback": {"GET": 4},
+    "async-claim-full": {"GET": 8},
+    "live-stats": {"GET": 1},
+    "system-pools": {"GET": 1},
+    "profile-list": {"GET": 1},
+    "profile-detail": {"GET": 1},
+    "profile-download": {"GET": 1},
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Un request emitió más consultas que las declaradas para su endpoint."""
+
+
+def budget_for(url_name: str, method: str) -> Optional[int]:
+    """Presupuesto de la URL para el método, o None si no tiene (sin declarar o declarado como None)."""
+    budget = QUERY_BUDGETS.get(url_name)
+    if isinstance(budget, dict):
+        budget = budget.get(method.upper())
+    return budget
+
+
+def check_budget(url_name: str, method: str, queries: int, allowance: Optional[int] = None) -> Optional[str]:
+    """Devuelve el mensaje de error si queries supera el presupuesto más la tolerancia, o None."""
+    budget = budget_for(url_name, method)
+    if budget is None:
+        return None
+    if allowance is None:
+        allowance = settings.QUERY_BUDGET_ALLOWANCE
+    if queries <= budget + allowance:
+        return None
+    return f"{method} {url_name}: {queries} consultas a Mongo (presupuesto {budget} + {allowance})"
+
+
+@contextmanager
+def count_queries() -> Iterator[CommandCollector]:
+    """Cuenta las consultas a Mongo del bloque, también las de run_concurrently (collector.queries)."""
+    with collect_commands(limit=settings.REQUEST_COMMAND_LOG_LIMIT) as collector:
+        yield collector
@@ -0,0 +1,477 @@
+"""
+Registro de las consultas de la app y análisis de sus planes de ejecución.
+
+QUERIES reproduce, con parámetros representativos tomados de la base, los find y aggregate que emiten
+repositories.py y las vistas Statistics*View. `manage.py index_advisor` corre explain("executionStats")
+sobre cada una, marca COLLSCAN, SORT en memoria y consultas que examinan muchos más documentos de los
+que devuelven, y propone índices para claims/indexes.py siguiendo la regla ESR: primero los campos por
+igualdad, después los del orden y al final los de rango.
+
+Si se cambia una consulta en repositories.py o en una vista de estadísticas, hay que actualizar su
+entrada acá para que el plan que se revisa sea el real.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from .db import get_audit_db, get_main_db
+from .indexes import INDEXES, IndexSpec
+from .repositories import build_claims_query, claim_facet_fields, claims_faceted_pipeline
+
+# Campos que agrega el driver a cada comando y que no van dentro de un explain
+DRIVER_FIELDS = {
+    "lsid",
+    "$db",
+    "$clusterTime",
+    "$readPreference",
+    "txnNumber",
+    "autocommit",
+    "startTransaction",
+    "readConcern",
+    "apiVersion",
+    "apiStrict",
+    "apiDeprecationErrors",
+}
+
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+# Condiciones que un índice no acota: quedan como filtro residual sobre los documentos
+RESIDUAL_OPERATORS = {"$ne", "$nin", "$not", "$regex", "$type", "$size", "$elemMatch", "$all", "$mod"}
+# Etapas que reemplazan los documentos por grupos: un $sort posterior ordena pocos resultados ya agregados
+GROUPING_STAGES = {"$group", "$bucket", "$bucketAuto", "$count", "$sortByCount"}
+
+
+@dataclass(frozen=True)
+class RegisteredQuery:
+    name: str
+    source: str  # función o vista que emite la consulta
+    database: str  # "main" o "audit"
+    collection: str
+    build: Callable[[Dict[str, Any]], Dict[str, Any]]  # parámetros -> comando find o aggregate
+
+    def command(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        body = self.build(params)
+        if "pipeline" in body:
+            return {"aggregate": self.collection, "pipeline": body["pipeline"], "cursor": {}}
+        command: Dict[str, Any] = {"find": self.collection, "filter": body.get("filter", {})}
+        for option in ("sort", "projection", "limit"):
+            if body.get(option):
+                command[option] = body[option]
+        return command
+
+
+def _find(filter_: Dict[str, Any], sort: Optional[Dict[str, int]] = None, **options) -> Dict[str, Any]:
+    return {"filter": filter_, "sort": sort, **options}
+
+
+def _group_by(match: Dict[str, Any], key: Any, *stages: Dict[str, Any]) -> Dict[str, Any]:
+    return {"pipeline": [{"$match": match}, {"$group": {"_id": key, "count": {"$sum": 1}}}, *stages]}
+
+
+def _count(match: Dict[str, Any]) -> Dict[str, Any]:
+    # Lo que envía count_documents
+    return {"pipeline": [{"$match": match}, {"$group": {"_id": 1, "n": {"$sum": 1}}}]}
+
+
+def _period(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {"$gte": params["start_date"], "$lte": params["end_date"]}
+
+
+def _year(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {"$gte": datetime(params["year"], 1, 1), "$lt": datetime(params["year"] + 1, 1, 1)}
+
+
+def _claims_query(params: Dict[str, Any], role: str, **filters: Any) -> Dict[str, Any]:
+    user_id = params["client_id"] if role == "client" else params["employee_id"]
+    return build_claims_query(role=role, user_id=str(user_id), **filters)
+
+
+QUERIES: List[RegisteredQuery] = [
+    # -------- repositories.py --------
+    RegisteredQuery(
+        "users.by_email", "repositories.get_user_by_email", "main", "users",
+        lambda p: _find({"email": p["email"]}),
+    ),
+    RegisteredQuery(
+        "users.list_by_role", "repositories.list_users", "main", "users",
+        lambda p: _find({"role": "employee", "is_active": {"$ne": False}}, {"email": ASCENDING}),
+    ),
+    RegisteredQuery(
+        "areas.list", "repositories.list_areas", "main", "areas",
+        lambda p: _find({"is_active": {"$ne": False}}, {"name": ASCENDING}),
+    ),
+    RegisteredQuery(
+        "projects.list", "repositories.list_projects", "main", "projects",
+        lambda p: _find({"is_active": {"$ne": False}}, {"created_at": DESCENDING}),
+    ),
+    RegisteredQuery(
+        "projects.list_by_client", "repositories.list_projects", "main", "projects",
+        lambda p: _find({"client_id": p["client_id"], "is_active": {"$ne": False}}, {"created_at": DESCENDING}),
+    ),
+    RegisteredQuery(
+        "claims.list_admin", "repositories.list_claims", "main", "claims",
+        lambda p: _find(_claims_query(p, "admin"), {"created_at": DESCENDING}),
+    ),
+    RegisteredQuery(
+        "claims.list_client", "repositories.list_claims", "main", "claims",
+        lambda p: _find(_claims_query(p, "client"), {"created_at": DESCENDING}),
+    ),
+    RegisteredQuery(
+        "claims.list_by_status", "repositories.list_claims", "main", "claims",
+        lambda p: _find(_claims_query(p, "admin", status=p["status"]), {"created_at": DESCENDING}),
+    ),
+    RegisteredQuery(
+        "claims.list_by_area_status", "repositories.list_claims", "main", "claims",
+        lambda p: _find(
+            _claims_query(p, "employee", area_id=str(p["area_id"]), status=p["status"]), {"created_at": DESCENDING}
+        ),
+    ),
+    RegisteredQuery(
+        "claims.list_by_project", "repositories.list_claims", "main", "claims",
+        lambda p: _find(_claims_query(p, "admin", project_id=str(p["project_id"])), {"created_at": DESCENDING}),
+    ),
+    RegisteredQuery(
+        "claims.list_by_period", "repositories.list_claims", "main", "claims",
+        lambda p: _find(
+            _claims_query(p, "admin", start_date=p["start_date"], end_date=p["end_date"]), {"created_at": DESCENDING}
+        ),
+    ),
+    RegisteredQuery(
+        "claims.faceted_by_status", "repositories.list_claims_faceted", "main", "claims",
+        lambda p: {
+            "pipeline": claims_faceted_pipeline(
+                _claims_query(p, "admin", status=p["status"]), claim_facet_fields("admin"), page=1, page_size=50
+            )
+        },
+    ),
+    RegisteredQuery(
+        "claim_events.timeline", "repositories.list_claim_events", "audit", "claim_events",
+        lambda p: _find({"claim_id": p["claim_id"]}, {"created_at": ASCENDING}),
+    ),
+    RegisteredQuery(
+        "claim_events.timeline_public", "repositories.list_claim_events", "audit", "claim_events",
+        lambda p: _find({"claim_id": p["claim_id"], "visibility": "public"}, {"created_at": ASCENDING}),
+    ),
+    RegisteredQuery(
+        "feedback.by_claim", "repositories.list_client_feedback_messages", "main", "client_feedback_messages",
+        lambda p: _find({"claim_id": p["feedback_claim_id"]}, {"created_at": ASCENDING}),
+    ),
+    # -------- Statistics*View --------
+    RegisteredQuery(
+        "statistics.status_admin_period", "StatisticsView", "main", "claims",
+        lambda p: _group_by({"created_at": _period(p)}, "$status"),
+    ),
+    RegisteredQuery(
+        "statistics.status_client", "StatisticsView", "main", "claims",
+        lambda p: _group_by({"created_by": p["client_id"]}, "$status"),
+    ),
+    RegisteredQuery(
+        "statistics.status_employee", "StatisticsView", "main", "claims",
+        lambda p: _group_by({"area_id": p["area_id"]}, "$status"),
+    ),
+    RegisteredQuery(
+        "statistics.by_month_client", "StatisticsByMonthView", "main", "claims",
+        lambda p: _group_by({"created_at": _year(p), "created_by": p["client_id"]}, {"$month": "$created_at"}),
+    ),
+    RegisteredQuery(
+        "statistics.by_month_employee", "StatisticsByMonthView", "main", "claims",
+        lambda p: _group_by({"created_at": _year(p), "area_id": p["area_id"]}, {"$month": "$created_at"}),
+    ),
+    RegisteredQuery(
+        "statistics.by_status_project", "StatisticsByStatusView", "main", "claims",
+        lambda p: _group_by({"project_id": p["project_id"]}, "$status"),
+    ),
+    RegisteredQuery(
+        "statistics.by_type_area_period", "StatisticsByTypeView", "main", "claims",
+        lambda p: _group_by(
+            {"area_id": p["area_id"], "created_at": _period(p)}, "$claim_type", {"$sort": {"count": -1}}, {"$limit": 10}
+        ),
+    ),
+    RegisteredQuery(
+        "statistics.by_area_period", "StatisticsByAreaView", "main", "claims",
+        lambda p: _group_by({"created_at": _period(p)}, "$area_id", {"$sort": {"count": -1}}),
+    ),
+    RegisteredQuery(
+        "statistics.by_project_client_year", "StatisticsByProjectView", "main", "claims",
+        lambda p: _group_by(
+            {"created_by": p["client_id"], "created_at": _year(p)},
+            "$project_id",
+            {"$sort": {"count": -1}},
+            {"$limit": 10},
+        ),
+    ),
+    RegisteredQuery(
+        "statistics.avg_resolution_area", "StatisticsAverageResolutionTimeView", "main", "claims",
+        lambda p: _find({"status": "resolved", "resolved_at": {"$exists": True}, "area_id": p["area_id"]}),
+    ),
+    RegisteredQuery(
+        "statistics.kpis_employee_pending", "StatisticsKPIsView", "main", "claims",
+        lambda p: _count({"area_id": p["area_id"], "status": "pending"}),
+    ),
+    RegisteredQuery(
+        "statistics.kpis_client_period", "StatisticsKPIsView", "main", "claims",
+        lambda p: _count({"created_by": p["client_id"], "created_at": _period(p)}),
+    ),
+    RegisteredQuery(
+        "statistics.ratings", "StatisticsRatingsView", "main", "client_feedback_messages",
+        lambda p: _group_by(
+            {"type": "final", "rating": {"$exists": True, "$ne": None}, "created_at": _year(p)},
+            "$rating",
+            {"$sort": {"_id": 1}},
+        ),
+    ),
+    RegisteredQuery(
+        "statistics.ratings_client", "StatisticsRatingsView", "main", "client_feedback_messages",
+        lambda p: _group_by(
+            {"type": "final", "rating": {"$exists": True, "$ne": None}, "client_id": p["client_id"]},
+            "$rating",
+            {"$sort": {"_id": 1}},
+        ),
+    ),
+    RegisteredQuery(
+        "statistics.by_employee_users", "StatisticsByEmployeeView", "main", "users",
+        lambda p: _find({"role": "employee", "is_active": {"$ne": False}}),
+    ),
+    RegisteredQuery(
+        "statistics.by_employee_counts", "StatisticsByEmployeeView", "main", "claims",
+        lambda p: _group_by({"area_id": {"$in": [p["area_id"]]}, "created_at": _period(p)}, "$area_id"),
+    ),
+]
+
+
+def representative_params(days: int = 90) -> Dict[str, Any]:
+    """
+    Valores reales para armar las consultas: los del último reclamo, evento y mensaje de feedback, y un
+    período de `days` días que termina en la fecha del último reclamo.
+    """
+    main, audit = get_main_db(), get_audit_db()
+    claim = main.claims.find_one({}, sort=[("created_at", DESCENDING)]) or {}
+    client = main.users.find_one({"_id": claim["created_by"]}) if claim.get("created_by") else None
+    client = client or main.users.find_one({"role": "client"}) or {}
+    employee = main.users.find_one({"role": "employee", "area_id": {"$ne": None}}) or {}
+    event = audit.claim_events.find_one({}, sort=[("created_at", DESCENDING)]) or {}
+    feedback = main.client_feedback_messages.find_one({}, sort=[("created_at", DESCENDING)]) or {}
+    end_date = claim.get("created_at") or datetime.utcnow()
+    # Con la base vacía se usan ids nuevos: las consultas no devuelven nada pero el plan igual se puede ver
+    return {
+        "email": client.get("email", ""),
+        "client_id": client.get("_id") or ObjectId(),
+        "employee_id": employee.get("_id") or ObjectId(),
+        "area_id": claim.get("area_id") or employee.get("area_id") or ObjectId(),
+        "project_id": claim.get("project_id") or ObjectId(),
+        "status": claim.get("status", "Ingresado"),
+        "claim_id": event.get("claim_id") or claim.get("_id") or ObjectId(),
+        "feedback_claim_id": feedback.get("claim_id") or claim.get("_id") or ObjectId(),
+        "year": end_date.year,
+        "start_date": end_date - timedelta(days=days),
+        "end_date": end_date,
+    }
+
+
+# -------- Análisis de planes --------
+def _database(name: str):
+    return get_main_db() if name == "main" else get_audit_db()
+
+
+def index_information(database: str, collection: str) -> Dict[str, Dict[str, Any]]:
+    return _database(database)[collection].index_information()
+
+
+def explain(database: str, command: Dict[str, Any], verbosity: str = "executionStats") -> Dict[str, Any]:
+    """explain de un comando find o aggregate (también los capturados del driver, sin sus campos de sesión)."""
+    command = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+    return _database(database).command({"explain": command, "verbosity": verbosity})
+
+
+@dataclass
+class PlanSummary:
+    stages: List[str] = field(default_factory=list)
+    indexes: List[str] = field(default_factory=list)
+    n_returned: int = 0
+    docs_examined: int = 0
+    keys_examined: int = 0
+    millis: int = 0
+    # $sort del pipeline que quedaron fuera del motor de consultas (también dentro de $facet), por ubicación
+    pipeline_sorts: List[str] = field(default_factory=list)
+
+    @property
+    def collscan(self) -> bool:
+        return "COLLSCAN" in self.stages
+
+    @property
+    def blocking_sort(self) -> bool:
+        # SORT es el orden en memoria; SORT_MERGE combina ramas ya ordenadas por índice. Un $sort que sigue
+        # en el pipeline no lo resolvió el índice del $match: ordena en memoria todos los documentos
+        return "SORT" in self.stages or bool(self.pipeline_sorts)
+
+    @property
+    def examined_ratio(self) -> float:
+        return self.docs_examined / max(self.n_returned, 1)
+
+    def problems(self, max_ratio: float = 10.0, min_docs: int = 100) -> List[str]:
+        """Problemas del plan; los de colecciones con menos de min_docs documentos examinados no cuentan."""
+        if self.docs_examined < min_docs and self.keys_examined < min_docs:
+            return []
+        found = []
+        if self.collscan:
+            found.append("COLLSCAN")
+        if self.blocking_sort:
+            found.append(" ".join(["SORT en memoria", *self.pipeline_sorts]))
+        if self.examined_ratio > max_ratio:
+            found.append(f"examina {self.examined_ratio:.1f} documentos por resultado")
+        return found
+
+
+def _walk_plan(node: Any) -> Iterator[Dict[str, Any]]:
+    if isinstance(node, dict):
+        if "stage" in node:
+            yield node
+        for key, value in node.items():
+            if key != "slotBasedPlan":
+                yield from _walk_plan(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk_plan(item)
+
+
+def _planner_sections(explain_doc: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    # find y aggregate enteramente delegado al motor de consultas: todo arriba. Si no, en el $cursor inicial.
+    if "queryPlanner" in explain_doc:
+        yield explain_doc
+    for stage in explain_doc.get("stages", []):
+        if "$cursor" in stage:
+            yield stage["$cursor"]
+    for shard in (explain_doc.get("shards") or {}).values():
+        yield from _planner_sections(shard)
+
+
+def _stage_name(stage: Dict[str, Any]) -> Optional[str]:
+    return next((key for key in stage if key.startswith("$")), None)
+
+
+def _pipeline_sorts(stages: List[Any], prefix: str = "", grouped: bool = False) -> Iterator[str]:
+    """
+    Los $sort de documentos que el explain de un aggregate muestra como etapas propias: el que sigue a un
+    $match y lo resuelve un índice queda absorbido en el $cursor y no aparece. Los sub-pipelines de $facet
+    se recorren igual; los $sort posteriores a un $group ordenan grupos y no cuentan.
+    """
+    for stage in stages:
+        if not isinstance(stage, dict):
+            continue
+        name = _stage_name(stage)
+        if name == "$cursor":
+            plan = stage["$cursor"].get("queryPlanner", {}).get("winningPlan", {})
+            grouped = grouped or any(node["stage"] == "GROUP" for node in _walk_plan(plan))
+        elif name == "$facet":
+            for output, sub_pipeline in stage["$facet"].items():
+                yield from _pipeline_sorts(sub_pipeline, f"{prefix}$facet.{output}.", grouped)
+        elif name in GROUPING_STAGES:
+            grouped = True
+        elif name == "$sort" and not grouped:
+            yield f"{prefix}$sort"
+
+
+def summarize_plan(explain_doc: Dict[str, Any]) -> PlanSummary:
+    summary = PlanSummary(pipeline_sorts=list(_pipeline_sorts(explain_doc.get("stages", []))))
+    for section in _planner_sections(explain_doc):
+        for stage in _walk_plan(section.get("queryPlanner", {}).get("winningPlan", {})):
+            summary.stages.append(stage["stage"])
+            if stage.get("indexName") and stage["indexName"] not in summary.indexes:
+                summary.indexes.append(stage["indexName"])
+        stats = section.get("executionStats", {})
+        summary.n_returned += stats.get("nReturned", 0)
+        summary.docs_examined += stats.get("totalDocsExamined", 0)
+        summary.keys_examined += stats.get("totalKeysExamined", 0)
+        summary.millis += stats.get("executionTimeMillis", stats.get("executionTimeMillisEstimate", 0))
+    return summary
+
+
+# -------- Sugerencia de índices --------
+def filter_and_sort(command: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Filtro y orden que puede resolver un índice: los del find, o el $match inicial y el $sort que lo sigue."""
+    if "find" in command:
+        return command.get("filter") or {}, dict(command.get("sort") or {})
+    pipeline = command.get("pipeline") or []
+    match, sort = {}, {}
+    if pipeline and "$match" in pipeline[0]:
+        match = pipeline[0]["$match"]
+        if len(pipeline) > 1 and "$sort" in pipeline[1]:
+            sort = dict(pipeline[1]["$sort"])
+    return match, sort
+
+
+@dataclass(frozen=True)
+class IndexSuggestion:
+    spec: IndexSpec
+    equality: int  # cuántas de las primeras claves son de igualdad: su orden entre sí no importa
+
+    def covered_by(self, keys: List[Tuple[str, Any]]) -> bool:
+        """Si un índice con estas claves ya sirve a la consulta: empieza con las claves sugeridas."""
+        proposed = list(self.spec.keys)
+        prefix = list(keys[: len(proposed)])
+        if len(prefix) < len(proposed) or any(isinstance(direction, str) for _, direction in prefix):
+            return False
+        prefix = [(name, int(direction)) for name, direction in prefix]
+        head, tail = proposed[: self.equality], proposed[self.equality :]
+        if sorted(prefix[: self.equality]) != sorted(head):
+            return False
+        rest = prefix[self.equality :]
+        # Un índice recorrido al revés también da el orden pedido
+        return rest == tail or [(name, -direction) for name, direction in rest] == tail
+
+    def is_covered(self, live: Optional[Dict[str, Dict[str, Any]]] = None) -> bool:
+        """Si ya está declarado en INDEXES o existe en la base (live: index_information() de la colección)."""
+        partial = self.spec.options.get("partialFilterExpression")
+        candidates = [
+            list(spec.keys)
+            for spec in INDEXES
+            if (spec.database, spec.collection) == (self.spec.database, self.spec.collection)
+            and spec.options.get("partialFilterExpression") in (None, partial)
+        ]
+        candidates += [
+            list(info["key"])
+            for info in (live or {}).values()
+            if info.get("partialFilterExpression") in (None, partial)
+        ]
+        return any(self.covered_by(keys) for keys in candidates)
+
+    def declaration(self) -> str:
+        """La línea para pegar en INDEXES de claims/indexes.py."""
+        names = {ASCENDING: "ASCENDING", DESCENDING: "DESCENDING"}
+        keys = ", ".join(f'("{name}", {names.get(direction, repr(direction))})' for name, direction in self.spec.keys)
+        options = "".join(f", {key}={value!r}" for key, value in self.spec.options.items())
+        return f'_index("{self.spec.database}", "{self.spec.collection}", [{keys}]{options}),'
+
+
+def suggest_index(database: str, collection: str, command: Dict[str, Any]) -> Optional[IndexSuggestion]:
+    """
+    Índice ESR para el comando: igualdades, orden y rangos, en ese orden. Las condiciones $exists: true
+    pasan a partialFilterExpression; $ne, $nin y similares quedan afuera porque el índice no las acota.
+    Devuelve None si no hay nada que indexar (por ejemplo, una agregación sobre toda la colección).
+    """
+    query, sort = filter_and_sort(command)
+    equality: List[str] = []
+    ranges: List[str] = []
+    partial: Dict[str, Any] = {}
+    for name, condition in query.items():
+        if name.startswith("$"):
+            return None  # $text, $or, $expr: fuera del alcance de esta regla
+        operators = set(condition) if isinstance(condition, dict) else set()
+        if not operators or not all(op.startswith("$") for op in operators):
+            equality.append(name)
+        elif operators == {"$in"}:
+            (ranges if sort else equality).append(name)
+        elif operators & RANGE_OPERATORS:
+            ranges.append(name)
+        elif condition.get("$exists") is True and not operators - {"$exists"} - RESIDUAL_OPERATORS:
+            partial[name] = {"$exists": True}
+
+    keys: List[Tuple[str, int]] = [(name, ASCENDING) for name in equality]
+    keys += [(name, direction) for name, direction in sort.items() if name not in equality]
+    keys += [(name, ASCENDING) for name in ranges if name not in sort]
+    if not keys:
+        return None
+    options = {"partialFilterExpression": partial} if partial else {}
+    return IndexSuggestion(IndexSpec.create(database, collection, keys, **options), len(equality))
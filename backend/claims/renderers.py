@@ -0,0 +1,43 @@
+"""
+JSONRenderer de DRF con orjson cuando está instalado.
+
+orjson codifica datetime de forma nativa y, con el default de abajo, también ObjectId, por lo que los
+presentadores no necesitan convertirlos a mano. Todo lo demás (Decimal, UUID, lazy strings, etc.) pasa
+por el encoder de DRF, y sin orjson o con indentación pedida se usa el renderer original, así que la
+salida es la misma en ambos casos.
+"""
+from bson import ObjectId
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+_drf_encoder = JSONEncoder()
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    return _drf_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+        except TypeError:
+            # Enteros de más de 64 bits u otros valores que orjson rechaza
+            return super().render(data, accepted_media_type, renderer_context)
+        # Igual que DRF: JSON estricto subconjunto de JavaScript
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+
+def render_json(data) -> bytes:
+    return FastJSONRenderer().render(data)
@@ -1,11 +1,19 @@
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 from bson import ObjectId
 from django.contrib.auth.hashers import check_password, make_password
 from pymongo.errors import DuplicateKeyError
 
+from .cache import bump_reference_version, reference_cache
+from .codec import USER_PUBLIC_PROJECTION, api_collection, to_api
+from .concurrency import run_concurrently
+from .invalidation import invalidation_bus
+from .metrics import password_hash_seconds
+from .tracing import trace_module, traced
 from .db import get_audit_db, get_main_db, serialize, to_object_id
+from .dedup import band_keys, claim_text, estimate_similarity, minhash_signature
+from .knowledge import resolution_index
 
 
 # -------- Users --------
@@ -21,14 +29,36 @@ def get_user_by_id(user_id: Any) -> Optional[Dict[str, Any]]:
     return serialize(doc)
 
 
-def list_users(role: Optional[str] = None, active_only: bool = True) -> List[Dict[str, Any]]:
+def list_users(
+    role: Optional[str] = None,
+    active_only: bool = True,
+    projection: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
     query: Dict[str, Any] = {}
     if role:
         query["role"] = role
     if active_only:
         query["is_active"] = {"$ne": False}
-    docs = get_main_db().users.find(query).sort("email", 1)
-    return [serialize(doc) for doc in docs]
+    # Sin fields se excluye el hash; con fields la proyección ya es de inclusión y no lo incluye
+    docs = api_collection(get_main_db(), "users").find(query, projection or USER_PUBLIC_PROJECTION).sort("email", 1)
+    return [to_api(doc) for doc in docs]
+
+
+def _find_by_ids(
+    collection: str,
+    ids: Iterable[Any],
+    projection: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    object_ids = {to_object_id(value) for value in ids if value}
+    if not object_ids:
+        return {}
+    docs = api_collection(get_main_db(), collection).find({"_id": {"$in": list(object_ids)}}, projection)
+    return {doc["id"]: doc for doc in map(to_api, docs)}
+
+
+def get_users_by_ids(user_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Usuarios indexados por id, resueltos con un único $in y sin el hash de la contraseña."""
+    return _find_by_ids("users", user_ids, USER_PUBLIC_PROJECTION)
 
 
 def create_user(
@@ -43,7 +73,7 @@ def create_user(
     now = datetime.utcnow()
     payload: Dict[str, Any] = {
         "email": email.lower().strip(),
-        "password": make_password(password),
+        "password": hash_password(password),
         "role": role,
         "full_name": full_name,
         "area_id": to_object_id(area_id) if area_id else None,
@@ -57,13 +87,14 @@ def create_user(
         inserted = db.users.insert_one(payload)
     except DuplicateKeyError:
         raise ValueError("Ya existe un usuario con ese email")
+    invalidation_bus.publish("users", inserted.inserted_id)
     return get_user_by_id(inserted.inserted_id)
 
 
 def update_user(user_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
     updates = updates.copy()
     if "password" in updates:
-        updates["password"] = make_password(updates["password"])
+        updates["password"] = hash_password(updates["password"])
     if "area_id" in updates and updates["area_id"]:
         updates["area_id"] = to_object_id(updates["area_id"])
     updates["updated_at"] = datetime.utcnow()
@@ -72,6 +103,7 @@ def update_user(user_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
         db.users.update_one({"_id": to_object_id(user_id)}, {"$set": updates})
     except DuplicateKeyError:
         raise ValueError("Ya existe un usuario con ese email")
+    invalidation_bus.publish("users", user_id)
     return get_user_by_id(user_id)
 
 
@@ -81,10 +113,19 @@ def soft_delete_user(user_id: str):
         {"_id": to_object_id(user_id)},
         {"$set": {"is_active": False, "updated_at": datetime.utcnow()}},
     )
+    invalidation_bus.publish("users", user_id)
+
 
+@traced("password.hash")
+def hash_password(raw_password: str) -> str:
+    with password_hash_seconds.time("hash"):
+        return make_password(raw_password)
 
+
+@traced("password.verify")
 def verify_password(raw_password: str, hashed_password: str) -> bool:
-    return check_password(raw_password, hashed_password)
+    with password_hash_seconds.time("verify"):
+        return check_password(raw_password, hashed_password)
 
 
 # -------- Areas --------
@@ -97,10 +138,27 @@ def list_areas(active_only: bool = True) -> List[Dict[str, Any]]:
 
 
 def get_area(area_id: Any) -> Optional[Dict[str, Any]]:
+    cached = reference_cache.get_area(area_id)
+    if cached:
+        return cached
     doc = get_main_db().areas.find_one({"_id": to_object_id(area_id)})
     return serialize(doc)
 
 
+def get_areas_by_ids(area_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Áreas indexadas por id: las que están en la caché de referencia no van a Mongo, el resto en un único $in."""
+    found: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for area_id in {str(value) for value in area_ids if value}:
+        cached = reference_cache.get_area(area_id)
+        if cached:
+            found[area_id] = cached
+        else:
+            missing.append(area_id)
+    found.update(_find_by_ids("areas", missing))
+    return found
+
+
 def create_area(name: str, description: str = "") -> Dict[str, Any]:
     now = datetime.utcnow()
     payload = {
@@ -116,6 +174,7 @@ def create_area(name: str, description: str = "") -> Dict[str, Any]:
         res = db.areas.insert_one(payload)
     except DuplicateKeyError:
         raise ValueError("Ya existe un área con ese nombre")
+    bump_reference_version("areas", res.inserted_id)
     return get_area(res.inserted_id)
 
 
@@ -127,6 +186,7 @@ def update_area(area_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
         db.areas.update_one({"_id": to_object_id(area_id)}, {"$set": updates})
     except DuplicateKeyError:
         raise ValueError("Ya existe un área con ese nombre")
+    bump_reference_version("areas", area_id)
     return get_area(area_id)
 
 
@@ -142,6 +202,7 @@ def delete_area(area_id: str):
         {"_id": to_object_id(area_id)},
         {"$set": {"is_active": False, "updated_at": datetime.utcnow()}},
     )
+    bump_reference_version("areas", area_id)
 
 
 def add_sub_area(area_id: str, sub_area_name: str) -> Dict[str, Any]:
@@ -173,6 +234,7 @@ def add_sub_area(area_id: str, sub_area_name: str) -> Dict[str, Any]:
             "$set": {"updated_at": datetime.utcnow()}
         }
     )
+    bump_reference_version("areas", area_id)
     return get_area(area_id)
 
 
@@ -205,6 +267,7 @@ def update_sub_area(area_id: str, sub_area_id: str, new_name: str) -> Dict[str,
             }
         }
     )
+    bump_reference_version("areas", area_id)
     return get_area(area_id)
 
 
@@ -222,6 +285,7 @@ def delete_sub_area(area_id: str, sub_area_id: str) -> Dict[str, Any]:
             "$set": {"updated_at": datetime.utcnow()}
         }
     )
+    bump_reference_version("areas", area_id)
     return get_area(area_id)
 
 
@@ -230,21 +294,39 @@ def list_projects(
     *,
     client_id: Optional[str] = None,
     active_only: bool = True,
+    projection: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
     query: Dict[str, Any] = {}
     if client_id:
         query["client_id"] = to_object_id(client_id)
     if active_only:
         query["is_active"] = {"$ne": False}
-    docs = get_main_db().projects.find(query).sort("created_at", -1)
-    return [serialize(doc) for doc in docs]
+    docs = api_collection(get_main_db(), "projects").find(query, projection).sort("created_at", -1)
+    return [to_api(doc) for doc in docs]
 
 
 def get_project(project_id: Any) -> Optional[Dict[str, Any]]:
+    cached = reference_cache.get_project(project_id)
+    if cached:
+        return cached
     doc = get_main_db().projects.find_one({"_id": to_object_id(project_id)})
     return serialize(doc)
 
 
+def get_projects_by_ids(project_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Proyectos indexados por id: primero la caché de referencia, los que falten en un único $in."""
+    found: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for project_id in {str(value) for value in project_ids if value}:
+        cached = reference_cache.get_project(project_id)
+        if cached:
+            found[project_id] = cached
+        else:
+            missing.append(project_id)
+    found.update(_find_by_ids("projects", missing))
+    return found
+
+
 def create_project(*, name: str, project_type: str, client_id: str) -> Dict[str, Any]:
     now = datetime.utcnow()
     payload = {
@@ -256,6 +338,7 @@ def create_project(*, name: str, project_type: str, client_id: str) -> Dict[str,
         "updated_at": now,
     }
     res = get_main_db().projects.insert_one(payload)
+    bump_reference_version("projects", res.inserted_id)
     return get_project(res.inserted_id)
 
 
@@ -265,6 +348,7 @@ def update_project(project_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
         updates["client_id"] = to_object_id(updates["client_id"])
     updates["updated_at"] = datetime.utcnow()
     get_main_db().projects.update_one({"_id": to_object_id(project_id)}, {"$set": updates})
+    bump_reference_version("projects", project_id)
     return get_project(project_id)
 
 
@@ -273,6 +357,7 @@ def delete_project(project_id: str):
         {"_id": to_object_id(project_id)},
         {"$set": {"is_active": False, "updated_at": datetime.utcnow()}},
     )
+    bump_reference_version("projects", project_id)
 
 
 # -------- Claims --------
@@ -302,78 +387,75 @@ def log_claim_event(
     get_audit_db().claim_events.insert_one(payload)
 
 
-def list_claim_events(claim_id: Any, public_only: bool = False) -> List[Dict[str, Any]]:
+def claim_events_query(claim_id: Any, public_only: bool = False) -> Dict[str, Any]:
     query: Dict[str, Any] = {"claim_id": to_object_id(claim_id)}
     if public_only:
         query["visibility"] = "public"
-    events = get_audit_db().claim_events.find(query).sort("created_at", 1)
-    results: List[Dict[str, Any]] = []
-    
-    # Caches para evitar lookups repetidos
-    user_cache: Dict[str, Optional[Dict[str, Any]]] = {}
-    area_cache: Dict[str, Optional[Dict[str, Any]]] = {}
-    
+    return query
+
+
+def claim_event_references(events: List[Dict[str, Any]]) -> tuple:
+    """Usuarios y áreas que mencionan los eventos, para resolverlos juntos: un $in por colección."""
+    user_ids, area_ids = set(), set()
     for ev in events:
-        data = serialize(ev)
-        data["claim_id"] = str(ev["claim_id"])
-        
-        # Enriquecer con información del actor
         if ev.get("actor_id"):
-            actor_id_str = str(ev["actor_id"])
-            data["actor_id"] = actor_id_str
-            
-            if actor_id_str not in user_cache:
-                user_doc = get_main_db().users.find_one({"_id": ev["actor_id"]})
-                user_cache[actor_id_str] = serialize(user_doc) if user_doc else None
-            
-            user = user_cache[actor_id_str]
-            if user:
-                data["actor_name"] = user.get("full_name") or user.get("email")
-        
-        # Enriquecer eventos de cambio de área con nombres de áreas
-        if ev.get("action") == "area_changed" and ev.get("details"):
-            details = ev["details"]
-            
-            # Área origen
-            if details.get("from"):
-                from_id = details["from"]
-                if from_id not in area_cache:
-                    area_doc = get_main_db().areas.find_one({"_id": to_object_id(from_id)})
-                    area_cache[from_id] = serialize(area_doc) if area_doc else None
-                
-                from_area = area_cache[from_id]
-                if from_area:
-                    data["details"]["from_area_name"] = from_area.get("name")
-            
-            # Área destino
-            if details.get("to"):
-                to_id = details["to"]
-                if to_id not in area_cache:
-                    area_doc = get_main_db().areas.find_one({"_id": to_object_id(to_id)})
-                    area_cache[to_id] = serialize(area_doc) if area_doc else None
-                
-                to_area = area_cache[to_id]
-                if to_area:
-                    data["details"]["to_area_name"] = to_area.get("name")
-            
-            # Empleado que derivó
+            user_ids.add(ev["actor_id"])
+        details = ev.get("details") or {}
+        if ev.get("action") == "area_changed":
+            area_ids.update(value for value in (details.get("from"), details.get("to")) if value)
             if details.get("employee_id"):
-                emp_id = details["employee_id"]
-                if emp_id not in user_cache:
-                    user_doc = get_main_db().users.find_one({"_id": to_object_id(emp_id)})
-                    user_cache[emp_id] = serialize(user_doc) if user_doc else None
-                
-                employee = user_cache[emp_id]
-                if employee:
-                    data["details"]["employee_name"] = employee.get("full_name") or employee.get("email")
-        
-        results.append(data)
-    
+                user_ids.add(details["employee_id"])
+    return user_ids, area_ids
+
+
+def _serialize_claim_event(
+    ev: Dict[str, Any], users: Dict[str, Dict[str, Any]], areas: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    data = serialize(ev)
+    data["claim_id"] = str(ev["claim_id"])
+
+    # Enriquecer con información del actor
+    if ev.get("actor_id"):
+        data["actor_id"] = str(ev["actor_id"])
+        user = users.get(data["actor_id"])
+        if user:
+            data["actor_name"] = user.get("full_name") or user.get("email")
+
+    # Enriquecer eventos de cambio de área con nombres de áreas y del empleado que derivó
+    if ev.get("action") == "area_changed" and ev.get("details"):
+        details = ev["details"]
+        from_area = areas.get(str(details["from"])) if details.get("from") else None
+        if from_area:
+            data["details"]["from_area_name"] = from_area.get("name")
+        to_area = areas.get(str(details["to"])) if details.get("to") else None
+        if to_area:
+            data["details"]["to_area_name"] = to_area.get("name")
+        employee = users.get(str(details["employee_id"])) if details.get("employee_id") else None
+        if employee:
+            data["details"]["employee_name"] = employee.get("full_name") or employee.get("email")
+    return data
+
+
+def serialize_claim_events(
+    events: List[Dict[str, Any]],
+    users: Dict[str, Dict[str, Any]],
+    areas: Dict[str, Dict[str, Any]],
+    public_only: bool = False,
+) -> List[Dict[str, Any]]:
+    """Eventos del timeline con los nombres de actores, áreas y empleados ya resueltos en users y areas."""
+    results = [_serialize_claim_event(ev, users, areas) for ev in events]
     if public_only:
         results = [ev for ev in results if ev.get("action") in PUBLIC_ACTIONS]
     return results
 
 
+def list_claim_events(claim_id: Any, public_only: bool = False) -> List[Dict[str, Any]]:
+    events = list(get_audit_db().claim_events.find(claim_events_query(claim_id, public_only)).sort("created_at", 1))
+    user_ids, area_ids = claim_event_references(events)
+    # Las áreas salen de la caché de referencia
+    return serialize_claim_events(events, get_users_by_ids(user_ids), get_areas_by_ids(area_ids), public_only)
+
+
 def _validate_status_transition(old: str, new: str) -> None:
     if old == new:
         return
@@ -384,26 +466,272 @@ def _validate_status_transition(old: str, new: str) -> None:
     raise ValueError("Transición de estado no permitida")
 
 
-def list_claims(
+CLAIM_FACET_FIELDS = ["status", "priority", "severity", "area_id", "sub_area", "project_id", "claim_type"]
+
+
+def _claims_owner_filter(role: str, user_id: str, client_id: Optional[str]) -> Dict[str, Any]:
+    if role == "client":
+        return {"created_by": to_object_id(user_id)}
+    return {"created_by": to_object_id(client_id)} if client_id else {}
+
+
+def _created_at_range(start_date: Optional[datetime], end_date: Optional[datetime]) -> Dict[str, Any]:
+    bounds = {"$gte": start_date, "$lte": end_date}
+    return {operator: value for operator, value in bounds.items() if value}
+
+
+def build_claims_query(
     *,
     role: str,
     user_id: str,
     client_id: Optional[str] = None,
     status: Optional[str] = None,
+    priority: Optional[str] = None,
+    severity: Optional[str] = None,
+    area_id: Optional[str] = None,
+    sub_area: Optional[str] = None,
+    project_id: Optional[str] = None,
+    claim_type: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    query = _claims_owner_filter(role, user_id, client_id)
+    equals = {"status": status, "priority": priority, "severity": severity, "claim_type": claim_type}
+    if role != "client":
+        equals["sub_area"] = sub_area
+    query.update({field: value for field, value in equals.items() if value})
+    ids = {"area_id": area_id, "project_id": project_id}
+    query.update({field: to_object_id(value) for field, value in ids.items() if value})
+    created_at = _created_at_range(start_date, end_date)
+    if created_at:
+        query["created_at"] = created_at
+    return query
+
+
+def list_claims(
+    *,
+    role: str,
+    user_id: str,
+    projection: Optional[Dict[str, Any]] = None,
+    **filters: Any,
 ) -> List[Dict[str, Any]]:
-    query: Dict[str, Any] = {}
-    if role == "client":
-        query["created_by"] = to_object_id(user_id)
-    elif client_id:
-        query["created_by"] = to_object_id(client_id)
-    if status:
-        query["status"] = status
-    docs = get_main_db().claims.find(query).sort("created_at", -1)
-    return [serialize(doc) for doc in docs]
+    query = build_claims_query(role=role, user_id=user_id, **filters)
+    docs = api_collection(get_main_db(), "claims").find(query, projection).sort("created_at", -1)
+    return [to_api(doc) for doc in docs]
+
+
+def _facet_value(value: Any) -> Any:
+    return str(value) if isinstance(value, ObjectId) else value
+
+
+def _facet_labels(facets: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Agrega el nombre de áreas y proyectos a los buckets con una consulta por colección."""
+    db = get_main_db()
+    for field, collection in (("area_id", db.areas), ("project_id", db.projects)):
+        buckets = [bucket for bucket in facets.get(field, []) if bucket["value"]]
+        if not buckets:
+            continue
+        ids = [to_object_id(bucket["value"]) for bucket in buckets]
+        names = {str(doc["_id"]): doc.get("name") for doc in collection.find({"_id": {"$in": ids}}, {"name": 1})}
+        for bucket in buckets:
+            bucket["label"] = names.get(bucket["value"])
+
 
+def claim_facet_fields(role: str) -> List[str]:
+    # sub_area es interna: los clientes no la ven ni en los conteos
+    return [field for field in CLAIM_FACET_FIELDS if role != "client" or field != "sub_area"]
 
-def get_claim(claim_id: Any) -> Optional[Dict[str, Any]]:
-    doc = get_main_db().claims.find_one({"_id": to_object_id(claim_id)})
+
+def claims_faceted_pipeline(
+    query: Dict[str, Any],
+    facet_fields: List[str],
+    page: int,
+    page_size: int,
+    projection: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    El $sort va antes del $facet, pegado al $match: así lo resuelve un índice que empiece por los filtros
+    y siga por created_at. Dentro del $facet ningún índice sirve y cada página ordenaba en memoria todos
+    los reclamos que coinciden.
+    """
+    facet_stage: Dict[str, Any] = {
+        "results": [
+            {"$skip": (page - 1) * page_size},
+            {"$limit": page_size},
+        ] + ([{"$project": projection}] if projection else []),
+        "total": [{"$count": "count"}],
+    }
+    for field in facet_fields:
+        facet_stage[field] = [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}, {"$sort": {"count": -1}}]
+    return [{"$match": query}, {"$sort": {"created_at": -1}}, {"$facet": facet_stage}]
+
+
+def list_claims_faceted(
+    *,
+    role: str,
+    user_id: str,
+    page: int = 1,
+    page_size: int = 50,
+    projection: Optional[Dict[str, Any]] = None,
+    **filters: Any,
+) -> Dict[str, Any]:
+    """
+    Devuelve una página de reclamos filtrados junto con los conteos por campo.
+    Todo se resuelve en una única agregación con $facet sobre el mismo $match.
+    """
+    query = build_claims_query(role=role, user_id=user_id, **filters)
+    facet_fields = claim_facet_fields(role)
+    pipeline = claims_faceted_pipeline(query, facet_fields, page, page_size, projection)
+    result = next(api_collection(get_main_db(), "claims").aggregate(pipeline), {})
+
+    facets = {
+        field: [
+            {"value": _facet_value(bucket["_id"]), "count": bucket["count"]}
+            for bucket in result.get(field, [])
+        ]
+        for field in facet_fields
+    }
+    _facet_labels(facets)
+    total = result.get("total") or [{"count": 0}]
+    return {
+        "results": [to_api(doc) for doc in result.get("results", [])],
+        "count": total[0]["count"],
+        "page": page,
+        "page_size": page_size,
+        "facets": facets,
+    }
+
+
+SEARCH_CANDIDATES = 500
+# Peso relativo de una coincidencia en el timeline frente a una en el propio reclamo
+SEARCH_EVENT_WEIGHT = 0.5
+
+
+def search_claims(
+    *,
+    role: str,
+    user_id: str,
+    text: str,
+    page: int = 1,
+    page_size: int = 20,
+) -> Dict[str, Any]:
+    """
+    Búsqueda de texto sobre reclamos y sobre comentarios/acciones del timeline.
+    Ambas bases se consultan a la vez y los resultados se combinan por puntaje (textScore).
+    """
+    scope = build_claims_query(role=role, user_id=user_id)
+    text_query = {"$text": {"$search": text}}
+
+    def claim_hits():
+        return list(
+            get_main_db()
+            .claims.find({**text_query, **scope}, {"score": {"$meta": "textScore"}})
+            .sort([("score", {"$meta": "textScore"})])
+            .limit(SEARCH_CANDIDATES)
+        )
+
+    def event_hits():
+        # Los comentarios y acciones son internos: los clientes no buscan en el timeline
+        if role == "client":
+            return []
+        pipeline = [
+            {"$match": text_query},
+            {"$group": {"_id": "$claim_id", "score": {"$max": {"$meta": "textScore"}}}},
+            {"$sort": {"score": -1}},
+            {"$limit": SEARCH_CANDIDATES},
+        ]
+        return list(get_audit_db().claim_events.aggregate(pipeline))
+
+    hits = run_concurrently({"claims": claim_hits, "events": event_hits})
+
+    scores: Dict[ObjectId, float] = {}
+    matched_in: Dict[ObjectId, List[str]] = {}
+    docs: Dict[ObjectId, Dict[str, Any]] = {}
+    for doc in hits["claims"]:
+        scores[doc["_id"]] = doc.pop("score")
+        matched_in[doc["_id"]] = ["claim"]
+        docs[doc["_id"]] = doc
+    for hit in hits["events"]:
+        scores[hit["_id"]] = scores.get(hit["_id"], 0) + SEARCH_EVENT_WEIGHT * hit["score"]
+        matched_in.setdefault(hit["_id"], []).append("timeline")
+
+    missing = [claim_id for claim_id in scores if claim_id not in docs]
+    if missing:
+        for doc in get_main_db().claims.find({"_id": {"$in": missing}, **scope}):
+            docs[doc["_id"]] = doc
+
+    ranked = sorted((claim_id for claim_id in scores if claim_id in docs), key=lambda cid: -scores[cid])
+    start = (page - 1) * page_size
+    results = []
+    for claim_id in ranked[start:start + page_size]:
+        data = serialize(docs[claim_id])
+        data["score"] = round(scores[claim_id], 4)
+        data["matched_in"] = matched_in[claim_id]
+        results.append(data)
+    return {"results": results, "count": len(ranked), "page": page, "page_size": page_size}
+
+
+EXPORT_BATCH_SIZE = 2000
+EXPORT_PROJECTION = {
+    "project_id": 1,
+    "claim_type": 1,
+    "priority": 1,
+    "severity": 1,
+    "description": 1,
+    "status": 1,
+    "area_id": 1,
+    "sub_area": 1,
+    "created_by": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "client_rating": 1,
+    "client_feedback": 1,
+    "resolution_description": 1,
+}
+
+
+def iter_claims_for_export(*, role: str, user_id: str, **filters: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre los reclamos filtrados sin materializarlos en memoria.
+    Proyectos y áreas se resuelven desde mapas precargados en lugar de una consulta por fila.
+    """
+    db = get_main_db()
+    projects = {doc["_id"]: doc for doc in db.projects.find({}, {"name": 1, "client_id": 1})}
+    area_names = {doc["_id"]: doc.get("name") for doc in db.areas.find({}, {"name": 1})}
+
+    query = build_claims_query(role=role, user_id=user_id, **filters)
+    cursor = (
+        db.claims.find(query, EXPORT_PROJECTION)
+        .sort("_id", 1)
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+    for doc in cursor:
+        project = projects.get(doc.get("project_id")) or {}
+        area_id = doc.get("area_id")
+        yield {
+            "id": str(doc["_id"]),
+            "project_id": str(doc["project_id"]) if doc.get("project_id") else None,
+            "project_name": project.get("name"),
+            "client_id": str(project.get("client_id") or doc.get("created_by") or "") or None,
+            "claim_type": doc.get("claim_type"),
+            "priority": doc.get("priority"),
+            "severity": doc.get("severity"),
+            "status": doc.get("status"),
+            "area_id": str(area_id) if area_id else None,
+            "area_name": area_names.get(area_id) if area_id else None,
+            "sub_area": doc.get("sub_area"),
+            "description": doc.get("description"),
+            "created_by": str(doc["created_by"]) if doc.get("created_by") else None,
+            "created_at": doc.get("created_at"),
+            "updated_at": doc.get("updated_at"),
+            "client_rating": doc.get("client_rating"),
+            "client_feedback": doc.get("client_feedback"),
+            "resolution_description": doc.get("resolution_description"),
+        }
+
+
+def get_claim(claim_id: Any, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    doc = get_main_db().claims.find_one({"_id": to_object_id(claim_id)}, projection)
     return serialize(doc)
 
 
@@ -436,6 +764,8 @@ def create_claim(
         "updated_at": now,
     }
     res = get_main_db().claims.insert_one(payload)
+    index_claim_signature({**payload, "_id": res.inserted_id})
+    invalidation_bus.publish("claims", res.inserted_id)
     claim = get_claim(res.inserted_id)
     log_claim_event(
         claim_id=claim["id"],
@@ -448,6 +778,79 @@ def create_claim(
     return claim
 
 
+DUPLICATE_THRESHOLD = 0.5
+DUPLICATE_LIMIT = 5
+
+
+def build_claim_signature(doc: Dict[str, Any]) -> Dict[str, Any]:
+    signature = minhash_signature(claim_text(doc.get("claim_type"), doc.get("description")))
+    return {
+        "_id": doc["_id"],
+        "project_id": doc.get("project_id"),
+        "created_by": doc.get("created_by"),
+        "signature": signature,
+        "bands": band_keys(signature),
+        "created_at": doc.get("created_at"),
+    }
+
+
+def index_claim_signature(doc: Dict[str, Any]) -> None:
+    """Guarda la firma MinHash y las claves LSH de un reclamo (doc crudo de Mongo)."""
+    signature_doc = build_claim_signature(doc)
+    get_main_db().claim_signatures.replace_one({"_id": doc["_id"]}, signature_doc, upsert=True)
+
+
+def find_duplicate_claims(
+    claim_id: Any,
+    *,
+    threshold: float = DUPLICATE_THRESHOLD,
+    limit: int = DUPLICATE_LIMIT,
+) -> List[Dict[str, Any]]:
+    """
+    Reclamos abiertos del mismo proyecto y cliente con texto casi igual.
+    Solo se comparan los que comparten al menos una banda LSH, nunca toda la colección.
+    """
+    db = get_main_db()
+    own = db.claim_signatures.find_one({"_id": to_object_id(claim_id)})
+    if not own:
+        return []
+
+    candidates = db.claim_signatures.find(
+        {
+            "project_id": own.get("project_id"),
+            "created_by": own.get("created_by"),
+            "bands": {"$in": own["bands"]},
+            "_id": {"$ne": own["_id"]},
+        },
+        {"signature": 1},
+    )
+    similarities = {}
+    for candidate in candidates:
+        similarity = estimate_similarity(own["signature"], candidate.get("signature"))
+        if similarity >= threshold:
+            similarities[candidate["_id"]] = similarity
+    if not similarities:
+        return []
+
+    open_claims = db.claims.find(
+        {"_id": {"$in": list(similarities)}, "status": {"$ne": "Resuelto"}},
+        {"claim_type": 1, "description": 1, "status": 1, "created_at": 1},
+    )
+    results = [
+        {
+            "id": str(doc["_id"]),
+            "similarity": round(similarities[doc["_id"]], 3),
+            "claim_type": doc.get("claim_type"),
+            "description": doc.get("description"),
+            "status": doc.get("status"),
+            "created_at": doc.get("created_at"),
+        }
+        for doc in open_claims
+    ]
+    results.sort(key=lambda item: item["similarity"], reverse=True)
+    return results[:limit]
+
+
 def update_claim(claim_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
     updates = updates.copy()
     if "project_id" in updates and updates["project_id"]:
@@ -456,6 +859,7 @@ def update_claim(claim_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
         updates["area_id"] = to_object_id(updates["area_id"])
     updates["updated_at"] = datetime.utcnow()
     get_main_db().claims.update_one({"_id": to_object_id(claim_id)}, {"$set": updates})
+    invalidation_bus.publish("claims", claim_id)
     updated = get_claim(claim_id)
     if not updated:
         raise ValueError("Reclamo no encontrado al actualizar")
@@ -546,18 +950,22 @@ def update_claim_with_rules(
         return claim
 
     updated = update_claim(claim["id"], updates)
+    _after_claim_update(updated, events, actor_id=actor_id, actor_role=actor_role)
+    return updated
+
 
+def _after_claim_update(updated: Dict[str, Any], events: List[Dict[str, Any]], *, actor_id: str, actor_role: str):
+    """Registra los eventos del cambio y, si el reclamo quedó resuelto, lo suma al índice de resoluciones."""
     for ev in events:
         log_claim_event(
-            claim_id=claim["id"],
+            claim_id=updated["id"],
             actor_id=actor_id,
             actor_role=actor_role,
             action=ev["action"],
             visibility=ev["visibility"],
             details=ev["details"],
         )
-
-    return updated
+    resolution_index.add_claim(updated)
 
 
 def add_claim_comment(*, claim_id: str, actor_id: str, actor_role: str, comment: str) -> Dict[str, Any]:
@@ -612,24 +1020,21 @@ def _serialize_feedback_message(doc: Optional[Dict[str, Any]]) -> Optional[Dict[
 
 
 def list_client_feedback_messages(claim_id: str) -> List[Dict[str, Any]]:
-    messages = (
+    messages = list(
         get_main_db()
         .client_feedback_messages
         .find({"claim_id": to_object_id(claim_id)})
         .sort("created_at", 1)
     )
+    # Los clientes de todos los mensajes en un único $in
+    clients = get_users_by_ids(msg.get("client_id") for msg in messages)
 
     results: List[Dict[str, Any]] = []
-    client_cache: Dict[str, Optional[Dict[str, Any]]] = {}
-
     for msg in messages:
         serialized = _serialize_feedback_message(msg)
         if not serialized:
             continue
-        client_id = serialized.get("client_id")
-        if client_id and client_id not in client_cache:
-            client_cache[client_id] = get_user_by_id(client_id)
-        client = client_cache.get(client_id)
+        client = clients.get(serialized.get("client_id"))
         if client:
             full_name = client.get("full_name") or client.get("company_name") or client.get("email")
             serialized["client_name"] = full_name
@@ -727,6 +1132,7 @@ def submit_client_feedback(
             "updated_at": now,
         }
         db.claims.update_one({"_id": to_object_id(claim_id)}, {"$set": updates})
+        invalidation_bus.publish("claims", claim_id)
 
         details: Dict[str, Any] = {"rating": rating}
         if feedback_text:
@@ -748,3 +1154,7 @@ def submit_client_feedback(
         }
 
     raise ValueError("Estado del reclamo no admite retroalimentación")
+
+
+# Un span por función pública (claims/tracing.py); tiene que quedar al final del módulo
+trace_module(globals(), "repositories")
@@ -3,14 +3,23 @@ from typing import Any
 from rest_framework import serializers
 
 from .repositories import ALLOWED_PRIORITIES, ALLOWED_STATUSES, get_area, get_project, get_user_by_id
+from .tracing import span
 
 
-class LoginSerializer(serializers.Serializer):
+class TracedSerializer(serializers.Serializer):
+    """La validación queda como span serializer.<Clase> en la traza del request (claims/tracing.py)."""
+
+    def is_valid(self, *, raise_exception=False):
+        with span(f"serializer.{type(self).__name__}"):
+            return super().is_valid(raise_exception=raise_exception)
+
+
+class LoginSerializer(TracedSerializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True, min_length=6)
 
 
-class AreaSerializer(serializers.Serializer):
+class AreaSerializer(TracedSerializer):
     id = serializers.CharField(read_only=True)
     name = serializers.CharField(max_length=120)
     description = serializers.CharField(max_length=500, allow_blank=True, required=False)
@@ -18,7 +27,7 @@ class AreaSerializer(serializers.Serializer):
     is_active = serializers.BooleanField(read_only=True)
 
 
-class EmployeeSerializer(serializers.Serializer):
+class EmployeeSerializer(TracedSerializer):
     id = serializers.CharField(read_only=True)
     full_name = serializers.CharField(max_length=200)
     email = serializers.EmailField()
@@ -33,7 +42,7 @@ class EmployeeSerializer(serializers.Serializer):
         return str(area["id"])
 
 
-class ClientSerializer(serializers.Serializer):
+class ClientSerializer(TracedSerializer):
     id = serializers.CharField(read_only=True)
     company_name = serializers.CharField(max_length=200)
     full_name = serializers.CharField(max_length=200, required=False, allow_blank=True)
@@ -42,7 +51,7 @@ class ClientSerializer(serializers.Serializer):
     is_active = serializers.BooleanField(read_only=True)
 
 
-class ProjectSerializer(serializers.Serializer):
+class ProjectSerializer(TracedSerializer):
     id = serializers.CharField(read_only=True)
     name = serializers.CharField(max_length=200)
     project_type = serializers.CharField(max_length=100)
@@ -56,7 +65,7 @@ class ProjectSerializer(serializers.Serializer):
         return str(client["id"])
 
 
-class ClaimSerializer(serializers.Serializer):
+class ClaimSerializer(TracedSerializer):
     id = serializers.CharField(read_only=True)
     project_id = serializers.CharField()
     claim_type = serializers.CharField(max_length=120)
@@ -96,7 +105,7 @@ class ClaimSerializer(serializers.Serializer):
         return value
 
 
-class ClaimUpdateSerializer(serializers.Serializer):
+class ClaimUpdateSerializer(TracedSerializer):
     status = serializers.ChoiceField(choices=ALLOWED_STATUSES, required=False)
     priority = serializers.ChoiceField(choices=ALLOWED_PRIORITIES, required=False)
     area_id = serializers.CharField(required=False, allow_null=True, allow_blank=True)
@@ -114,7 +123,7 @@ class ClaimUpdateSerializer(serializers.Serializer):
         return str(area["id"])
 
 
-class ClientFeedbackSerializer(serializers.Serializer):
+class ClientFeedbackSerializer(TracedSerializer):
     rating = serializers.IntegerField(min_value=1, max_value=5, required=False, allow_null=True)
     feedback = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     
@@ -124,7 +133,7 @@ class ClientFeedbackSerializer(serializers.Serializer):
         return data
 
 
-class ClientFeedbackMessageSerializer(serializers.Serializer):
+class ClientFeedbackMessageSerializer(TracedSerializer):
     id = serializers.CharField(read_only=True)
     claim_id = serializers.CharField(read_only=True)
     client_id = serializers.CharField(read_only=True)
@@ -0,0 +1,340 @@
+"""
+Utilidades para tests contra un Mongo real.
+
+CommandCapture es un CommandListener de PyMongo que anota los comandos que mandan los clientes de
+claims/db.py mientras hay una captura activa; explain_captured corre explain sobre los find y aggregate
+capturados para revisar sus planes. MongoTestCase apunta la app a bases de prueba propias, les carga un
+conjunto de datos de tamaño realista con seed_dataset y sincroniza los índices de claims/indexes.py.
+Si no hay un Mongo accesible en MONGODB_MAIN_URI los tests se saltean. QueryBudgetMixin agrega las
+aserciones de cantidad de consultas por request (claims/query_budgets.py).
+"""
+import os
+import random
+import threading
+import unittest
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+from bson import ObjectId
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.urls import resolve
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+from rest_framework.test import APIClient
+
+from .auth import generate_token
+from .db import close_clients, get_audit_db, get_main_db
+from .indexes import sync_indexes
+from .query_budgets import budget_for, check_budget, count_queries
+from .query_plans import PlanSummary, explain, suggest_index, summarize_plan
+from .repositories import ALLOWED_PRIORITIES, ALLOWED_STATUSES
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate"}
+
+
+@dataclass
+class CapturedCommand:
+    database: str  # nombre real de la base
+    name: str
+    command: Dict[str, Any]
+
+    @property
+    def collection(self) -> str:
+        return self.command[self.name]
+
+    def describe(self) -> str:
+        body = self.command.get("filter", self.command.get("pipeline"))
+        return f"{self.database}.{self.collection} {self.name} {body}"
+
+
+class CommandCapture(monitoring.CommandListener):
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._captures: List[List[CapturedCommand]] = []
+
+    def started(self, event):
+        if not self._captures:
+            return
+        captured = CapturedCommand(event.database_name, event.command_name, dict(event.command))
+        with self._lock:
+            for capture in self._captures:
+                capture.append(captured)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    @contextmanager
+    def capture(self) -> Iterator[List[CapturedCommand]]:
+        """Comandos de todos los hilos (también los de run_concurrently) mientras dura el bloque."""
+        commands: List[CapturedCommand] = []
+        with self._lock:
+            self._captures.append(commands)
+        try:
+            yield commands
+        finally:
+            with self._lock:
+                self._captures.remove(commands)
+
+
+_command_capture = None
+_command_capture_lock = threading.Lock()
+
+
+def command_capture() -> CommandCapture:
+    """
+    El listener del proceso. Se registra global en PyMongo, que solo lo aplica a los clientes creados
+    después, así que al instalarlo se cierran los de claims/db.py para que se vuelvan a crear con él.
+    """
+    global _command_capture  # pylint: disable=global-statement
+    with _command_capture_lock:
+        if _command_capture is None:
+            _command_capture = CommandCapture()
+            monitoring.register(_command_capture)
+            close_clients()
+        return _command_capture
+
+
+def _alias(database: str) -> str:
+    return "audit" if database == settings.MONGODB_AUDIT_DB else "main"
+
+
+def explain_captured(commands: List[CapturedCommand]) -> List[Tuple[CapturedCommand, PlanSummary]]:
+    plans = []
+    for captured in commands:
+        if captured.name not in EXPLAINABLE_COMMANDS:
+            continue
+        pipeline = captured.command.get("pipeline") or []
+        if pipeline and any(stage in pipeline[0] for stage in ("$changeStream", "$collStats", "$indexStats")):
+            continue
+        plans.append((captured, summarize_plan(explain(_alias(captured.database), captured.command))))
+    return plans
+
+
+def plan_problems(captured: CapturedCommand, summary: PlanSummary) -> List[str]:
+    """
+    COLLSCAN y SORT en memoria. Un COLLSCAN no cuenta si la consulta no tiene nada que un índice pueda
+    acotar (cargar todos los proyectos activos, agregar sobre toda la colección): es lectura completa a
+    propósito.
+    """
+    problems = []
+    if summary.collscan and suggest_index(_alias(captured.database), captured.collection, captured.command):
+        problems.append("COLLSCAN")
+    if summary.blocking_sort:
+        problems.append(" ".join(["SORT en memoria", *summary.pipeline_sorts]))
+    return problems
+
+
+def mongo_available(timeout_ms: int = 1000) -> bool:
+    client = MongoClient(settings.MONGODB_MAIN_URI, serverSelectionTimeoutMS=timeout_ms)
+    try:
+        client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+def _insert(collection, docs: List[Dict[str, Any]], chunk: int = 5000) -> None:
+    for start in range(0, len(docs), chunk):
+        collection.insert_many(docs[start : start + chunk], ordered=False)
+
+
+def seed_dataset(claims: int = 20000, seed: int = 7) -> Dict[str, Any]:
+    """
+    Áreas, empleados, clientes, proyectos, reclamos de dos años con su historial y feedback, en las bases
+    configuradas. Devuelve los documentos de referencia que usan los tests (admin, un empleado, un cliente).
+    """
+    rng = random.Random(seed)
+    main, audit = get_main_db(), get_audit_db()
+    now = datetime.utcnow().replace(microsecond=0)
+    start = now - timedelta(days=730)
+
+    areas = [
+        {"_id": ObjectId(), "name": name, "description": name, "sub_areas": [], "is_active": True, "created_at": start}
+        for name in ("Soporte Técnico", "Desarrollo", "Seguridad", "Infraestructura")
+    ]
+    users = [
+        {"_id": ObjectId(), "email": "admin@example.com", "role": "admin", "full_name": "Admin", "is_active": True}
+    ]
+    users += [
+        {
+            "_id": ObjectId(),
+            "email": f"empleado{i}@example.com",
+            "role": "employee",
+            "full_name": f"Empleado {i}",
+            "area_id": areas[i % len(areas)]["_id"],
+            "is_active": i % 10 != 0,
+            "created_at": start,
+        }
+        for i in range(40)
+    ]
+    clients = [
+        {
+            "_id": ObjectId(),
+            "email": f"cliente{i}@example.com",
+            "role": "client",
+            "company_name": f"Empresa {i}",
+            "is_active": True,
+            "created_at": start,
+        }
+        for i in range(300)
+    ]
+    projects = [
+        {
+            "_id": ObjectId(),
+            "name": f"Proyecto {i}",
+            "project_type": rng.choice(["web", "mobile", "infra"]),
+            "client_id": rng.choice(clients)["_id"],
+            "is_active": i % 15 != 0,
+            "created_at": start + timedelta(days=rng.randrange(730)),
+        }
+        for i in range(600)
+    ]
+    claim_docs, events, feedback = [], [], []
+    for i in range(claims):
+        project = rng.choice(projects)
+        created_at = start + timedelta(minutes=rng.randrange(730 * 24 * 60))
+        status = rng.choice(ALLOWED_STATUSES)
+        claim = {
+            "_id": ObjectId(),
+            "project_id": project["_id"],
+            "claim_type": rng.choice(["Error de login", "Caída de servidor", "Lentitud", "Facturación"]),
+            "priority": rng.choice(ALLOWED_PRIORITIES),
+            "severity": rng.choice(["S1 - Crítico", "S2 - Alto", "S3 - Medio", "S4 - Bajo"]),
+            "description": f"El sistema no responde al procesar la operación {i}",
+            "status": status,
+            "area_id": rng.choice(areas)["_id"],
+            "sub_area": None,
+            "created_by": project["client_id"],
+            "created_at": created_at,
+            "updated_at": created_at + timedelta(hours=2),
+        }
+        if status == "Resuelto":
+            claim["resolved_at"] = created_at + timedelta(hours=rng.randrange(1, 240))
+        claim_docs.append(claim)
+        for step, (action, visibility) in enumerate(
+            (("created", "public"), ("comment_added", "internal"), ("status_changed", "public"))
+        ):
+            events.append(
+                {
+                    "claim_id": claim["_id"],
+                    "actor_id": claim["created_by"] if step == 0 else rng.choice(users)["_id"],
+                    "actor_role": "client" if step == 0 else "employee",
+                    "action": action,
+                    "visibility": visibility,
+                    "details": {"comment": f"Seguimiento {step} del reclamo {i}"},
+                    "created_at": created_at + timedelta(hours=step),
+                }
+            )
+        if i % 3 == 0:
+            final = status == "Resuelto"
+            feedback.append(
+                {
+                    "claim_id": claim["_id"],
+                    "client_id": claim["created_by"],
+                    "message": "Gracias por la respuesta",
+                    "rating": rng.randint(1, 5) if final else None,
+                    "type": "final" if final else "progress",
+                    "created_at": created_at + timedelta(days=1),
+                }
+            )
+
+    main.areas.insert_many(areas)
+    _insert(main.users, users + clients)
+    _insert(main.projects, projects)
+    _insert(main.claims, claim_docs)
+    _insert(main.client_feedback_messages, feedback)
+    _insert(audit.claim_events, events)
+    employee = next(user for user in users if user["role"] == "employee" and user["is_active"])
+    busiest = max(clients, key=lambda client: sum(1 for p in projects if p["client_id"] == client["_id"]))
+    return {"admin": users[0], "employee": employee, "client": busiest, "claim": claim_docs[0], "now": now}
+
+
+def api_client(user: Dict[str, Any]) -> APIClient:
+    client = APIClient()
+    token = generate_token({"id": str(user["_id"]), "role": user["role"], "email": user["email"]})
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return client
+
+
+class MongoTestCase(SimpleTestCase):
+    """
+    Tests con un Mongo real en bases propias (<base>_test), con datos sembrados e índices sincronizados
+    una vez por clase. QUERY_PLAN_TEST_CLAIMS ajusta la cantidad de reclamos.
+    """
+
+    seed_claims = int(os.getenv("QUERY_PLAN_TEST_CLAIMS", "20000"))
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if not mongo_available():
+            raise unittest.SkipTest("No hay un MongoDB accesible en MONGODB_MAIN_URI")
+        cls._mongo_settings = override_settings(
+            MONGODB_MAIN_DB=f"{settings.MONGODB_MAIN_DB}_test",
+            MONGODB_AUDIT_DB=f"{settings.MONGODB_AUDIT_DB}_test",
+            ALLOWED_HOSTS=["testserver"],
+        )
+        cls._mongo_settings.enable()
+        cls.capture = command_capture()
+        cls._drop_databases()
+        sync_indexes()
+        cls.data = seed_dataset(cls.seed_claims)
+
+    @classmethod
+    def tearDownClass(cls):
+        if hasattr(cls, "_mongo_settings"):
+            cls._drop_databases()
+            cls._mongo_settings.disable()
+            close_clients()
+        super().tearDownClass()
+
+    @classmethod
+    def _drop_databases(cls):
+        get_main_db().client.drop_database(settings.MONGODB_MAIN_DB)
+        get_audit_db().client.drop_database(settings.MONGODB_AUDIT_DB)
+
+
+def _command_lines(collector) -> str:
+    return "\n".join(
+        f"  {entry['command']} {entry['collection']} {entry['shape']}" for entry in collector.command_log()
+    )
+
+
+class QueryBudgetMixin:
+    """Aserciones sobre la cantidad de consultas a Mongo (sin getMore) que emite un bloque o un request."""
+
+    @contextmanager
+    def assertMaxQueries(self, limit: int, msg: str = ""):
+        with count_queries() as collector:
+            yield collector
+        if collector.queries > limit:
+            detail = f"{msg or 'El bloque'} emitió {collector.queries} consultas (máximo {limit})"
+            self.fail(f"{detail}:\n{_command_lines(collector)}")
+
+    def assertWithinBudget(self, user, method: str, path: str, data=None, allowance: int = 0):
+        """
+        Hace el request y lo compara con el presupuesto de su endpoint. Sin tolerancia por defecto: el test
+        calienta la caché de referencia antes de medir. Devuelve la respuesta.
+        """
+        url_name = resolve(path).url_name
+        budget = budget_for(url_name, method)
+        self.assertIsNotNone(budget, f"{method} {url_name} no tiene presupuesto en QUERY_BUDGETS")
+        client = api_client(user)
+        with count_queries() as collector:
+            if method == "GET":
+                response = client.get(path, data or {})
+            else:
+                response = getattr(client, method.lower())(path, data, format="json")
+        self.assertLess(response.status_code, 400, f"{method} {path}: {response.content[:300]!r}")
+        error = check_budget(url_name, method, collector.queries, allowance)
+        if error:
+            self.fail(f"{error}:\n{_command_lines(collector)}")
+        return response
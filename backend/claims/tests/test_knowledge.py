@@ -0,0 +1,73 @@
+"""
+Índice de resoluciones (claims/knowledge.py) compartido entre workers: cada proceso indexa lo que resuelve
+y lee de Mongo lo que resolvieron los demás. Necesita un MongoDB real:
+`python manage.py test claims.tests.test_knowledge`.
+"""
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bson import ObjectId
+from django.test import override_settings
+
+from claims.db import get_main_db
+from claims.knowledge import ResolutionIndex
+from claims.testing import MongoTestCase
+
+
+@override_settings(KNOWLEDGE_INDEX_REFRESH_SECONDS=0, KNOWLEDGE_INDEX_SAVE_DELAY_SECONDS=0)
+class ResolutionIndexWorkersTests(MongoTestCase):
+    seed_claims = 200
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Por clase y no por test: los guardados programados terminan en segundo plano
+        cls.directory = Path(tempfile.mkdtemp())
+
+    @classmethod
+    def tearDownClass(cls):
+        if hasattr(cls, "directory"):
+            shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.worker_a = ResolutionIndex(self.directory / f"{self._testMethodName}_a.npz")
+        self.worker_b = ResolutionIndex(self.directory / f"{self._testMethodName}_b.npz")
+        self.worker_a.refresh(force=True)
+        self.worker_b.refresh(force=True)
+
+    def resolve(self, worker, description, updated_at):
+        """Guarda un reclamo resuelto en Mongo y lo indexa en el worker que lo resolvió."""
+        claim = {
+            "_id": ObjectId(),
+            "claim_type": "Infraestructura",
+            "description": description,
+            "resolution_description": "Se reemplazó el equipo",
+            "status": "Resuelto",
+            "updated_at": updated_at,
+        }
+        get_main_db().claims.insert_one(claim)
+        self.addCleanup(get_main_db().claims.delete_one, {"_id": claim["_id"]})
+        claim_id = str(claim["_id"])
+        worker.add_claim({**claim, "id": claim_id})
+        return claim_id
+
+    def test_local_resolution_does_not_skip_other_workers(self):
+        now = datetime.utcnow().replace(microsecond=0)
+        first = self.resolve(self.worker_a, "Termostato averiado en la sala de calderas", now + timedelta(hours=1))
+        self.resolve(self.worker_b, "Impresora sin tóner en recepción", now + timedelta(hours=2))
+
+        suggested = [claim_id for claim_id, _ in self.worker_b.suggest("termostato calderas")]
+        self.assertIn(first, suggested)
+
+    def test_saved_watermark_does_not_skip_other_workers(self):
+        now = datetime.utcnow().replace(microsecond=0)
+        first = self.resolve(self.worker_a, "Termostato averiado en la sala de calderas", now + timedelta(hours=1))
+        self.resolve(self.worker_b, "Impresora sin tóner en recepción", now + timedelta(hours=2))
+        self.worker_b.save()
+
+        restarted = ResolutionIndex(self.worker_b.path)
+        suggested = [claim_id for claim_id, _ in restarted.suggest("termostato calderas")]
+        self.assertIn(first, suggested)
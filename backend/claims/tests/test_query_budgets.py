@@ -0,0 +1,82 @@
+"""
+Presupuestos de consultas por endpoint (claims/query_budgets.py): la cantidad de consultas a Mongo de
+cada request no tiene que crecer con las filas que devuelve. Los tests contra Mongo necesitan un MongoDB
+real: `python manage.py test claims.tests.test_query_budgets`.
+"""
+from django.test import SimpleTestCase
+from django.urls import URLPattern, get_resolver
+
+from claims.query_budgets import QUERY_BUDGETS
+from claims.testing import MongoTestCase, QueryBudgetMixin, api_client
+
+
+class QueryBudgetRegistryTests(SimpleTestCase):
+    def test_every_url_has_a_budget(self):
+        names = {
+            pattern.name
+            for pattern in get_resolver("claims.urls").url_patterns
+            if isinstance(pattern, URLPattern) and pattern.name
+        }
+        self.assertEqual(names - set(QUERY_BUDGETS), set(), "URLs sin presupuesto")
+        self.assertEqual(set(QUERY_BUDGETS) - names, set(), "Presupuestos de URLs que no existen")
+
+
+class QueryBudgetTests(QueryBudgetMixin, MongoTestCase):
+    seed_claims = 2000
+
+    def setUp(self):
+        # La primera consulta de la clase carga la caché de referencia; los presupuestos no la incluyen
+        api_client(self.data["admin"]).get("/api/areas/")
+
+    def claim_path(self, suffix=""):
+        return f"/api/claims/{self.data['claim']['_id']}/{suffix}"
+
+    def test_claim_list_does_not_grow_with_page_size(self):
+        admin = self.data["admin"]
+        with self.assertMaxQueries(3) as small:
+            api_client(admin).get("/api/claims/", {"page_size": 5})
+        with self.assertMaxQueries(3) as large:
+            api_client(admin).get("/api/claims/", {"page_size": 200})
+        self.assertEqual(small.queries, large.queries)
+
+    def test_claim_list(self):
+        self.assertWithinBudget(self.data["client"], "GET", "/api/claims/")
+
+    def test_claim_list_with_includes(self):
+        self.assertWithinBudget(self.data["admin"], "GET", "/api/claims/", {"include": "project,area,client"})
+
+    def test_claim_list_faceted(self):
+        self.assertWithinBudget(self.data["admin"], "GET", "/api/claims/", {"facets": "true"})
+
+    def test_claim_search(self):
+        self.assertWithinBudget(self.data["admin"], "GET", "/api/claims/search/", {"q": "sistema", "page_size": 100})
+
+    def test_claim_detail(self):
+        self.assertWithinBudget(self.data["admin"], "GET", self.claim_path())
+
+    def test_claim_full(self):
+        self.assertWithinBudget(self.data["admin"], "GET", self.claim_path("full/"))
+
+    def test_claim_timeline(self):
+        self.assertWithinBudget(self.data["admin"], "GET", self.claim_path("timeline/"))
+
+    def test_claim_feedback(self):
+        self.assertWithinBudget(self.data["admin"], "GET", self.claim_path("feedback/"))
+
+    def test_employee_list(self):
+        self.assertWithinBudget(self.data["admin"], "GET", "/api/employees/", {"include": "area"})
+
+    def test_project_list(self):
+        self.assertWithinBudget(self.data["admin"], "GET", "/api/projects/", {"include": "client"})
+
+    def test_statistics_by_area(self):
+        self.assertWithinBudget(self.data["admin"], "GET", "/api/statistics/by-area/")
+
+    def test_statistics_by_project(self):
+        self.assertWithinBudget(self.data["admin"], "GET", "/api/statistics/by-project/")
+
+    def test_statistics_by_employee(self):
+        self.assertWithinBudget(self.data["admin"], "GET", "/api/statistics/by-employee/")
+
+    def test_statistics_kpis(self):
+        self.assertWithinBudget(self.data["employee"], "GET", "/api/statistics/kpis/")
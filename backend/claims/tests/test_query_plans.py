@@ -0,0 +1,144 @@
+"""
+Regresión de planes de consulta: cada endpoint caliente se llama sobre el conjunto sembrado y todos los
+find y aggregate que emite deben usar índices (ni COLLSCAN acotable ni SORT en memoria).
+Necesita un MongoDB real: `python manage.py test claims.tests.test_query_plans`.
+"""
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+
+from claims.query_plans import summarize_plan
+from claims.testing import MongoTestCase, api_client, explain_captured, plan_problems
+
+# Explain de un aggregate cuyo $match y $sort iniciales resolvió el índice: el $sort quedó en el $cursor
+INDEXED_CURSOR = {
+    "$cursor": {
+        "queryPlanner": {
+            "winningPlan": {
+                "stage": "FETCH",
+                "inputStage": {"stage": "IXSCAN", "indexName": "status_1_created_at_-1"},
+            }
+        }
+    }
+}
+GROUP_BUCKETS = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}, {"$sort": {"sortKey": {"count": -1}}}]
+
+
+class PlanSummaryTests(SimpleTestCase):
+    """Etapas del pipeline que el winningPlan no muestra."""
+
+    def test_sort_absorbed_by_index(self):
+        explain_doc = {"stages": [INDEXED_CURSOR, {"$facet": {"results": [{"$limit": 50}], "status": GROUP_BUCKETS}}]}
+        self.assertFalse(summarize_plan(explain_doc).blocking_sort)
+
+    def test_sort_inside_facet(self):
+        explain_doc = {
+            "stages": [
+                INDEXED_CURSOR,
+                {"$facet": {"results": [{"$sort": {"sortKey": {"created_at": -1}}}, {"$limit": 50}]}},
+            ]
+        }
+        summary = summarize_plan(explain_doc)
+        self.assertTrue(summary.blocking_sort)
+        self.assertEqual(summary.pipeline_sorts, ["$facet.results.$sort"])
+
+    def test_sort_not_absorbed(self):
+        explain_doc = {"stages": [INDEXED_CURSOR, {"$project": {"status": True}}, {"$sort": {"sortKey": {"a": 1}}}]}
+        self.assertEqual(summarize_plan(explain_doc).pipeline_sorts, ["$sort"])
+
+    def test_sort_after_group(self):
+        self.assertFalse(summarize_plan({"stages": [INDEXED_CURSOR, *GROUP_BUCKETS]}).blocking_sort)
+
+
+class QueryPlanTests(MongoTestCase):
+    def assertIndexedPlans(self, user, path, params=None):
+        with self.capture.capture() as commands:
+            response = api_client(user).get(path, params or {})
+        self.assertEqual(response.status_code, 200, f"{path}: {response.content[:300]!r}")
+
+        failures = []
+        plans = explain_captured(commands)
+        for captured, summary in plans:
+            problems = plan_problems(captured, summary)
+            if problems:
+                failures.append(f"  {', '.join(problems)}: {captured.describe()} -> {' <- '.join(summary.stages)}")
+        self.assertTrue(plans, f"{path} no emitió ningún find ni aggregate")
+        self.assertFalse(failures, f"{path} tiene consultas sin índice:\n" + "\n".join(failures))
+
+    def period(self):
+        end = self.data["now"]
+        return {"start_date": (end - timedelta(days=90)).isoformat(), "end_date": end.isoformat()}
+
+    # -------- Reclamos --------
+    def test_claim_list_client(self):
+        self.assertIndexedPlans(self.data["client"], "/api/claims/")
+
+    def test_claim_list_filtered(self):
+        self.assertIndexedPlans(
+            self.data["admin"],
+            "/api/claims/",
+            {"status": "En Proceso", "area_id": str(self.data["employee"]["area_id"])},
+        )
+
+    def test_claim_list_faceted(self):
+        self.assertIndexedPlans(self.data["admin"], "/api/claims/", {"facets": "true", "status": "Ingresado"})
+
+    def test_claim_list_faceted_client(self):
+        self.assertIndexedPlans(self.data["client"], "/api/claims/", {"facets": "true"})
+
+    def test_claim_timeline(self):
+        self.assertIndexedPlans(self.data["admin"], f"/api/claims/{self.data['claim']['_id']}/timeline/")
+
+    def test_claim_timeline_client(self):
+        claim = self.data["claim"]
+        client = {"_id": claim["created_by"], "role": "client", "email": "cliente@example.com"}
+        self.assertIndexedPlans(client, f"/api/claims/{claim['_id']}/timeline/")
+
+    def test_claim_feedback(self):
+        self.assertIndexedPlans(self.data["admin"], f"/api/claims/{self.data['claim']['_id']}/feedback/")
+
+    # -------- Estadísticas --------
+    def test_statistics(self):
+        self.assertIndexedPlans(self.data["admin"], "/api/statistics/", self.period())
+
+    def test_statistics_employee(self):
+        self.assertIndexedPlans(self.data["employee"], "/api/statistics/")
+
+    def test_statistics_by_month(self):
+        self.assertIndexedPlans(self.data["admin"], "/api/statistics/by-month/", {"year": self.data["now"].year})
+
+    def test_statistics_by_month_employee(self):
+        self.assertIndexedPlans(self.data["employee"], "/api/statistics/by-month/", {"year": self.data["now"].year})
+
+    def test_statistics_by_status(self):
+        self.assertIndexedPlans(self.data["client"], "/api/statistics/by-status/")
+
+    def test_statistics_by_type(self):
+        params = {"area_id": str(self.data["employee"]["area_id"]), **self.period()}
+        self.assertIndexedPlans(self.data["admin"], "/api/statistics/by-type/", params)
+
+    def test_statistics_by_area(self):
+        self.assertIndexedPlans(self.data["admin"], "/api/statistics/by-area/", self.period())
+
+    def test_statistics_by_project(self):
+        self.assertIndexedPlans(
+            self.data["admin"],
+            "/api/statistics/by-project/",
+            {"client_id": str(self.data["client"]["_id"]), "year": self.data["now"].year},
+        )
+
+    def test_statistics_avg_resolution_time(self):
+        self.assertIndexedPlans(
+            self.data["admin"],
+            "/api/statistics/avg-resolution-time/",
+            {"area_id": str(self.data["employee"]["area_id"])},
+        )
+
+    def test_statistics_kpis(self):
+        self.assertIndexedPlans(self.data["employee"], "/api/statistics/kpis/", self.period())
+
+    def test_statistics_ratings(self):
+        self.assertIndexedPlans(self.data["admin"], "/api/statistics/ratings/", {"year": self.data["now"].year})
+
+    def test_statistics_by_employee(self):
+        self.assertIndexedPlans(self.data["admin"], "/api/statistics/by-employee/", self.period())
@@ -0,0 +1,362 @@
+"""
+Trazas locales por request, sin colector externo.
+
+Cada request recibe un trace id (header X-Trace-Id). Con probabilidad TRACE_SAMPLE_RATE la traza se
+registra: spans para la vista (TracingMiddleware), la validación de serializers, cada función pública de
+claims/repositories.py, el hasheo de contraseñas y cada comando de Mongo (TraceCommands, un
+CommandListener). El span actual vive en un ContextVar, así que los spans de los hilos de
+run_concurrently cuelgan del que los lanzó y pueden solaparse entre hermanos.
+
+Las trazas muestreadas se escriben como una línea JSON por request en TRACE_DIR/traces-<pid>.jsonl, que
+rota a los TRACE_FILE_MAX_BYTES (un archivo por proceso: varios workers rotando el mismo archivo se
+pisarían). Como cada worker reciclado o reiniciado deja archivos con un pid nuevo, al abrir el suyo cada
+proceso poda el directorio (prune_traces). `python manage.py trace_report` las resume por endpoint. Las
+trazas no muestreadas no arman spans: cada punto instrumentado solo lee el ContextVar.
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from django.conf import settings
+from pymongo import monitoring
+
+from .instrumentation import command_collection
+
+TRACE_HEADER = "X-Trace-Id"
+
+
+class Trace:
+    def __init__(self, trace_id: str, sampled: bool) -> None:
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.started_at = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def offset_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def open(self, name: str, parent: Optional[int], attrs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._next_id += 1
+            span = {"id": self._next_id, "parent": parent, "name": name, "start_ms": self.offset_ms()}
+            if attrs:
+                span["attrs"] = attrs
+            self.spans.append(span)
+        return span
+
+    @staticmethod
+    def close(span: Dict[str, Any], end_ms: float, error: Optional[str] = None) -> None:
+        span["duration_ms"] = round(end_ms - span["start_ms"], 3)
+        span["start_ms"] = round(span["start_ms"], 3)
+        if error:
+            span["error"] = error
+
+
+# (traza, id del span actual) del contexto; None fuera de un request
+_current: ContextVar[Optional[Tuple[Trace, Optional[int]]]] = ContextVar("claims_trace", default=None)
+
+
+def start_trace(sampled: Optional[bool] = None):
+    """Abre una traza en el contexto actual; devuelve (token, traza) para finish_trace."""
+    if sampled is None:
+        sampled = random.random() < settings.TRACE_SAMPLE_RATE
+    trace = Trace(uuid4().hex, sampled)
+    return _current.set((trace, None)), trace
+
+
+def finish_trace(token, trace: Trace, **fields: Any) -> None:
+    _current.reset(token)
+    if trace.sampled:
+        write_trace(trace, fields)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    current = _current.get()
+    if current is None or not current[0].sampled:
+        yield
+        return
+    trace, parent = current
+    record = trace.open(name, parent, attrs)
+    token = _current.set((trace, record["id"]))
+    error = None
+    try:
+        yield
+    except Exception as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        _current.reset(token)
+        trace.close(record, trace.offset_ms(), error)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            current = _current.get()
+            if current is None or not current[0].sampled:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+
+        wrapper.__traced__ = True
+        return wrapper
+
+    return decorator
+
+
+def trace_module(namespace: Dict[str, Any], prefix: str) -> None:
+    """
+    Envuelve en un span cada función pública definida en el módulo (no las importadas, ni las que ya
+    tienen @traced). Va al final del módulo, así las llamadas entre sus funciones también quedan trazadas.
+    Los generadores quedan afuera: su trabajo corre al iterarlos, fuera del span.
+    """
+    module = namespace["__name__"]
+    for attr, value in list(namespace.items()):
+        if (
+            attr.startswith("_")
+            or not inspect.isfunction(value)
+            or value.__module__ != module
+            or getattr(value, "__traced__", False)
+            or inspect.isgeneratorfunction(value)
+        ):
+            continue
+        namespace[attr] = traced(f"{prefix}.{attr}")(value)
+
+
+class TraceCommands(monitoring.CommandListener):
+    """Un span por comando de Mongo, hijo del span que estaba activo cuando el comando empezó."""
+
+    def __init__(self) -> None:
+        self._pending: Dict[Tuple[Any, int], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        current = _current.get()
+        if current is None or not current[0].sampled:
+            return
+        trace, parent = current
+        record = trace.open(
+            f"mongo.{event.command_name}",
+            parent,
+            {"database": event.database_name, "collection": command_collection(event)},
+        )
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = record
+
+    def _finished(self, event, error: Optional[str]) -> None:
+        with self._lock:
+            record = self._pending.pop((event.connection_id, event.request_id), None)
+        if record is None:
+            return
+        # La duración del driver (sin el tiempo de los listeners)
+        Trace.close(record, record["start_ms"] + event.duration_micros / 1000, error)
+
+    def succeeded(self, event):
+        self._finished(event, None)
+
+    def failed(self, event):
+        self._finished(event, "CommandFailed")
+
+
+trace_commands = TraceCommands()
+
+
+# -------- Archivo --------
+_writer: Optional[Tuple[int, logging.Logger]] = None
+_writer_lock = threading.Lock()
+
+
+def _trace_logger() -> logging.Logger:
+    """Un logger con su RotatingFileHandler por proceso (se vuelve a crear después de un fork)."""
+    global _writer  # pylint: disable=global-statement
+    with _writer_lock:
+        if _writer is None or _writer[0] != os.getpid():
+            directory = Path(settings.TRACE_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            prune_traces(directory)
+            handler = RotatingFileHandler(
+                directory / f"traces-{os.getpid()}.jsonl",
+                maxBytes=settings.TRACE_FILE_MAX_BYTES,
+                backupCount=settings.TRACE_FILE_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger(f"claims.traces.{os.getpid()}")
+            logger.handlers = [handler]
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            _writer = (os.getpid(), logger)
+        return _writer[1]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _in_use(path: Path) -> bool:
+    """El archivo activo de un proceso vivo: borrarlo no libera el espacio mientras el proceso lo tenga abierto."""
+    pid = path.name[len("traces-"):-len(".jsonl")] if path.name.endswith(".jsonl") else ""
+    return pid.isdigit() and _pid_alive(int(pid))
+
+
+def prune_traces(directory: Path) -> int:
+    """
+    Borra los archivos de trazas con más de TRACE_RETENTION_DAYS y después los más viejos mientras el
+    directorio pase de TRACE_DIR_MAX_BYTES. Los archivos activos de procesos vivos no se tocan (sus
+    rotaciones sí). Devuelve cuántos borró.
+    """
+    files = []
+    for path in directory.glob("traces-*.jsonl*"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue  # otro worker podando a la vez
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+    cutoff = time.time() - settings.TRACE_RETENTION_DAYS * 86400
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for mtime, size, path in files:
+        if mtime >= cutoff and total <= settings.TRACE_DIR_MAX_BYTES:
+            break
+        if _in_use(path):
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def write_trace(trace: Trace, fields: Dict[str, Any]) -> None:
+    entry = {
+        "trace_id": trace.trace_id,
+        "ts": datetime.utcnow().isoformat(),
+        "pid": os.getpid(),
+        **fields,
+        "duration_ms": round(trace.offset_ms(), 3),
+        # Los spans que no cerraron (un generador a medio iterar) no se escriben
+        "spans": [record for record in trace.spans if "duration_ms" in record],
+    }
+    _trace_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def trace_files(directory: Optional[str] = None) -> List[Path]:
+    base = Path(directory or settings.TRACE_DIR)
+    return sorted(base.glob("traces-*.jsonl*"))
+
+
+# -------- Análisis (trace_report) --------
+def load_traces(
+    files: List[Path], view: Optional[str] = None, since: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    traces = []
+    for path in files:
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    trace = json.loads(line)
+                except ValueError:
+                    continue  # línea cortada por una rotación o un worker que murió escribiendo
+                if view and not trace.get("view", "").startswith(view):
+                    continue
+                if since and datetime.fromisoformat(trace["ts"]) < since:
+                    continue
+                traces.append(trace)
+    return traces
+
+
+def span_label(record: Dict[str, Any]) -> str:
+    collection = (record.get("attrs") or {}).get("collection")
+    return f"{record['name']} {collection}" if collection else record["name"]
+
+
+def _end(record: Dict[str, Any]) -> float:
+    return record["start_ms"] + record["duration_ms"]
+
+
+def _children(spans: List[Dict[str, Any]]) -> Dict[Optional[int], List[Dict[str, Any]]]:
+    children: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for record in spans:
+        children.setdefault(record["parent"], []).append(record)
+    return children
+
+
+def self_time(record: Dict[str, Any], children: List[Dict[str, Any]]) -> float:
+    """Duración menos la unión de los intervalos de los hijos (los de run_concurrently se solapan)."""
+    covered, cursor = 0.0, record["start_ms"]
+    for child in sorted(children, key=lambda c: c["start_ms"]):
+        start, end = max(child["start_ms"], cursor), min(_end(child), _end(record))
+        if end > start:
+            covered += end - start
+            cursor = end
+    return max(0.0, record["duration_ms"] - covered)
+
+
+def flame_summary(traces: List[Dict[str, Any]]) -> Dict[Tuple[str, ...], Dict[str, float]]:
+    """Por camino de nombres desde la raíz: tiempo total, tiempo propio y llamadas, sumados."""
+    summary: Dict[Tuple[str, ...], Dict[str, float]] = {}
+
+    def visit(record, path, children):
+        path = path + (span_label(record),)
+        kids = children.get(record["id"], [])
+        entry = summary.setdefault(path, {"total_ms": 0.0, "self_ms": 0.0, "calls": 0})
+        entry["total_ms"] += record["duration_ms"]
+        entry["self_ms"] += self_time(record, kids)
+        entry["calls"] += 1
+        for child in kids:
+            visit(child, path, children)
+
+    for trace in traces:
+        children = _children(trace["spans"])
+        for root in children.get(None, []):
+            visit(root, (), children)
+    return summary
+
+
+def critical_path(trace: Dict[str, Any]) -> List[Tuple[str, float]]:
+    """
+    Tramos del camino crítico como (span, ms): desde el final de cada span se toma el hijo que terminó
+    último, después el que terminó antes de que ese empezara, y así; los huecos son del padre.
+    """
+    children = _children(trace["spans"])
+    segments: List[Tuple[str, float]] = []
+
+    def visit(record, end):
+        label = span_label(record)
+        cursor = end
+        for child in sorted(children.get(record["id"], []), key=_end, reverse=True):
+            if child["start_ms"] >= cursor:
+                continue
+            child_end = min(_end(child), cursor)
+            segments.append((label, cursor - child_end))
+            visit(child, child_end)
+            cursor = child["start_ms"]
+        segments.append((label, max(0.0, cursor - record["start_ms"])))
+
+    roots = children.get(None, [])
+    if roots:
+        root = max(roots, key=_end)
+        visit(root, _end(root))
+    return [(label, ms) for label, ms in segments if ms > 0]
@@ -1,18 +1,30 @@
 from django.urls import path
 
+from . import async_views
 from .views import (
     AreaDetailView,
     AreaListCreateView,
+    BatchView,
     ClientDetailView,
     ClientListCreateView,
     ClientFeedbackView,
     ClaimDetailView,
+    ClaimDuplicatesView,
+    ClaimFullView,
+    ClaimExportView,
     ClaimListCreateView,
+    ClaimSearchView,
+    ClaimSuggestionsView,
     ClaimActionView,
     ClaimCommentView,
     ClaimTimelineView,
     EmployeeDetailView,
     EmployeeListCreateView,
+    LiveStatsView,
+    PoolStatsView,
+    ProfileDetailView,
+    ProfileDownloadView,
+    ProfileListView,
     LoginView,
     ProjectDetailView,
     ProjectListCreateView,
@@ -31,6 +43,7 @@ from .views import (
 
 urlpatterns = [
     path("auth/login/", LoginView.as_view(), name="login"),
+    path("batch/", BatchView.as_view(), name="batch"),
     path("areas/", AreaListCreateView.as_view(), name="area-list"),
     path("areas/<str:area_id>/", AreaDetailView.as_view(), name="area-detail"),
     path("areas/<str:area_id>/sub-areas/", SubAreaView.as_view(), name="sub-area-create"),
@@ -42,8 +55,13 @@ urlpatterns = [
     path("projects/", ProjectListCreateView.as_view(), name="project-list"),
     path("projects/<str:project_id>/", ProjectDetailView.as_view(), name="project-detail"),
     path("claims/", ClaimListCreateView.as_view(), name="claim-list"),
+    path("claims/export/", ClaimExportView.as_view(), name="claim-export"),
+    path("claims/search/", ClaimSearchView.as_view(), name="claim-search"),
     path("claims/<str:claim_id>/", ClaimDetailView.as_view(), name="claim-detail"),
+    path("claims/<str:claim_id>/full/", ClaimFullView.as_view(), name="claim-full"),
     path("claims/<str:claim_id>/actions/", ClaimActionView.as_view(), name="claim-action"),
+    path("claims/<str:claim_id>/duplicates/", ClaimDuplicatesView.as_view(), name="claim-duplicates"),
+    path("claims/<str:claim_id>/suggestions/", ClaimSuggestionsView.as_view(), name="claim-suggestions"),
     path("claims/<str:claim_id>/comments/", ClaimCommentView.as_view(), name="claim-comment"),
     path("claims/<str:claim_id>/feedback/", ClientFeedbackView.as_view(), name="client-feedback"),
     path("claims/<str:claim_id>/timeline/", ClaimTimelineView.as_view(), name="claim-timeline"),
@@ -57,4 +75,16 @@ urlpatterns = [
     path("statistics/kpis/", StatisticsKPIsView.as_view(), name="statistics-kpis"),
     path("statistics/ratings/", StatisticsRatingsView.as_view(), name="statistics-ratings"),
     path("statistics/by-employee/", StatisticsByEmployeeView.as_view(), name="statistics-by-employee"),
+    # Variantes async para el despliegue ASGI (config.asgi); mismo formato de respuesta
+    path("async/claims/", async_views.claim_list, name="async-claim-list"),
+    path("async/claims/<str:claim_id>/", async_views.claim_detail, name="async-claim-detail"),
+    path("async/claims/<str:claim_id>/timeline/", async_views.claim_timeline, name="async-claim-timeline"),
+    path("async/claims/<str:claim_id>/feedback/", async_views.claim_feedback, name="async-claim-feedback"),
+    path("async/claims/<str:claim_id>/full/", async_views.claim_full, name="async-claim-full"),
+    # El stream /api/live/ lo atiende directamente config/asgi.py
+    path("live/stats/", LiveStatsView.as_view(), name="live-stats"),
+    path("system/pools/", PoolStatsView.as_view(), name="system-pools"),
+    path("system/profiles/", ProfileListView.as_view(), name="profile-list"),
+    path("system/profiles/<str:profile_id>/", ProfileDetailView.as_view(), name="profile-detail"),
+    path("system/profiles/<str:profile_id>/download/", ProfileDownloadView.as_view(), name="profile-download"),
 ]
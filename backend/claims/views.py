@@ -3,11 +3,26 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from bson import ObjectId
+from datetime import datetime
+import hmac
 import os
 from uuid import uuid4
 
 from .auth import generate_token
+from .exports import CLAIM_EXPORT_FIELDS, EXPORT_FORMATS, iter_export
+from .batch import dispatch as dispatch_batch_request, validate_path as validate_batch_path
+from .concurrency import run_concurrently
+from .knowledge import suggest_resolutions
+from .live import live_broadcaster
+from .loaders import loaders_for
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry as metrics_registry, render as render_metrics
+from .monitoring import pool_stats
 from .permissions import IsAdmin, IsAdminOrEmployee, IsAuthenticated
+from .profiling import get_profile, list_profiles, profile_path
+from .presenters import claim_presenter, present_project, present_user
 from .repositories import (
     ALLOWED_PRIORITIES,
     ALLOWED_STATUSES,
@@ -21,14 +36,20 @@ from .repositories import (
     delete_area,
     delete_project,
     delete_sub_area,
+    find_duplicate_claims,
     get_area,
+    get_areas_by_ids,
     get_claim,
     get_project,
+    get_projects_by_ids,
     get_user_by_email,
     get_user_by_id,
+    iter_claims_for_export,
     list_claim_events,
     list_client_feedback_messages,
     list_claims,
+    list_claims_faceted,
+    search_claims,
     list_areas,
     list_projects,
     submit_client_feedback,
@@ -56,17 +77,205 @@ from .serializers import (
 
 
 def _present_user(user: dict) -> dict:
-    data = user.copy()
-    data.pop("password", None)
-    if data.get("area_id"):
-        data["area_id"] = str(data["area_id"])
-    return data
+    return present_user(user)
 
 
 def _present_project(proj: dict) -> dict:
-    data = proj.copy()
-    if data.get("client_id"):
-        data["client_id"] = str(data["client_id"])
+    return present_project(proj)
+
+
+# Campos que acepta ?fields= y los campos de Mongo que hay que traer para armar cada uno
+CLAIM_FIELD_SOURCES = {
+    "id": [],
+    "project_id": ["project_id"],
+    "claim_type": ["claim_type"],
+    "priority": ["priority"],
+    "severity": ["severity"],
+    "description": ["description"],
+    "attachment_url": ["attachment_path"],
+    "attachment_name": ["attachment_path", "attachment_name"],
+    "status": ["status"],
+    "area_id": ["area_id"],
+    "sub_area": ["sub_area"],
+    "created_by": ["created_by"],
+    "created_at": ["created_at"],
+    "client_rating": ["client_rating"],
+    "client_feedback": ["client_feedback"],
+    "resolution_description": ["resolution_description"],
+    "client_id": ["project_id", "created_by"],
+}
+USER_FIELD_SOURCES = {
+    name: [name] if name != "id" else []
+    for name in ("id", "email", "role", "full_name", "area_id", "company_name", "is_active", "created_at", "updated_at")
+}
+PROJECT_FIELD_SOURCES = {
+    name: [name] if name != "id" else []
+    for name in ("id", "name", "project_type", "client_id", "is_active", "created_at", "updated_at")
+}
+
+# Relaciones que acepta ?include=: nombre -> (loader, campo con el id)
+CLAIM_INCLUDES = {
+    "project": ("projects", "project_id"),
+    "area": ("areas", "area_id"),
+    "client": ("users", "created_by"),
+}
+PROJECT_INCLUDES = {"client": ("users", "client_id")}
+EMPLOYEE_INCLUDES = {"area": ("areas", "area_id")}
+CLIENT_INCLUDES: dict = {}
+
+
+def _csv_param(params, name: str, allowed) -> set:
+    values = {value.strip() for value in params.get(name, "").split(",") if value.strip()}
+    unknown = values - set(allowed)
+    if unknown:
+        raise ValueError(
+            f"{name} inválido: {', '.join(sorted(unknown))}. Permitidos: {', '.join(allowed) or 'ninguno'}"
+        )
+    return values
+
+
+def _sparse_params(request, sources: dict, includes: dict) -> tuple:
+    """
+    Lee ?fields= y ?include= y devuelve (campos pedidos o None, relaciones a embeber, proyección de Mongo o None).
+    Lanza ValueError si se pide un campo o una relación que no existe.
+    """
+    params = request.query_params
+    included = _csv_param(params, "include", includes)
+    if "fields" not in params:
+        return None, included, None
+    fields = _csv_param(params, "fields", sources)
+    if not fields:
+        raise ValueError("fields no puede estar vacío")
+    projection = {"_id": 1}
+    for name in fields:
+        projection.update({source: 1 for source in sources[name]})
+    # Los ids de las relaciones pedidas se traen aunque no figuren en fields
+    projection.update({includes[name][1]: 1 for name in included})
+    return fields, included, projection
+
+
+def _claim_includes(request) -> dict:
+    """Relaciones de reclamos que puede pedir el usuario: los clientes no ven las áreas (ni sus sub-áreas)."""
+    if getattr(request.user, "role", None) == "client":
+        return {name: value for name, value in CLAIM_INCLUDES.items() if name != "area"}
+    return CLAIM_INCLUDES
+
+
+def _related_presenter(loader: str):
+    if loader == "areas":
+        return lambda area: AreaSerializer(area).data
+    return _present_project if loader == "projects" else _present_user
+
+
+def _present_many(request, docs: list, present, fields, included: set, includes: dict) -> list:
+    """Presenta los documentos recortados a fields y con las relaciones pedidas, un $in por tipo de relación."""
+    loaders = loaders_for(request)
+    for name in included:
+        loader, key = includes[name]
+        getattr(loaders, loader).load_many(doc.get(key) for doc in docs)
+
+    results = []
+    for doc in docs:
+        data = present(doc)
+        if fields is not None:
+            data = {name: value for name, value in data.items() if name in fields}
+        for name in included:
+            loader, key = includes[name]
+            related = getattr(loaders, loader).get(doc.get(key))
+            data[name] = _related_presenter(loader)(related) if related else None
+        results.append(data)
+    return results
+
+
+def _present_claims(request, claims: list, fields=None, included: set = frozenset()) -> list:
+    if fields is None or "client_id" in fields:
+        # El client_id sale del proyecto: se cargan todos los de la página juntos
+        loaders_for(request).projects.load_many(claim.get("project_id") for claim in claims)
+    return _present_many(
+        request, claims, lambda claim: _present_claim(request, claim, fields=fields), fields, included, CLAIM_INCLUDES
+    )
+
+
+CLAIM_FILTER_PARAMS = ["status", "client_id", "priority", "severity", "area_id", "sub_area", "project_id", "claim_type"]
+CLAIM_PAGE_SIZE = 50
+CLAIM_MAX_PAGE_SIZE = 200
+
+
+def _claim_filters(request) -> dict:
+    """Lee los filtros del listado de reclamos desde la query string; lanza ValueError si alguno es inválido."""
+    params = getattr(request, "query_params", request.GET)
+    filters = {name: params.get(name) or None for name in CLAIM_FILTER_PARAMS}
+    for name in ("client_id", "area_id", "project_id"):
+        if filters[name] and not ObjectId.is_valid(filters[name]):
+            raise ValueError(f"Filtro inválido: {name}")
+    for name in ("start_date", "end_date"):
+        value = params.get(name)
+        filters[name] = datetime.fromisoformat(value) if value else None
+    return filters
+
+
+CLAIM_FULL_PARTS = ("project", "timeline", "feedback")
+
+
+def _claim_full_parts(request) -> set:
+    """Partes pedidas en ?include=project,timeline,feedback (por defecto todas); lanza ValueError si hay otras."""
+    params = getattr(request, "query_params", request.GET)
+    raw = params.get("include")
+    if raw is None:
+        return set(CLAIM_FULL_PARTS)
+    parts = {part.strip() for part in raw.split(",") if part.strip()}
+    unknown = parts - set(CLAIM_FULL_PARTS)
+    if unknown:
+        raise ValueError(f"include inválido: {', '.join(sorted(unknown))}. Permitidos: {', '.join(CLAIM_FULL_PARTS)}")
+    return parts
+
+
+def _present_claim_full(request, claim: dict, parts: set, project, events, messages) -> dict:
+    payload = {"claim": _present_claim(request, claim, project)}
+    if "project" in parts:
+        payload["project"] = _present_project(project) if project and project.get("is_active", True) else None
+    if "timeline" in parts:
+        payload["timeline"] = events
+    if "feedback" in parts:
+        payload["feedback"] = ClientFeedbackMessageSerializer(messages, many=True).data
+    return payload
+
+
+def _positive_int(value, default: int, maximum: int) -> int:
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return default
+    return min(max(number, 1), maximum)
+
+
+_NOT_LOADED = object()
+
+
+def _present_claim(request, claim: dict, project=_NOT_LOADED, fields=None) -> dict:
+    # El presentador ya deja los ObjectId como texto y las fechas con el formato de ClaimSerializer
+    data = claim_presenter(frozenset(fields) if fields is not None else None)(claim)
+
+    def wanted(name: str) -> bool:
+        return fields is None or name in fields
+
+    if wanted("area_id"):
+        data["area_id"] = data.get("area_id") or None
+    if wanted("client_id"):
+        # Obtener el client_id del proyecto asociado (las vistas async lo traen ya cargado)
+        if project is _NOT_LOADED:
+            project = loaders_for(request).projects.get(claim["project_id"])
+        data["client_id"] = (
+            str(project["client_id"]) if project and project.get("client_id") else str(claim["created_by"])
+        )
+    # Agregar URL del archivo adjunto si existe
+    if claim.get("attachment_path"):
+        if wanted("attachment_url"):
+            data["attachment_url"] = request.build_absolute_uri(settings.MEDIA_URL + claim["attachment_path"])
+        if wanted("attachment_name"):
+            data["attachment_name"] = claim.get("attachment_name", "archivo")
+    if getattr(request.user, "role", None) == "client":
+        data.pop("sub_area", None)
     return data
 
 
@@ -198,8 +407,12 @@ class EmployeeListCreateView(APIView):
     permission_classes = [IsAdmin]
 
     def get(self, request):
-        employees = list_users(role="employee")
-        return Response([_present_user(emp) for emp in employees])
+        try:
+            fields, included, projection = _sparse_params(request, USER_FIELD_SOURCES, EMPLOYEE_INCLUDES)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        employees = list_users(role="employee", projection=projection)
+        return Response(_present_many(request, employees, _present_user, fields, included, EMPLOYEE_INCLUDES))
 
     def post(self, request):
         serializer = EmployeeSerializer(data=request.data)
@@ -253,8 +466,12 @@ class ClientListCreateView(APIView):
     permission_classes = [IsAdminOrEmployee]
 
     def get(self, request):
-        clients = list_users(role="client")
-        return Response([_present_user(client) for client in clients])
+        try:
+            fields, included, projection = _sparse_params(request, USER_FIELD_SOURCES, CLIENT_INCLUDES)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        clients = list_users(role="client", projection=projection)
+        return Response(_present_many(request, clients, _present_user, fields, included, CLIENT_INCLUDES))
 
     def post(self, request):
         serializer = ClientSerializer(data=request.data)
@@ -307,13 +524,17 @@ class ProjectListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        try:
+            fields, included, projection = _sparse_params(request, PROJECT_FIELD_SOURCES, PROJECT_INCLUDES)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         client_filter = None
         if getattr(request.user, "role", None) == "client":
             client_filter = request.user.id
         else:
             client_filter = request.query_params.get("client_id") or None
-        projects = list_projects(client_id=client_filter)
-        return Response([_present_project(p) for p in projects])
+        projects = list_projects(client_id=client_filter, projection=projection)
+        return Response(_present_many(request, projects, _present_project, fields, included, PROJECT_INCLUDES))
 
     def post(self, request):
         if getattr(request.user, "role", None) != "admin":
@@ -367,31 +588,35 @@ class ClaimListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        status_filter = request.query_params.get("status") or None
-        client_filter = request.query_params.get("client_id") or None
-        claims = list_claims(
-            role=getattr(request.user, "role", ""),
-            user_id=getattr(request.user, "id", ""),
-            client_id=client_filter,
-            status=status_filter,
-        )
-        def present(claim):
-            data = ClaimSerializer(claim).data
-            data["project_id"] = str(claim["project_id"])
-            data["area_id"] = str(claim["area_id"]) if claim.get("area_id") else None
-            data["created_by"] = str(claim["created_by"])
-            # Obtener el client_id del proyecto asociado
-            project = get_project(claim["project_id"])
-            data["client_id"] = str(project["client_id"]) if project and project.get("client_id") else str(claim["created_by"])
-            # Agregar URL del archivo adjunto si existe
-            if claim.get("attachment_path"):
-                data["attachment_url"] = request.build_absolute_uri(settings.MEDIA_URL + claim["attachment_path"])
-                data["attachment_name"] = claim.get("attachment_name", "archivo")
-            if getattr(request.user, "role", None) == "client":
-                data.pop("sub_area", None)
-            return data
-
-        return Response([present(c) for c in claims])
+        try:
+            filters = _claim_filters(request)
+            fields, included, projection = _sparse_params(request, CLAIM_FIELD_SOURCES, _claim_includes(request))
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with_facets = (request.query_params.get("facets") or "").lower() in ("1", "true", "yes")
+        if with_facets:
+            page = list_claims_faceted(
+                role=getattr(request.user, "role", ""),
+                user_id=getattr(request.user, "id", ""),
+                page=_positive_int(request.query_params.get("page"), 1, 10**6),
+                page_size=_positive_int(request.query_params.get("page_size"), CLAIM_PAGE_SIZE, CLAIM_MAX_PAGE_SIZE),
+                projection=projection,
+                **filters,
+            )
+            claims = page["results"]
+        else:
+            claims = list_claims(
+                role=getattr(request.user, "role", ""),
+                user_id=getattr(request.user, "id", ""),
+                projection=projection,
+                **filters,
+            )
+
+        if with_facets:
+            page["results"] = _present_claims(request, claims, fields, included)
+            return Response(page)
+        return Response(_present_claims(request, claims, fields, included))
 
     def post(self, request):
         role = getattr(request.user, "role", None)
@@ -463,14 +688,86 @@ class ClaimListCreateView(APIView):
         if created.get("attachment_path"):
             data["attachment_url"] = request.build_absolute_uri(settings.MEDIA_URL + created["attachment_path"])
             data["attachment_name"] = created.get("attachment_name", "archivo")
+        duplicates = find_duplicate_claims(created["id"])
+        data["possible_duplicates"] = duplicates
+        data["has_possible_duplicates"] = bool(duplicates)
         return Response(data, status=status.HTTP_201_CREATED)
 
 
+class ClaimExportView(APIView):
+    """
+    Exporta los reclamos filtrados en CSV o NDJSON.
+    La respuesta se genera fila por fila, por lo que la memoria no depende de la cantidad de reclamos.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # `format` elige el tipo de exportación; no debe usarse para negociar el renderer de DRF
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        export_format = (request.query_params.get("format") or "csv").lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"Formato no soportado. Permitidos: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            filters = _claim_filters(request)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        role = getattr(request.user, "role", "")
+        rows = iter_claims_for_export(role=role, user_id=getattr(request.user, "id", ""), **filters)
+        fields = CLAIM_EXPORT_FIELDS
+        if role == "client":
+            fields = [field for field in fields if field != "sub_area"]
+
+        response = StreamingHttpResponse(
+            iter_export(export_format, rows, fields),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        filename = f"claims-{timezone.now():%Y%m%d}.{export_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ClaimSearchView(APIView):
+    """Búsqueda de texto en reclamos, resoluciones y comentarios del timeline, ordenada por relevancia."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        text = (request.query_params.get("q") or "").strip()
+        if not text:
+            return Response({"detail": "El parámetro q es obligatorio"}, status=status.HTTP_400_BAD_REQUEST)
+        page = search_claims(
+            role=getattr(request.user, "role", ""),
+            user_id=getattr(request.user, "id", ""),
+            text=text,
+            page=_positive_int(request.query_params.get("page"), 1, 10**6),
+            page_size=_positive_int(request.query_params.get("page_size"), 20, CLAIM_MAX_PAGE_SIZE),
+        )
+        results = _present_claims(request, page["results"])
+        for claim, data in zip(page["results"], results):
+            data["score"] = claim["score"]
+            data["matched_in"] = claim["matched_in"]
+        page["results"] = results
+        return Response(page)
+
+
 class ClaimDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, claim_id: str):
-        claim = get_claim(claim_id)
+        try:
+            fields, included, projection = _sparse_params(request, CLAIM_FIELD_SOURCES, _claim_includes(request))
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if projection:
+            # created_by hace falta siempre para el chequeo de permisos del cliente
+            projection["created_by"] = 1
+        claim = get_claim(claim_id, projection)
         if not claim:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
@@ -478,20 +775,7 @@ class ClaimDetailView(APIView):
         if role == "client" and str(claim.get("created_by")) != request.user.id:
             return Response(status=status.HTTP_403_FORBIDDEN)
 
-        data = ClaimSerializer(claim).data
-        data["project_id"] = str(claim["project_id"])
-        data["area_id"] = str(claim["area_id"]) if claim.get("area_id") else None
-        data["created_by"] = str(claim["created_by"])
-        # Obtener el client_id del proyecto asociado
-        project = get_project(claim["project_id"])
-        data["client_id"] = str(project["client_id"]) if project and project.get("client_id") else str(claim["created_by"])
-        # Agregar URL del archivo adjunto si existe
-        if claim.get("attachment_path"):
-            data["attachment_url"] = request.build_absolute_uri(settings.MEDIA_URL + claim["attachment_path"])
-            data["attachment_name"] = claim.get("attachment_name", "archivo")
-        if role == "client":
-            data.pop("sub_area", None)
-        return Response(data)
+        return Response(_present_claims(request, [claim], fields, included)[0])
 
     def put(self, request, claim_id: str):
         claim = get_claim(claim_id)
@@ -530,6 +814,32 @@ class ClaimDetailView(APIView):
         return Response(data)
 
 
+class ClaimDuplicatesView(APIView):
+    """Reclamos abiertos del mismo proyecto y cliente con una descripción casi idéntica."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, claim_id: str):
+        claim = get_claim(claim_id)
+        if not claim:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        role = getattr(request.user, "role", None)
+        if role == "client" and str(claim.get("created_by")) != request.user.id:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        return Response(find_duplicate_claims(claim_id))
+
+
+class ClaimSuggestionsView(APIView):
+    """Resoluciones de reclamos anteriores parecidos, para reutilizar soluciones conocidas."""
+    permission_classes = [IsAdminOrEmployee]
+
+    def get(self, request, claim_id: str):
+        claim = get_claim(claim_id)
+        if not claim:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        k = _positive_int(request.query_params.get("k"), 5, 20)
+        return Response(suggest_resolutions(claim, k=k))
+
+
 class ClaimCommentView(APIView):
     permission_classes = [IsAdminOrEmployee]
 
@@ -635,6 +945,41 @@ class ClientFeedbackView(APIView):
         )
 
 
+class ClaimFullView(APIView):
+    """
+    Reclamo con su proyecto, timeline y feedback en una sola respuesta: una autenticación y una lectura del
+    reclamo, y el resto de las consultas en paralelo. ?include= limita las partes opcionales.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, claim_id: str):
+        try:
+            parts = _claim_full_parts(request)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        claim = get_claim(claim_id)
+        if not claim:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        role = getattr(request.user, "role", None)
+        if role == "client" and str(claim.get("created_by")) != request.user.id:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        # El proyecto se lee siempre: el reclamo expone su client_id
+        tasks = {"project": lambda: get_project(claim["project_id"])}
+        if "timeline" in parts:
+            tasks["timeline"] = lambda: list_claim_events(claim["id"], public_only=role == "client")
+        if "feedback" in parts:
+            tasks["feedback"] = lambda: list_client_feedback_messages(claim["id"])
+        results = run_concurrently(tasks)
+        return Response(
+            _present_claim_full(
+                request, claim, parts, results["project"], results.get("timeline"), results.get("feedback")
+            )
+        )
+
+
 class ClaimTimelineView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -904,10 +1249,11 @@ class StatisticsByAreaView(APIView):
         ]
         
         results = list(db.claims.aggregate(pipeline))
+        areas = get_areas_by_ids(item["_id"] for item in results)
         data = []
         for item in results:
             if item["_id"]:
-                area = get_area(item["_id"])
+                area = areas.get(str(item["_id"]))
                 area_name = area["name"] if area else "Sin área"
             else:
                 area_name = "Sin área"
@@ -975,10 +1321,11 @@ class StatisticsByProjectView(APIView):
         ]
         
         results = list(db.claims.aggregate(pipeline))
+        projects = get_projects_by_ids(item["_id"] for item in results)
         data = []
         for item in results:
             if item["_id"]:
-                project = get_project(item["_id"])
+                project = projects.get(str(item["_id"]))
                 project_name = project["name"] if project else "Sin proyecto"
             else:
                 project_name = "Sin proyecto"
@@ -1211,33 +1558,38 @@ class StatisticsByEmployeeView(APIView):
             query.setdefault("created_at", {})["$lte"] = datetime.fromisoformat(end_date)
         
         # Obtener todos los empleados
-        employees = list(db.users.find({"role": "employee", "is_active": {"$ne": False}}))
-        
+        employees = list(
+            db.users.find({"role": "employee", "is_active": {"$ne": False}}, {"full_name": 1, "email": 1, "area_id": 1})
+        )
+        area_ids = list({employee["area_id"] for employee in employees if employee.get("area_id")})
+
+        # Totales y resueltos de todas las áreas en una sola agregación (el área de cada empleado reemplaza
+        # al filtro area_id, como cuando se contaba empleado por empleado)
+        counts = {}
+        if area_ids:
+            pipeline = [
+                {"$match": {**query, "area_id": {"$in": area_ids}}},
+                {"$group": {
+                    "_id": "$area_id",
+                    "total": {"$sum": 1},
+                    "resolved": {"$sum": {"$cond": [{"$eq": ["$status", "Resuelto"]}, 1, 0]}},
+                }},
+            ]
+            counts = {item["_id"]: item for item in db.claims.aggregate(pipeline)}
+        areas = get_areas_by_ids(area_ids)
+
         data = []
         for employee in employees:
-            employee_query = query.copy()
-            employee_query["area_id"] = employee.get("area_id")
-            
-            if not employee_query.get("area_id"):
+            area_id = employee.get("area_id")
+            if not area_id:
                 continue
-            
-            # Contar reclamos del área del empleado
-            total = db.claims.count_documents(employee_query)
-            
-            # Contar reclamos resueltos
-            resolved_query = employee_query.copy()
-            resolved_query["status"] = "Resuelto"
-            resolved = db.claims.count_documents(resolved_query)
-            
-            # Obtener nombre del área
-            area = db.areas.find_one({"_id": employee_query["area_id"]})
-            area_name = area["name"] if area else "Sin área"
-            
+            area = areas.get(str(area_id))
+            area_counts = counts.get(area_id, {})
             data.append({
                 "employee": employee.get("full_name") or employee.get("email"),
-                "area": area_name,
-                "total": total,
-                "resolved": resolved
+                "area": area["name"] if area else "Sin área",
+                "total": area_counts.get("total", 0),
+                "resolved": area_counts.get("resolved", 0)
             })
         
         # Ordenar por total de reclamos descendente
@@ -1245,3 +1597,124 @@ class StatisticsByEmployeeView(APIView):
         
         return Response(data)
 
+
+class BatchView(APIView):
+    """
+    Ejecuta varios GET de la API en un solo request.
+
+    Body: {"requests": ["/api/areas/", "/api/statistics/kpis/", ...]}. Se autentica una sola vez y cada
+    ruta se despacha internamente en paralelo; la respuesta trae el status y el cuerpo de cada una, en orden.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        paths = request.data.get("requests") if isinstance(request.data, dict) else request.data
+        if not isinstance(paths, list) or not paths:
+            return Response(
+                {"detail": "Se requiere una lista 'requests' con rutas GET"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(paths) > settings.BATCH_MAX_REQUESTS:
+            return Response(
+                {"detail": f"Máximo {settings.BATCH_MAX_REQUESTS} rutas por batch"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            paths = [validate_batch_path(path) for path in paths]
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        http_request = request._request  # pylint: disable=protected-access
+        results = run_concurrently(
+            {
+                index: (lambda path=path: dispatch_batch_request(http_request, path, request.user))
+                for index, path in enumerate(paths)
+            }
+        )
+        return Response({"responses": [results[index] for index in range(len(paths))]})
+
+
+class PoolStatsView(APIView):
+    """Uso de los pools de conexiones a Mongo en este worker y las opciones con que se crearon los clientes."""
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(
+            {
+                "pid": os.getpid(),
+                "fanout_workers": settings.DB_FANOUT_WORKERS,
+                "options": {
+                    "main": settings.MONGODB_MAIN_OPTIONS,
+                    "audit": settings.MONGODB_AUDIT_OPTIONS,
+                },
+                "pools": pool_stats(),
+            }
+        )
+
+
+class ProfileListView(APIView):
+    """Perfiles guardados por ProfilingMiddleware, del más nuevo al más viejo."""
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(
+            {
+                "results": list_profiles(),
+                "limit": settings.PROFILE_RATE_LIMIT,
+                "window_seconds": settings.PROFILE_RATE_WINDOW_SECONDS,
+            }
+        )
+
+
+class ProfileDetailView(APIView):
+    """Datos del request perfilado con la lista completa de comandos de Mongo."""
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request, profile_id: str):
+        profile = get_profile(profile_id)
+        if profile is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(profile)
+
+
+class ProfileDownloadView(APIView):
+    """El archivo pstats del perfil (snakeviz, `python -m pstats`)."""
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request, profile_id: str):
+        path = profile_path(profile_id, ".prof")
+        if path is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(path.open("rb"), as_attachment=True, filename=path.name)
+
+
+class MetricsView(APIView):
+    """
+    Métricas de todos los workers en formato de texto de Prometheus (claims/metrics.py). Sin usuarios: el
+    scraper manda METRICS_TOKEN como Authorization: Bearer. Sin token configurado el endpoint no se
+    publica (404), porque comparte puerto con la API y expone nombres de vistas, colecciones y tiempos.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        if not settings.METRICS_ENABLED or not token:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+        return HttpResponse(render_metrics(metrics_registry.collect()), content_type=METRICS_CONTENT_TYPE)
+
+
+class LiveStatsView(APIView):
+    """Conexiones SSE abiertas en este proceso y latencias de reparto."""
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(live_broadcaster.stats())
@@ -13,4 +13,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Se importa después de inicializar Django: necesita settings y las apps cargadas
+from claims.live import live_stream_app  # noqa: E402  pylint: disable=wrong-import-position
+
+LIVE_STREAM_PATH = '/api/live/'
+
+
+async def application(scope, receive, send):
+    # El stream SSE se atiende fuera de Django para poder detectar la desconexión del navegador
+    if scope['type'] == 'http' and scope['path'] == LIVE_STREAM_PATH:
+        await live_stream_app(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
@@ -48,6 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'claims.middleware.MetricsMiddleware',
+    'claims.middleware.RequestTimingMiddleware',
+    'claims.middleware.QueryBudgetMiddleware',
+    'claims.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -56,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'claims.middleware.TracingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -137,6 +142,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'claims.permissions.IsAuthenticated',
     ],
+    # Usa orjson si está instalado; si no, es el JSONRenderer de DRF
+    'DEFAULT_RENDERER_CLASSES': [
+        'claims.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # Default primary key field type
@@ -150,6 +160,136 @@ MONGODB_MAIN_DB = os.getenv('MONGODB_MAIN_DB', 'claims_main')
 MONGODB_AUDIT_URI = os.getenv('MONGODB_AUDIT_URI', MONGODB_MAIN_URI)
 MONGODB_AUDIT_DB = os.getenv('MONGODB_AUDIT_DB', 'claims_audit')
 
+
+def _mongo_client_options(prefix, inherit=None):
+    """Opciones de MongoClient desde MONGODB_<prefix>_*; las no definidas se toman de inherit."""
+    inherit = inherit or {}
+
+    def env(name, key, cast, default=None):
+        value = os.getenv(f'MONGODB_{prefix}_{name}')
+        if value is None or value == '':
+            return inherit.get(key, default)
+        return cast(value)
+
+    def write_concern(value):
+        return int(value) if value.isdigit() else value
+
+    return {
+        # Conviene al menos hilos de gunicorn + DB_FANOUT_WORKERS por worker
+        'maxPoolSize': env('MAX_POOL_SIZE', 'maxPoolSize', int, 100),
+        'minPoolSize': env('MIN_POOL_SIZE', 'minPoolSize', int, 0),
+        'maxIdleTimeMS': env('MAX_IDLE_TIME_MS', 'maxIdleTimeMS', int),
+        'waitQueueTimeoutMS': env('WAIT_QUEUE_TIMEOUT_MS', 'waitQueueTimeoutMS', int),
+        'serverSelectionTimeoutMS': env('SERVER_SELECTION_TIMEOUT_MS', 'serverSelectionTimeoutMS', int, 30000),
+        'connectTimeoutMS': env('CONNECT_TIMEOUT_MS', 'connectTimeoutMS', int, 20000),
+        'socketTimeoutMS': env('SOCKET_TIMEOUT_MS', 'socketTimeoutMS', int),
+        # zstd necesita el paquete zstandard y snappy python-snappy; PyMongo ignora los que no estén
+        'compressors': env('COMPRESSORS', 'compressors', str, 'zstd,zlib'),
+        'zlibCompressionLevel': env('ZLIB_LEVEL', 'zlibCompressionLevel', int),
+        'retryWrites': env('RETRY_WRITES', 'retryWrites', lambda value: value.lower() in ('1', 'true', 'yes'), True),
+        'retryReads': env('RETRY_READS', 'retryReads', lambda value: value.lower() in ('1', 'true', 'yes'), True),
+        'w': env('WRITE_CONCERN', 'w', write_concern),
+        'readConcernLevel': env('READ_CONCERN', 'readConcernLevel', str),
+        'appname': env('APP_NAME', 'appname', str, 'claims-backend'),
+    }
+
+
+# Pool, timeouts, compresión y concern de cada cliente (None = valor por defecto de PyMongo)
+MONGODB_MAIN_OPTIONS = _mongo_client_options('MAIN')
+MONGODB_AUDIT_OPTIONS = _mongo_client_options('AUDIT', inherit=MONGODB_MAIN_OPTIONS)
+
+# Al arrancar solo se compara la versión de índices aplicada por sync_indexes, con este timeout
+INDEX_CHECK_ON_STARTUP = os.getenv('INDEX_CHECK_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
+INDEX_CHECK_TIMEOUT_MS = int(os.getenv('INDEX_CHECK_TIMEOUT_MS', '2000'))
+
+# Caché de áreas y proyectos: cada cuántos segundos se revisa el contador de versión
+REFERENCE_CACHE_CHECK_SECONDS = float(os.getenv('REFERENCE_CACHE_CHECK_SECONDS', '5'))
+# Con el bus de invalidación activo los cambios llegan al instante y la revisión puede espaciarse
+REFERENCE_CACHE_MAX_AGE_SECONDS = float(os.getenv('REFERENCE_CACHE_MAX_AGE_SECONDS', '600'))
+
+# Bus de invalidación entre workers: auto (change stream si hay replica set, si no cache_events),
+# change_stream, poll u off
+CACHE_INVALIDATION_MODE = os.getenv('CACHE_INVALIDATION_MODE', 'auto')
+CACHE_EVENTS_SIZE_BYTES = int(os.getenv('CACHE_EVENTS_SIZE_BYTES', str(1024 * 1024)))
+
+# Actualizaciones en vivo por SSE (/api/live/, solo con el servidor ASGI)
+LIVE_QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', '256'))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv('LIVE_HEARTBEAT_SECONDS', '15'))
+LIVE_MAX_STREAM_SECONDS = float(os.getenv('LIVE_MAX_STREAM_SECONDS', '3600'))
+LIVE_RETRY_MS = int(os.getenv('LIVE_RETRY_MS', '3000'))
+LIVE_POLL_SECONDS = float(os.getenv('LIVE_POLL_SECONDS', '2'))
+LIVE_CLAIM_META_SIZE = int(os.getenv('LIVE_CLAIM_META_SIZE', '50000'))
+
+# Hilos para consultas independientes que se ejecutan en paralelo dentro de un request
+DB_FANOUT_WORKERS = int(os.getenv('DB_FANOUT_WORKERS', '8'))
+
+# Instrumentación por request: Server-Timing y una línea JSON por request en el logger claims.requests.
+# Los requests más lentos que SLOW_REQUEST_MS (0 = ninguno) se loguean como warning con sus comandos de Mongo.
+REQUEST_INSTRUMENTATION = os.getenv('REQUEST_INSTRUMENTATION', 'true').lower() in ('1', 'true', 'yes')
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '0'))
+REQUEST_COMMAND_LOG_LIMIT = int(os.getenv('REQUEST_COMMAND_LOG_LIMIT', '200'))
+
+# Presupuesto de consultas por endpoint (claims/query_budgets.py), pensado para staging:
+# off = no se mide, log = warning en claims.requests, raise = el request falla con QueryBudgetExceeded.
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'off').lower()
+# Consultas extra toleradas sobre el presupuesto (recarga de la caché de referencia)
+QUERY_BUDGET_ALLOWANCE = int(os.getenv('QUERY_BUDGET_ALLOWANCE', '3'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'claims.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Métricas en formato Prometheus en /metrics. Con METRICS_DIR (gunicorn.conf.py lo define) cada worker
+# vuelca las suyas ahí cada METRICS_FLUSH_SECONDS y /metrics suma las de todos. El endpoint responde 404
+# hasta que se configura METRICS_TOKEN, que el scraper manda como Authorization: Bearer.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '1'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Perfilado a pedido: un admin manda X-Profile: 1 (o ?profile=1) y el request corre bajo cProfile.
+# Como mucho PROFILE_RATE_LIMIT perfiles cada PROFILE_RATE_WINDOW_SECONDS entre todos los workers.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+PROFILES_DIR = Path(os.getenv('PROFILES_DIR', BASE_DIR / 'var' / 'profiles'))
+PROFILE_RATE_LIMIT = int(os.getenv('PROFILE_RATE_LIMIT', '5'))
+PROFILE_RATE_WINDOW_SECONDS = int(os.getenv('PROFILE_RATE_WINDOW_SECONDS', '600'))
+PROFILE_MAX_KEPT = int(os.getenv('PROFILE_MAX_KEPT', '50'))
+
+# Trazas locales (claims/tracing.py): se escribe una fracción TRACE_SAMPLE_RATE de los requests en
+# TRACE_DIR/traces-<pid>.jsonl, que rota a los TRACE_FILE_MAX_BYTES. `manage.py trace_report` las resume.
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0.01'))
+TRACE_DIR = Path(os.getenv('TRACE_DIR', BASE_DIR / 'var' / 'traces'))
+TRACE_FILE_MAX_BYTES = int(os.getenv('TRACE_FILE_MAX_BYTES', str(50 * 1024 * 1024)))
+TRACE_FILE_BACKUPS = int(os.getenv('TRACE_FILE_BACKUPS', '5'))
+# Al abrir su archivo cada worker borra los de procesos que ya no existen con más de TRACE_RETENTION_DAYS
+# y, si el directorio pasa de TRACE_DIR_MAX_BYTES, los más viejos hasta volver al límite
+TRACE_RETENTION_DAYS = float(os.getenv('TRACE_RETENTION_DAYS', '7'))
+TRACE_DIR_MAX_BYTES = int(os.getenv('TRACE_DIR_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+# Cantidad máxima de rutas GET en un POST a /api/batch/
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '20'))
+
+# Índice de resoluciones para sugerencias
+KNOWLEDGE_INDEX_PATH = Path(os.getenv('KNOWLEDGE_INDEX_PATH', BASE_DIR / 'var' / 'resolution_index.npz'))
+KNOWLEDGE_INDEX_REFRESH_SECONDS = int(os.getenv('KNOWLEDGE_INDEX_REFRESH_SECONDS', '30'))
+KNOWLEDGE_INDEX_SAVE_DELAY_SECONDS = int(os.getenv('KNOWLEDGE_INDEX_SAVE_DELAY_SECONDS', '10'))
+
+# Extracciones incrementales para BI
+SNAPSHOT_DIR = Path(os.getenv('SNAPSHOT_DIR', BASE_DIR / 'var' / 'snapshots'))
+
 # JWT
 JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
 JWT_ACCESS_TTL_MINUTES = int(os.getenv('JWT_ACCESS_TTL_MINUTES', '120'))
@@ -3,9 +3,13 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from claims.views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('claims.urls')),
+    # Scrape de Prometheus
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
 
 # Servir archivos media en desarrollo
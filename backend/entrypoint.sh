@@ -12,5 +12,9 @@ do
   sleep 2
 done
 
+echo "Sincronizando indices de MongoDB..."
+# Espera a que MongoDB responda; un error de los índices detiene el contenedor con su mensaje
+python manage.py sync_indexes --wait "${MONGO_WAIT_SECONDS:-120}"
+
 echo "Iniciando servidor Django..."
 exec "$@"
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Configuración de gunicorn para el despliegue (gunicorn lee este archivo por defecto desde backend/).
+
+Los workers son de uvicorn y sirven config.asgi: es la única forma de atender el stream SSE de /api/live/
+y de que las vistas async corran concurrentes; las vistas DRF síncronas corren en hilos, uno por request.
+Para volver al despliegue WSGI con hilos: GUNICORN_WORKER_CLASS=gthread y GUNICORN_APP=config.wsgi:application
+(sin /api/live/).
+
+Con preload_app el master importa Django y la app una sola vez y los workers la heredan por fork:
+arrancan más rápido y comparten las páginas de memoria que no modifican. Lo que no se puede heredar son
+los clientes de Mongo, así que el master cierra los suyos antes de forkear, cada worker descarta lo que
+haya heredado y crea los propios a demanda, y los cierra al terminar.
+
+Las métricas de /metrics se suman entre workers a través de METRICS_DIR: si no viene definido se usa un
+directorio propio de este master, que se vacía al arrancar y se borra al salir.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+wsgi_app = os.getenv("GUNICORN_APP", "config.asgi:application")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+# Solo lo usa el worker gthread; los de uvicorn lo ignoran
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+
+# Antes de cargar la app: settings lo lee al importarse
+METRICS_DIR = os.environ.setdefault(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), f"claims-metrics-{os.getpid()}")
+)
+
+# Archivo donde cada worker anota "pid milisegundos" al terminar de arrancar (lo usa bench_workers)
+BOOT_LOG = os.getenv("GUNICORN_BOOT_LOG")
+
+
+def on_starting(server):
+    from claims.metrics import clear_metrics_dir
+
+    clear_metrics_dir(METRICS_DIR)
+
+
+def when_ready(server):
+    # En el master, ya con la app cargada si hubo preload: nada de clientes ni hilos de PyMongo al forkear
+    if preload_app:
+        from claims.db import close_clients
+
+        close_clients()
+
+
+def post_fork(server, worker):
+    worker.boot_started = time.monotonic()
+    from claims.db import reset_clients
+
+    reset_clients()
+
+
+def post_worker_init(worker):
+    elapsed_ms = (time.monotonic() - worker.boot_started) * 1000
+    worker.log.info("Worker %s listo en %.0f ms", worker.pid, elapsed_ms)
+    if BOOT_LOG:
+        with open(BOOT_LOG, "a", encoding="utf-8") as handle:
+            handle.write(f"{worker.pid} {elapsed_ms:.1f}\n")
+
+
+def worker_exit(server, worker):
+    from claims.db import close_clients
+    from claims.metrics import registry
+
+    close_clients()
+    registry.flush()
+
+
+def child_exit(server, worker):
+    from claims.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid, METRICS_DIR)
+
+
+def on_exit(server):
+    if METRICS_DIR.startswith(os.path.join(tempfile.gettempdir(), "claims-metrics-")):
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)